@@ -1,5 +1,6 @@
 from amaranth_spacewire.node import Node
 from amaranth_spacewire.datalink import *
 from amaranth_spacewire.encoding import *
+from amaranth_spacewire.misc.timebase import Timebase
 
-__all__ = ["Node", "DataLinkState", "Transmitter", "Receiver"]
+__all__ = ["Node", "DataLinkState", "Transmitter", "Receiver", "TxClockBank", "Timebase"]
@@ -1,17 +1,29 @@
 from amaranth import *
-from amaranth.lib.fifo import SyncFIFOBuffered
+from amaranth.lib.cdc import FFSynchronizer
+from amaranth.lib.fifo import AsyncFIFOBuffered, SyncFIFOBuffered
 
 from amaranth_spacewire.datalink.fsm import DataLinkFSM
 from amaranth_spacewire.misc.states import DataLinkState
 from amaranth_spacewire.datalink.recovery_fsm import RecoveryFSM, RecoveryState
 from amaranth_spacewire.datalink.flow_control_manager import FlowControlManager
 from amaranth_spacewire.misc.constants import CHAR_EEP, CHAR_EOP, CHAR_FCT, MAX_TX_CREDIT
+from amaranth_spacewire.misc.bypass_fifo import BypassFIFO
+from amaranth_spacewire.misc.wide_sync_fifo import WideSyncFIFO
 
 
 class DataLinkLayer(Elaboratable):
+    # Width of the packet lengths, which saturate
+    MAX_PACKET_LENGTH_BITS = 16
+
     def __init__(self, srcfreq,
                        transission_delay=12.8e-6,
-                       fifo_depth_tokens=7):
+                       fifo_depth_tokens=7,
+                       rx_chars_per_cycle=1,
+                       timebase_freq=None,
+                       user_async=False,
+                       packet_fifo=False,
+                       tx_packet_threshold=None,
+                       fifo_bypass=False):
 
         # Signals for Encoding layer
         self.got_null = Signal()
@@ -30,6 +42,14 @@ class DataLinkLayer(Elaboratable):
 
         self.rx_enable = Signal()
         self.rx_char = Signal(9)
+        if rx_chars_per_cycle > 1:
+            # Number of FCTs and N-Chars received in the clock cycle, and the
+            # N-Chars, first one in bits 0 to 8, replacing ``got_fct``,
+            # ``got_n_char`` and ``rx_char`` for the flow control and the RX
+            # FIFO
+            self.got_fcts = Signal(range(rx_chars_per_cycle + 1))
+            self.got_n_chars = Signal(range(rx_chars_per_cycle + 1))
+            self.rx_chars = Signal(9 * rx_chars_per_cycle)
 
         # TODO: Prefix all tx with tx and all rx with rx
         self.tx_enable = Signal()
@@ -37,7 +57,8 @@ class DataLinkLayer(Elaboratable):
         self.tx_send = Signal()
         self.tx_ready = Signal()
 
-        # Signals for the Network layer
+        # Signals for the Network layer, in the ``user`` clock domain with
+        # ``user_async``
         # RX FIFO
         self.r_en = Signal()
         self.r_data = Signal(9)
@@ -46,6 +67,11 @@ class DataLinkLayer(Elaboratable):
         self.w_en = Signal()
         self.w_data = Signal(9)
         self.w_rdy = Signal()
+        if packet_fifo:
+            # Complete packets in the RX FIFO, and number of data characters
+            # of the one at the head, valid while ``r_packets`` is not zero
+            self.r_packets = Signal(range(8 * fifo_depth_tokens + 1))
+            self.r_length = Signal(self.MAX_PACKET_LENGTH_BITS)
 
         # Signals for the MIB
         self.link_state = Signal(DataLinkState)
@@ -56,11 +82,31 @@ class DataLinkLayer(Elaboratable):
         self.link_disabled = Signal()
         self.link_start = Signal()
         self.autostart = Signal()
+        if timebase_freq is not None:
+            # Strobe of the ``Timebase`` counted by the link delays
+            self.timebase_tick = Signal()
 
         # Internals
         self._srcfreq = srcfreq
         self._transission_delay = transission_delay
         self._fifo_depth_tokens = fifo_depth_tokens
+        self._rx_chars_per_cycle = rx_chars_per_cycle
+        self._timebase_freq = timebase_freq
+        self._user_async = user_async
+        self._packet_fifo = packet_fifo
+        self._fifo_bypass = fifo_bypass
+        # Characters in the TX FIFO to start sending a packet before its end
+        self._tx_packet_threshold = tx_packet_threshold or 8 * fifo_depth_tokens
+
+        if user_async and rx_chars_per_cycle > 1:
+            raise ValueError("The RX FIFO cannot be written with several characters per clock cycle across clock domains")
+        if packet_fifo and (user_async or rx_chars_per_cycle > 1):
+            raise ValueError("The packet FIFO requires a single clock domain and one character per clock cycle")
+        if fifo_bypass and (user_async or rx_chars_per_cycle > 1 or packet_fifo):
+            raise ValueError("The FIFO bypass requires a single clock domain, one character per clock cycle "
+                             "and no packet FIFO")
+        if not 0 < self._tx_packet_threshold <= 8 * fifo_depth_tokens:
+            raise ValueError("The TX packet threshold must be within the TX FIFO depth")
 
     def elaborate(self, platform):
         m = Module()
@@ -70,11 +116,57 @@ class DataLinkLayer(Elaboratable):
         tx_fifo_r_rdy = Signal()
         tx_fifo_r_data = Signal(9)
 
-        m.submodules.rx_fifo = rx_fifo = SyncFIFOBuffered(width=9, depth=8 * self._fifo_depth_tokens)
-        m.submodules.tx_fifo = tx_fifo = SyncFIFOBuffered(width=9, depth=8 * self._fifo_depth_tokens)
-        m.submodules.fsm = fsm = DataLinkFSM(self._srcfreq, self._transission_delay)
-        m.submodules.rec_fsm = rec_fsm = RecoveryFSM()
-        m.submodules.flow_control_manager = fcm = FlowControlManager(fifo_depth_tokens=self._fifo_depth_tokens)
+        if self._rx_chars_per_cycle > 1:
+            # Written with all the N-Chars received in a clock cycle
+            m.submodules.rx_fifo = rx_fifo = WideSyncFIFO(width=9, depth=8 * self._fifo_depth_tokens,
+                                                          lanes=self._rx_chars_per_cycle)
+            rx_fifo_w_en = rx_fifo.w_count
+            rx_fifo_level = rx_fifo.level
+            got_fct = self.got_fcts
+            got_n_char = self.got_n_chars
+            rx_char = self.rx_chars
+        elif self._user_async:
+            # The RX FIFO level is taken on the write side, where the reads
+            # are only seen once synchronized, so the free space can only be
+            # under-estimated. The depth is rounded up to a power of 2 plus
+            # one, which covers the entry transiently missing from the level
+            # while moved to the output buffer.
+            m.submodules.rx_fifo = rx_fifo = AsyncFIFOBuffered(width=9, depth=8 * self._fifo_depth_tokens,
+                                                               r_domain="user", w_domain="sync")
+            rx_fifo_w_en = rx_fifo.w_en
+            rx_fifo_level = rx_fifo.w_level
+            got_fct = self.got_fct
+            got_n_char = self.got_n_char
+            rx_char = self.rx_char
+        elif self._fifo_bypass:
+            # Characters received while the RX FIFO is empty can be read
+            # straight away
+            m.submodules.rx_fifo = rx_fifo = BypassFIFO(width=9, depth=8 * self._fifo_depth_tokens)
+            rx_fifo_w_en = rx_fifo.w_en
+            rx_fifo_level = rx_fifo.level
+            got_fct = self.got_fct
+            got_n_char = self.got_n_char
+            rx_char = self.rx_char
+        else:
+            m.submodules.rx_fifo = rx_fifo = SyncFIFOBuffered(width=9, depth=8 * self._fifo_depth_tokens)
+            rx_fifo_w_en = rx_fifo.w_en
+            rx_fifo_level = rx_fifo.level
+            got_fct = self.got_fct
+            got_n_char = self.got_n_char
+            rx_char = self.rx_char
+        if self._user_async:
+            m.submodules.tx_fifo = tx_fifo = AsyncFIFOBuffered(width=9, depth=8 * self._fifo_depth_tokens,
+                                                               r_domain="sync", w_domain="user")
+        elif self._fifo_bypass:
+            # Characters written while the TX FIFO is empty are sent straight
+            # away if the link can send them
+            m.submodules.tx_fifo = tx_fifo = BypassFIFO(width=9, depth=8 * self._fifo_depth_tokens)
+        else:
+            m.submodules.tx_fifo = tx_fifo = SyncFIFOBuffered(width=9, depth=8 * self._fifo_depth_tokens)
+        m.submodules.fsm = fsm = DataLinkFSM(self._srcfreq, self._transission_delay, timebase_freq=self._timebase_freq)
+        m.submodules.rec_fsm = rec_fsm = RecoveryFSM(rx_chars_per_cycle=self._rx_chars_per_cycle)
+        m.submodules.flow_control_manager = fcm = FlowControlManager(fifo_depth_tokens=self._fifo_depth_tokens,
+                                                                     rx_chars_per_cycle=self._rx_chars_per_cycle)
 
         m.d.comb += [
             #######################################################
@@ -109,10 +201,10 @@ class DataLinkLayer(Elaboratable):
             rec_fsm.rx_fifo_w_rdy_in.eq(rx_fifo.w_rdy),
             rx_fifo_w_rdy.eq(rec_fsm.rx_fifo_w_rdy_out),
 
-            rec_fsm.rx_fifo_w_en_in.eq(self.got_n_char),
-            rx_fifo.w_en.eq(rec_fsm.rx_fifo_w_en_out),
+            rec_fsm.rx_fifo_w_en_in.eq(got_n_char),
+            rx_fifo_w_en.eq(rec_fsm.rx_fifo_w_en_out),
 
-            rec_fsm.rx_fifo_w_data_in.eq(self.rx_char),
+            rec_fsm.rx_fifo_w_data_in.eq(rx_char),
             rx_fifo.w_data.eq(rec_fsm.rx_fifo_w_data_out),
 
             rec_fsm.tx_fifo_r_rdy_in.eq(tx_fifo.r_rdy),
@@ -124,25 +216,19 @@ class DataLinkLayer(Elaboratable):
             rec_fsm.tx_fifo_r_data_in.eq(tx_fifo.r_data),
             tx_fifo_r_data.eq(rec_fsm.tx_fifo_r_data_out),
 
-            rec_fsm.tx_fifo_w_rdy_in.eq(tx_fifo.w_rdy),
-            self.w_rdy.eq(rec_fsm.tx_fifo_w_rdy_out),
-
-            rec_fsm.tx_fifo_w_en_in.eq(self.w_en),
-            tx_fifo.w_en.eq(rec_fsm.tx_fifo_w_en_out),
-
             #######################################################
             # Flow Control Manager
             #######################################################
             self.send_fct.eq(fcm.send_fct),
-            fcm.got_fct.eq(self.got_fct),
+            fcm.got_fct.eq(got_fct),
             fcm.sent_fct.eq(self.sent_fct),
-            fcm.got_n_char.eq(self.got_n_char),
+            fcm.got_n_char.eq(got_n_char),
             fcm.sent_n_char.eq(self.sent_n_char),
             fcm.link_state.eq(fsm.link_state),
             self.link_tx_credit.eq(fcm.tx_credit),
             self.link_rx_credit.eq(fcm.rx_credit),
             fcm.tx_ready.eq(self.tx_ready),
-            fcm.rx_fifo_level.eq(rx_fifo.level),
+            fcm.rx_fifo_level.eq(rx_fifo_level),
 
             #######################################################
             # FIFOs
@@ -161,7 +247,36 @@ class DataLinkLayer(Elaboratable):
             self.tx_char.eq(tx_fifo_r_data),
         ]
         
-        with m.If(~self.send_fct & self.tx_ready & fcm.tx_credit.any()):
+        if self._user_async:
+            # Writes are refused while the TX FIFO is discarded, once it is
+            # seen in the user clock domain. The state compare is registered
+            # first so that no glitch crosses the domains.
+            discarding = Signal()
+            discard_tx = Signal()
+            m.d.sync += discarding.eq(rec_fsm.recovery_state == RecoveryState.RECOVERY_DISCARD_TX)
+            m.submodules.discard_tx_sync = FFSynchronizer(discarding, discard_tx, o_domain="user")
+            m.d.comb += [
+                self.w_rdy.eq(tx_fifo.w_rdy & ~discard_tx),
+                tx_fifo.w_en.eq(self.w_en & ~discard_tx),
+            ]
+        else:
+            m.d.comb += [
+                rec_fsm.tx_fifo_w_rdy_in.eq(tx_fifo.w_rdy),
+                self.w_rdy.eq(rec_fsm.tx_fifo_w_rdy_out),
+
+                rec_fsm.tx_fifo_w_en_in.eq(self.w_en),
+                tx_fifo.w_en.eq(rec_fsm.tx_fifo_w_en_out),
+            ]
+
+        if self._timebase_freq is not None:
+            m.d.comb += fsm.timebase_tick.eq(self.timebase_tick)
+
+        if self._packet_fifo:
+            tx_go = self._count_packets(m, rx_fifo, tx_fifo)
+        else:
+            tx_go = C(1)
+
+        with m.If(~self.send_fct & self.tx_ready & fcm.tx_credit.any() & tx_go):
             m.d.comb += [
                 self.tx_send.eq(tx_fifo_r_rdy),
                 tx_fifo_r_en.eq(tx_fifo_r_rdy)
@@ -186,6 +301,44 @@ class DataLinkLayer(Elaboratable):
         
         return m
 
+    def _count_packets(self, m, rx_fifo, tx_fifo):
+        # A packet is complete once its end of packet marker is in the FIFO
+        rx_end_in = rx_fifo.w_en & rx_fifo.w_rdy & rx_fifo.w_data[8]
+        rx_end_out = rx_fifo.r_en & rx_fifo.r_rdy & rx_fifo.r_data[8]
+        tx_end_in = tx_fifo.w_en & tx_fifo.w_rdy & tx_fifo.w_data[8]
+        tx_out = tx_fifo.r_en & tx_fifo.r_rdy
+        tx_end_out = tx_out & tx_fifo.r_data[8]
+
+        # Lengths of the complete RX packets, pushed with their end
+        m.submodules.rx_lengths = rx_lengths = SyncFIFOBuffered(width=self.MAX_PACKET_LENGTH_BITS,
+                                                                depth=8 * self._fifo_depth_tokens)
+        rx_length = Signal(self.MAX_PACKET_LENGTH_BITS)
+        with m.If(rx_end_in):
+            m.d.sync += rx_length.eq(0)
+        with m.Elif(rx_fifo.w_en & rx_fifo.w_rdy & ~rx_length.all()):
+            m.d.sync += rx_length.eq(rx_length + 1)
+        m.d.comb += [
+            rx_lengths.w_en.eq(rx_end_in),
+            rx_lengths.w_data.eq(rx_length),
+            rx_lengths.r_en.eq(rx_end_out),
+            # Not counted until the length at the head is readable
+            self.r_packets.eq(Mux(rx_lengths.r_rdy, rx_lengths.level, 0)),
+            self.r_length.eq(rx_lengths.r_data),
+        ]
+
+        tx_packets = Signal(range(8 * self._fifo_depth_tokens + 1))
+        m.d.sync += tx_packets.eq(tx_packets + tx_end_in - tx_end_out)
+
+        # Packet started, sent until its end
+        tx_sending = Signal()
+        with m.If(tx_out):
+            m.d.sync += tx_sending.eq(~tx_fifo.r_data[8])
+
+        # Enough in the TX FIFO to send
+        tx_go = Signal()
+        m.d.comb += tx_go.eq(tx_sending | (tx_packets != 0) | (tx_fifo.level >= self._tx_packet_threshold))
+        return tx_go
+
     def ports(self):
         return [
             self.got_null,
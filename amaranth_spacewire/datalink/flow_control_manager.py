@@ -5,12 +5,14 @@ from amaranth_spacewire.misc.constants import MAX_RX_CREDIT, MAX_TX_CREDIT, MAX_
 
 
 class FlowControlManager(Elaboratable):
-    def __init__(self, fifo_depth_tokens=7):
+    def __init__(self, fifo_depth_tokens=7, rx_chars_per_cycle=1):
         self.send_fct = Signal()
-        self.got_fct = Signal()
+        # Number of FCTs and N-Chars received in the clock cycle, up to
+        # ``rx_chars_per_cycle``
+        self.got_fct = Signal(range(rx_chars_per_cycle + 1))
         self.sent_fct = Signal()
         self.credit_error = Signal()
-        self.got_n_char = Signal()
+        self.got_n_char = Signal(range(rx_chars_per_cycle + 1))
         self.sent_n_char = Signal()
         self.link_state = Signal(DataLinkState)
         self.tx_ready = Signal()
@@ -42,9 +44,9 @@ class FlowControlManager(Elaboratable):
         with m.If(~(self.link_state == DataLinkState.RUN)
                   | self.credit_error):
             m.d.sync += self.credit_error.eq(0)
-        with m.Elif(self.got_fct & (self.tx_credit == MAX_TX_CREDIT)):
+        with m.Elif(self.tx_credit + 8 * self.got_fct > MAX_TX_CREDIT + 7):
             m.d.sync += self.credit_error.eq(1)
-        with m.Elif(self.got_n_char & (self.rx_credit == 0)):
+        with m.Elif(self.got_n_char > self.rx_credit):
             m.d.sync += self.credit_error.eq(1)
         with m.Elif(self.sent_fct & (rx_tokens == 0)):
             m.d.sync += self.credit_error.eq(1)
@@ -55,10 +57,8 @@ class FlowControlManager(Elaboratable):
         with m.If((~(self.link_state == DataLinkState.CONNECTING) & ~(self.link_state == DataLinkState.RUN))
                   | self.credit_error):
             m.d.sync += self.tx_credit.eq(0)
-        with m.Elif(self.got_fct & self.sent_n_char):
-            m.d.sync += self.tx_credit.eq(self.tx_credit + 7)
-        with m.Elif(self.got_fct):
-            m.d.sync += self.tx_credit.eq(self.tx_credit + 8)
+        with m.Elif(self.got_fct != 0):
+            m.d.sync += self.tx_credit.eq(self.tx_credit + 8 * self.got_fct - self.sent_n_char)
         with m.Elif(self.sent_n_char & (self.tx_credit > 0)):
             m.d.sync += self.tx_credit.eq(self.tx_credit - 1)
 
@@ -66,12 +66,10 @@ class FlowControlManager(Elaboratable):
         with m.If((~(self.link_state == DataLinkState.CONNECTING) & ~(self.link_state == DataLinkState.RUN))
                   | self.credit_error):
             m.d.sync += self.rx_credit.eq(0)
-        with m.Elif(self.sent_fct & self.got_n_char):
-            m.d.sync += self.rx_credit.eq(self.rx_credit + 7)
         with m.Elif(self.sent_fct):
-            m.d.sync += self.rx_credit.eq(self.rx_credit + 8)
-        with m.Elif(self.got_n_char & (self.rx_credit > 0)):
-            m.d.sync += self.rx_credit.eq(self.rx_credit - 1)
+            m.d.sync += self.rx_credit.eq(self.rx_credit + 8 - self.got_n_char)
+        with m.Elif(self.got_n_char <= self.rx_credit):
+            m.d.sync += self.rx_credit.eq(self.rx_credit - self.got_n_char)
 
         # Send FCT logic
         with m.If(((self.link_state == DataLinkState.CONNECTING) | (self.link_state == DataLinkState.RUN))
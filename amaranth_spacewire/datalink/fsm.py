@@ -8,7 +8,8 @@ from amaranth_spacewire.misc.states import DataLinkState, RecoveryState
 class DataLinkFSM(Elaboratable):
     def __init__(self,
                  srcfreq,
-                 transission_delay=12.8e-6):
+                 transission_delay=12.8e-6,
+                 timebase_freq=None):
 
         # Ports
         ## Ports: Interface
@@ -30,16 +31,23 @@ class DataLinkFSM(Elaboratable):
         self.link_disabled = Signal()
         self.link_start = Signal()
         self.autostart = Signal()
+        if timebase_freq is not None:
+            # Strobe of the ``Timebase`` counted by the delays
+            self.timebase_tick = Signal()
 
         # Internals
         self._srcfreq = srcfreq
         self._transission_delay = transission_delay
+        self._timebase_freq = timebase_freq
 
     
     def elaborate(self, platform):
         m = Module()
         
-        m.submodules.delay = delay = SpWDelay(self._srcfreq, self._transission_delay, strategy='at_most')
+        m.submodules.delay = delay = SpWDelay(self._srcfreq, self._transission_delay, strategy='at_most',
+                                              tick_freq=self._timebase_freq)
+        if self._timebase_freq is not None:
+            m.d.comb += delay.i_tick.eq(self.timebase_tick)
         
 
         # Stay at 1 once the first null/fct is received/sent
@@ -148,7 +156,7 @@ class DataLinkFSM(Elaboratable):
         return m
 
     def ports(self):
-        return [
+        ports = [
             self.got_fct,
             self.sent_fct,
             self.got_n_char,
@@ -161,4 +169,7 @@ class DataLinkFSM(Elaboratable):
             self.link_disabled,
             self.link_start,
             self.autostart,
-        ]
\ No newline at end of file
+        ]
+        if self._timebase_freq is not None:
+            ports.append(self.timebase_tick)
+        return ports
\ No newline at end of file
@@ -6,7 +6,7 @@ from amaranth_spacewire.misc.constants import CHAR_EEP, CHAR_EOP
 
 
 class RecoveryFSM(Elaboratable):
-    def __init__(self):
+    def __init__(self, rx_chars_per_cycle=1):
         self.link_state = Signal(DataLinkState)
         self.link_disabled = Signal()
         self.disconnect_error = Signal()
@@ -17,10 +17,12 @@ class RecoveryFSM(Elaboratable):
 
         self.rx_fifo_w_rdy_in = Signal()
         self.rx_fifo_w_rdy_out = Signal()
-        self.rx_fifo_w_en_in = Signal()
-        self.rx_fifo_w_en_out = Signal()
-        self.rx_fifo_w_data_in = Signal(9)
-        self.rx_fifo_w_data_out = Signal(9)
+        # Number of characters written, up to ``rx_chars_per_cycle``, first
+        # one in the low bits of the data
+        self.rx_fifo_w_en_in = Signal(range(rx_chars_per_cycle + 1))
+        self.rx_fifo_w_en_out = Signal(range(rx_chars_per_cycle + 1))
+        self.rx_fifo_w_data_in = Signal(9 * rx_chars_per_cycle)
+        self.rx_fifo_w_data_out = Signal(9 * rx_chars_per_cycle)
 
         self.tx_fifo_r_rdy_in = Signal()
         self.tx_fifo_r_rdy_out = Signal()
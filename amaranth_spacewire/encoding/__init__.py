@@ -1,4 +1,5 @@
 from .transmitter import Transmitter, TransmitterState
 from .receiver import Receiver
+from .tx_clock_bank import TxClockBank
 
-__all__ = ["Transmitter", "TransmitterState", "Receiver"]
\ No newline at end of file
+__all__ = ["Transmitter", "TransmitterState", "Receiver", "TxClockBank"]
\ No newline at end of file
@@ -39,3 +39,76 @@ class DSEncoder(Elaboratable):
 
     def ports(self):
         return [self.i_d, self.o_d, self.o_s]
+
+
+class DSWordEncoder(Elaboratable):
+    """Data/Strobe encoder for ``width`` consecutive line slots per clock
+    cycle, first slot in bit 0.
+
+    Each slot flagged in ``i_new`` starts a new bit, read from the same slot of
+    ``i_d``. Other slots repeat the previous bit. The outputs are registered,
+    and held low at reset like with ``DSEncoder``: strobe first, then data.
+    """
+    def __init__(self, width):
+        self.i_reset = Signal()
+        self.i_d = Signal(width)
+        self.i_new = Signal(width)
+        self.o_d = Signal(width)
+        self.o_s = Signal(width)
+        self.o_ready = Signal()
+
+        self._width = width
+
+    def elaborate(self, platform):
+        m = Module()
+
+        # Data and Data xor Strobe on the last slot. Data xor Strobe toggles
+        # with every new bit.
+        d_prev = Signal()
+        x_prev = Signal()
+
+        d = [Signal(name="d_{0}".format(i)) for i in range(self._width)]
+        x = [Signal(name="x_{0}".format(i)) for i in range(self._width)]
+
+        for i in range(self._width):
+            m.d.comb += [
+                d[i].eq(Mux(self.i_new[i], self.i_d[i], d[i - 1] if i else d_prev)),
+                x[i].eq((x[i - 1] if i else x_prev) ^ self.i_new[i]),
+            ]
+
+        with m.FSM() as encoder_fsm:
+            with m.State("RESET"):
+                with m.If(~self.i_reset):
+                    m.next = "NORMAL"
+            with m.State("NORMAL"):
+                with m.If(self.i_reset):
+                    m.d.sync += [
+                        self.o_d.eq(d_prev.replicate(self._width)),
+                        self.o_s.eq(0),
+                        x_prev.eq(d_prev),
+                    ]
+                    m.next = "RESET_D"
+                with m.Else():
+                    m.d.sync += [
+                        self.o_d.eq(Cat(*d)),
+                        self.o_s.eq(Cat(*d) ^ Cat(*x)),
+                        d_prev.eq(d[-1]),
+                        x_prev.eq(x[-1]),
+                    ]
+            with m.State("RESET_D"):
+                m.d.sync += [
+                    self.o_d.eq(0),
+                    d_prev.eq(0),
+                    x_prev.eq(0),
+                ]
+                with m.If(self.i_reset):
+                    m.next = "RESET"
+                with m.Else():
+                    m.next = "NORMAL"
+
+        m.d.sync += self.o_ready.eq(encoder_fsm.ongoing("NORMAL") & ~self.i_reset)
+
+        return m
+
+    def ports(self):
+        return [self.i_d, self.i_new, self.o_d, self.o_s]
@@ -0,0 +1,231 @@
+from amaranth import *
+from amaranth.lib.cdc import FFSynchronizer
+from amaranth.lib.fifo import AsyncFIFO
+
+
+class DSRecoveredClockDecoder(Elaboratable):
+    """Decode characters in clock domains recovered from the Data/Strobe pair.
+
+    ``i_d ^ i_s`` toggles once per bit, so it clocks two local domains: the bit
+    starting on a rising edge is kept until the next falling edge, where the
+    pair of bits is shifted into the character shift register. As characters
+    are made of an even number of bits, they are handled two bits at a time,
+    once aligned on the first ESC received. The link rate is then no longer
+    limited by the ``sync`` frequency.
+
+    Each character is validated with the parity bit of the next one, then
+    written to an asynchronous FIFO which is read in the ``sync`` domain, one
+    character per clock cycle. ESCs are not written on their own: ``o_got_esc``
+    is asserted along with the character that follows them.
+
+    On hardware, ``i_d`` must be sampled after it settled, i.e. the recovered
+    clock path must be slower than the data path.
+
+    Parameters
+    ----------
+    fifo_depth : int
+        Depth of the asynchronous FIFO, in characters.
+
+    Attributes
+    ----------
+    i_d : Signal(1), in
+        Data signal from the Data/Strobe pair.
+    i_s : Signal(1), in
+        Strobe signal from the Data/Strobe pair.
+    i_reset : Signal(1), in
+        Reset signal, asynchronously applied to the local domains.
+    o_valid : Signal(1), out
+        Indication that a character, or an error, is output in this cycle.
+    o_got_fct : Signal(1), out
+        Indication that a Flow Control Token character was received.
+    o_got_esc : Signal(1), out
+        Indication that the character was preceded by an Escape character.
+    o_got_null : Signal(1), out
+        Indication that a Null character was received.
+    o_got_bc : Signal(1), out
+        Indication that a Timecode was received. Its value is in ``o_char``.
+    o_got_n_char : Signal(1), out
+        Indication that a Data character, an EOP or an EEP was received.
+    o_char : Signal(9), out
+        The received character.
+    o_parity_error : Signal(1), out
+        Indication that a Parity Error was detected.
+    o_esc_error : Signal(1), out
+        Indication that an Escape Error was detected.
+    o_overflow : Signal(1), out
+        Indication that a character was lost because the FIFO was full. Held
+        until reset.
+    """
+    def __init__(self, fifo_depth=8):
+        self.i_d = Signal()
+        self.i_s = Signal()
+        self.i_reset = Signal()
+        self.o_valid = Signal()
+        self.o_got_fct = Signal()
+        self.o_got_esc = Signal()
+        self.o_got_null = Signal()
+        self.o_got_bc = Signal()
+        self.o_got_n_char = Signal()
+        self.o_char = Signal(9)
+        self.o_parity_error = Signal()
+        self.o_esc_error = Signal()
+        self.o_overflow = Signal()
+
+        self._fifo_depth = fifo_depth
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.domains.rx_rise = ClockDomain("rx_rise", local=True, async_reset=True)
+        m.domains.rx_fall = ClockDomain("rx_fall", clk_edge="neg", local=True, async_reset=True)
+
+        m.d.comb += [
+            ClockSignal("rx_rise").eq(self.i_d ^ self.i_s),
+            ClockSignal("rx_fall").eq(self.i_d ^ self.i_s),
+            ResetSignal("rx_rise").eq(self.i_reset),
+            ResetSignal("rx_fall").eq(self.i_reset),
+        ]
+
+        m.submodules.fifo = fifo = AsyncFIFO(width=16, depth=self._fifo_depth, r_domain="sync", w_domain="rx_fall")
+
+        # First bit of the pair, from the rising edge
+        bit_rise = Signal()
+        # Last pair registered, and the one before, to find the first ESC
+        pair_prev = Signal(2)
+        pair_old = Signal(2)
+        # Pairs are made of the second bit of the previous pair and of the
+        # first bit of this one when the first ESC started on a falling edge
+        phase = Signal()
+        pair = Signal(2)
+        # Pair index in the character, the header (parity and data/control
+        # bits) being the first one
+        count = Signal(range(5))
+        control = Signal()
+        content = Signal(8)
+        # Last character received, waiting for the next parity bit
+        pending_control = Signal()
+        pending_char = Signal(8)
+        parity_prev = Signal()
+        prev_got_esc = Signal()
+
+        # FIFO entry
+        got_fct = Signal()
+        got_esc = Signal()
+        got_null = Signal()
+        got_bc = Signal()
+        got_n_char = Signal()
+        parity_error = Signal()
+        esc_error = Signal()
+        char = Signal(9)
+        push = Signal()
+        overflow = Signal()
+
+        m.d.rx_rise += bit_rise.eq(self.i_d)
+        # Only registers sample ``i_d``, on the edge it may cause
+        m.d.rx_fall += [
+            pair_prev.eq(Cat(bit_rise, self.i_d)),
+            pair_old.eq(pair_prev),
+        ]
+        m.d.comb += pair.eq(Mux(phase, Cat(pair_prev[1], bit_rise), pair_prev))
+
+        with m.FSM(domain="rx_fall"):
+            with m.State("SYNC"):
+                # ESC pattern: parity, then three ones. The one ending first is
+                # taken.
+                with m.If(pair_old[1] & pair_prev[0] & pair_prev[1]):
+                    m.d.rx_fall += phase.eq(0)
+                    m.next = "READ"
+                with m.Elif(pair_prev[0] & pair_prev[1] & bit_rise):
+                    m.d.rx_fall += phase.eq(1)
+                    m.next = "READ"
+                m.d.rx_fall += [
+                    count.eq(0),
+                    pending_control.eq(1),
+                    pending_char.eq(0b11),
+                    parity_prev.eq(0),
+                ]
+            with m.State("READ"):
+                with m.If(count == 0):
+                    m.d.rx_fall += [
+                        control.eq(pair[1]),
+                        count.eq(1),
+                    ]
+                    with m.If(parity_prev ^ pair[0] ^ pair[1]):
+                        with m.If(pending_control):
+                            with m.Switch(pending_char[0:2]):
+                                with m.Case(0b00):
+                                    m.d.comb += [
+                                        push.eq(1),
+                                        got_null.eq(prev_got_esc),
+                                        got_fct.eq(~prev_got_esc),
+                                    ]
+                                    m.d.rx_fall += prev_got_esc.eq(0)
+                                with m.Case(0b01, 0b10):
+                                    with m.If(prev_got_esc):
+                                        m.d.comb += [push.eq(1), esc_error.eq(1)]
+                                        m.next = "ERROR"
+                                    with m.Else():
+                                        m.d.comb += [
+                                            push.eq(1),
+                                            got_n_char.eq(1),
+                                            char.eq(Cat(pending_char[0:2], C(0, 6), 1)),
+                                        ]
+                                with m.Case(0b11):
+                                    with m.If(prev_got_esc):
+                                        m.d.comb += [push.eq(1), esc_error.eq(1)]
+                                        m.next = "ERROR"
+                                    with m.Else():
+                                        m.d.rx_fall += prev_got_esc.eq(1)
+                        with m.Else():
+                            m.d.comb += [
+                                push.eq(1),
+                                got_bc.eq(prev_got_esc),
+                                got_n_char.eq(~prev_got_esc),
+                                char.eq(pending_char),
+                            ]
+                            m.d.rx_fall += prev_got_esc.eq(0)
+                    with m.Else():
+                        m.d.comb += [push.eq(1), parity_error.eq(1)]
+                        m.next = "ERROR"
+                with m.Else():
+                    m.d.rx_fall += content.eq(Cat(content[2:8], pair))
+                    with m.If(control | (count == 4)):
+                        m.d.rx_fall += [
+                            count.eq(0),
+                            pending_control.eq(control),
+                            pending_char.eq(Mux(control, pair, Cat(content[2:8], pair))),
+                            parity_prev.eq(Mux(control, pair.xor(), Cat(content[2:8], pair).xor())),
+                        ]
+                    with m.Else():
+                        m.d.rx_fall += count.eq(count + 1)
+            with m.State("ERROR"):
+                pass
+
+        m.d.comb += [
+            got_esc.eq(prev_got_esc),
+            fifo.w_en.eq(push),
+            fifo.w_data.eq(Cat(got_fct, got_esc, got_null, got_bc, got_n_char,
+                               parity_error, esc_error, char)),
+        ]
+
+        with m.If(push & ~fifo.w_rdy):
+            m.d.rx_fall += overflow.eq(1)
+
+        m.submodules += FFSynchronizer(overflow, self.o_overflow, reset=0)
+
+        m.d.comb += [
+            fifo.r_en.eq(1),
+            self.o_valid.eq(fifo.r_rdy),
+            Cat(self.o_got_fct, self.o_got_esc, self.o_got_null, self.o_got_bc,
+                self.o_got_n_char, self.o_parity_error, self.o_esc_error,
+                self.o_char).eq(fifo.r_data),
+        ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.i_d, self.i_s, self.i_reset, self.o_valid, self.o_got_fct,
+            self.o_got_esc, self.o_got_null, self.o_got_bc, self.o_got_n_char,
+            self.o_char, self.o_parity_error, self.o_esc_error, self.o_overflow
+        ]
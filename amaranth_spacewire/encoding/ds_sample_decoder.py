@@ -0,0 +1,262 @@
+from amaranth import *
+
+
+class DSSampleDecoder(Elaboratable):
+    """Decode characters from ``width`` samples of the Data/Strobe pair per
+    clock cycle.
+
+    A bit starts at each change of ``i_d ^ i_s`` between two consecutive
+    samples, so up to ``width`` bits are found per clock cycle. They are
+    appended to a bit buffer, from which up to ``chars_per_cycle`` characters
+    are decoded per clock cycle, once aligned on the first ESC received. The
+    link rate can then be up to ``width`` times the clock frequency, as long as
+    each bit spans more than one sample.
+
+    Each character is validated with the parity bit of the next one. ESCs are
+    not output on their own: ``o_got_esc`` is asserted along with the
+    character that follows them.
+
+    The characters decoded in a clock cycle are output on lanes, first one on
+    lane 0: each output has one bit, or one 9-bit character, per lane. A lane
+    can be left empty when the character decoded on it is an ESC.
+
+    Parameters
+    ----------
+    width : int
+        Number of samples per clock cycle, 2, 4 or 8.
+    chars_per_cycle : int
+        Number of characters decoded per clock cycle. At least one character
+        per four samples must be decoded, so that the buffer cannot overflow
+        with control characters.
+
+    Attributes
+    ----------
+    i_reset : Signal(1), in
+        Reset signal.
+    i_d : Signal(width), in
+        Samples of the Data signal, first one in bit 0.
+    i_s : Signal(width), in
+        Samples of the Strobe signal, first one in bit 0.
+    o_activity : Signal(1), out
+        Indication that at least one bit started in the samples.
+    o_bits : Signal(range(width + 1)), out
+        Number of bits that started in the samples.
+    o_valid : Signal(chars_per_cycle), out
+        Indication that a character, or an error, is output in this cycle.
+    o_got_fct : Signal(chars_per_cycle), out
+        Indication that a Flow Control Token character was received.
+    o_got_esc : Signal(chars_per_cycle), out
+        Indication that the character was preceded by an Escape character.
+    o_got_null : Signal(chars_per_cycle), out
+        Indication that a Null character was received.
+    o_got_bc : Signal(chars_per_cycle), out
+        Indication that a Timecode was received. Its value is in ``o_char``.
+    o_got_n_char : Signal(chars_per_cycle), out
+        Indication that a Data character, an EOP or an EEP was received.
+    o_char : Signal(9 * chars_per_cycle), out
+        The received character.
+    o_parity_error : Signal(chars_per_cycle), out
+        Indication that a Parity Error was detected.
+    o_esc_error : Signal(chars_per_cycle), out
+        Indication that an Escape Error was detected.
+    """
+    def __init__(self, width, chars_per_cycle=1):
+        self.i_reset = Signal()
+        self.i_d = Signal(width)
+        self.i_s = Signal(width)
+        self.o_activity = Signal()
+        self.o_bits = Signal(range(width + 1))
+        self.o_valid = Signal(chars_per_cycle)
+        self.o_got_fct = Signal(chars_per_cycle)
+        self.o_got_esc = Signal(chars_per_cycle)
+        self.o_got_null = Signal(chars_per_cycle)
+        self.o_got_bc = Signal(chars_per_cycle)
+        self.o_got_n_char = Signal(chars_per_cycle)
+        self.o_char = Signal(9 * chars_per_cycle)
+        self.o_parity_error = Signal(chars_per_cycle)
+        self.o_esc_error = Signal(chars_per_cycle)
+
+        if width not in (2, 4, 8):
+            raise ValueError("The number of samples per clock cycle must be 2, 4 or 8")
+        if 4 * chars_per_cycle < width:
+            raise ValueError("At least {0} characters must be decoded per clock cycle".format(width // 4))
+        self._width = width
+        self._chars_per_cycle = chars_per_cycle
+
+    def elaborate(self, platform):
+        m = Module()
+        width = self._width
+
+        # The buffer never holds a whole data character and the bits of the
+        # following cycle: at most 9 + width bits are buffered
+        size = 9 + width
+        buf = Signal(size)
+        level = Signal(range(size + 1))
+
+        # Recovered clock of the last sample of the previous cycle
+        clk_prev = Signal()
+        # Bits found in the samples, first one in bit 0, and their number
+        bits = Signal(width)
+        count = Signal(range(width + 1))
+        # Bits taken from the head of the buffer
+        take = Signal(range(size + 1))
+
+        # Last character received, waiting for the next parity bit
+        pending_control = Signal()
+        pending_char = Signal(8)
+        parity_prev = Signal()
+        prev_got_esc = Signal()
+
+        # Each bit goes after the ones found in the previous samples
+        clk = self.i_d ^ self.i_s
+        position = C(0, range(width + 1))
+        for i in range(width):
+            edge = clk[i] ^ (clk[i - 1] if i > 0 else clk_prev)
+            for j in range(width):
+                with m.If(edge & (position == j)):
+                    m.d.comb += bits[j].eq(self.i_d[i])
+            position = position + edge
+        m.d.comb += [
+            count.eq(position),
+            self.o_activity.eq(count != 0),
+            self.o_bits.eq(count),
+        ]
+
+        with m.If(self.i_reset):
+            m.d.sync += [
+                buf.eq(0),
+                level.eq(0),
+                clk_prev.eq(0),
+            ]
+        with m.Else():
+            m.d.sync += [
+                buf.eq((buf >> take) | (bits << (level - take).as_unsigned())),
+                level.eq(level - take + count),
+                clk_prev.eq(clk[-1]),
+            ]
+
+        # Characters decoded one after the other from the head of the buffer,
+        # each lane starting where the previous one stopped
+        reading = Signal()
+        error = C(0)
+        state = (pending_control, pending_char, parity_prev, prev_got_esc)
+        offset = C(0, range(size + 1))
+        active = reading
+        for k in range(self._chars_per_cycle):
+            head = Signal(10, name="head_{0}".format(k))
+            ok = Signal(name="ok_{0}".format(k))
+            lane_error = Signal(name="error_{0}".format(k))
+            lane_esc = Signal(name="got_esc_{0}".format(k))
+            state_next = (
+                Signal(name="pending_control_{0}".format(k)),
+                Signal(8, name="pending_char_{0}".format(k)),
+                Signal(name="parity_prev_{0}".format(k)),
+                Signal(name="prev_got_esc_{0}".format(k)),
+            )
+            control = head[1]
+            length = Mux(control, 4, 10)
+            char = self.o_char.word_select(k, 9)
+
+            m.d.comb += [
+                head.eq(buf.bit_select(offset, 10)),
+                ok.eq(active & (level >= offset + length)),
+                lane_esc.eq(state[3]),
+            ]
+            m.d.comb += [n.eq(p) for n, p in zip(state_next, state)]
+            with m.If(ok):
+                m.d.comb += [
+                    state_next[0].eq(control),
+                    state_next[1].eq(Mux(control, head[2:4], head[2:10])),
+                    state_next[2].eq(Mux(control, head[2:4].xor(), head[2:10].xor())),
+                ]
+                # This XOR operation needs to be 1 to have a valid parity
+                with m.If(state[2] ^ head[0] ^ control):
+                    with m.If(state[0]):
+                        with m.Switch(state[1][0:2]):
+                            with m.Case(0b00):
+                                m.d.comb += [
+                                    self.o_valid[k].eq(1),
+                                    self.o_got_null[k].eq(state[3]),
+                                    self.o_got_fct[k].eq(~state[3]),
+                                    state_next[3].eq(0),
+                                ]
+                            with m.Case(0b01, 0b10):
+                                with m.If(state[3]):
+                                    m.d.comb += [self.o_valid[k].eq(1), self.o_esc_error[k].eq(1), lane_error.eq(1)]
+                                with m.Else():
+                                    m.d.comb += [
+                                        self.o_valid[k].eq(1),
+                                        self.o_got_n_char[k].eq(1),
+                                        char.eq(Cat(state[1][0:2], C(0, 6), 1)),
+                                    ]
+                            with m.Case(0b11):
+                                with m.If(state[3]):
+                                    m.d.comb += [self.o_valid[k].eq(1), self.o_esc_error[k].eq(1), lane_error.eq(1)]
+                                with m.Else():
+                                    m.d.comb += state_next[3].eq(1)
+                    with m.Else():
+                        m.d.comb += [
+                            self.o_valid[k].eq(1),
+                            self.o_got_bc[k].eq(state[3]),
+                            self.o_got_n_char[k].eq(~state[3]),
+                            char.eq(state[1]),
+                            state_next[3].eq(0),
+                        ]
+                with m.Else():
+                    m.d.comb += [self.o_valid[k].eq(1), self.o_parity_error[k].eq(1), lane_error.eq(1)]
+            m.d.comb += self.o_got_esc[k].eq(self.o_valid[k] & lane_esc)
+
+            state = state_next
+            offset = offset + Mux(ok, length, 0)
+            # Decoding stops at the first error
+            active = ok & ~lane_error
+            error = error | lane_error
+
+        with m.FSM() as fsm:
+            with m.State("SYNC"):
+                # ESC pattern: parity, then three ones. The first one is taken,
+                # otherwise all the bits which cannot start it are dropped.
+                with m.If(self.i_reset):
+                    pass
+                for j in range(width):
+                    with m.Elif((level >= j + 4) & buf[j + 1] & buf[j + 2] & buf[j + 3]):
+                        m.d.comb += take.eq(j + 4)
+                        m.next = "READ"
+                with m.Elif(level > 3 + width):
+                    m.d.comb += take.eq(width)
+                with m.Elif(level > 3):
+                    m.d.comb += take.eq(level - 3)
+                m.d.sync += [
+                    pending_control.eq(1),
+                    pending_char.eq(0b11),
+                    parity_prev.eq(0),
+                    prev_got_esc.eq(0),
+                ]
+            with m.State("READ"):
+                with m.If(self.i_reset):
+                    m.next = "SYNC"
+                with m.Elif(error):
+                    m.next = "ERROR"
+                m.d.comb += take.eq(offset)
+                m.d.sync += [
+                    pending_control.eq(state[0]),
+                    pending_char.eq(state[1]),
+                    parity_prev.eq(state[2]),
+                    prev_got_esc.eq(state[3]),
+                ]
+            with m.State("ERROR"):
+                m.d.comb += take.eq(level)
+                with m.If(self.i_reset):
+                    m.next = "SYNC"
+
+        m.d.comb += reading.eq(fsm.ongoing("READ") & ~self.i_reset)
+
+        return m
+
+    def ports(self):
+        return [
+            self.i_reset, self.i_d, self.i_s, self.o_activity, self.o_bits, self.o_valid,
+            self.o_got_fct, self.o_got_esc, self.o_got_null, self.o_got_bc,
+            self.o_got_n_char, self.o_char, self.o_parity_error,
+            self.o_esc_error
+        ]
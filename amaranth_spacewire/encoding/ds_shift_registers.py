@@ -1,5 +1,6 @@
 from amaranth import *
 from amaranth.utils import bits_for
+from amaranth_spacewire.misc.constants import CHAR_ESC
 
 #                             MSB-LSB
 DS_CHAR_FCT_MATCHER         = '001-'
@@ -16,6 +17,21 @@ class DSOutputCharSR(Elaboratable):
     The ``o_ready`` and ``o_active`` outputs are complementary at all times but
     at reset, where both are deasserted.
 
+    When ``preload`` is enabled, the next character is stored in a one-entry
+    holding register as soon as the current one starts shifting out. It is then
+    sent right after the last bit of the current character. In this mode,
+    ``o_ready`` is asserted while the holding register is empty, and
+    ``o_active`` is no longer its complement.
+
+    An escape sequence (a NULL, or a time-code) is loaded at once with
+    ``i_escape``: the ESC is sent first, immediately followed by the
+    character.
+
+    Parameters
+    ----------
+    preload : bool
+        Accept the next character while the current one is being sent.
+
     Attributes
     ----------
     i_reset : Signal(1), in
@@ -27,6 +43,9 @@ class DSOutputCharSR(Elaboratable):
         Indication that a data-char needs to be sent next.
     i_send_control : Signal(1), in
         Indication that a control-char needs to be sent next.
+    i_escape : Signal(1), in
+        Indication that the character needs to be preceded by an ESC. Read
+        along with ``i_send_data`` or ``i_send_control``.
     o_output : Signal(1), out
         Serial output. This includes a parity bit, the data/control bit and the
         character bits.
@@ -37,15 +56,27 @@ class DSOutputCharSR(Elaboratable):
     o_active : Signal(1), out
         Indication that a transfer is in progress. Asserted when the
         information started to be treated.
+    o_starving : Signal(1), out
+        Indication that the character being sent is about to end and that no
+        other character is waiting to be sent. Same as ``o_ready`` when
+        ``preload`` is disabled.
+    o_boundary : Signal(1), out
+        Indication that ``o_output`` holds the first bit of a character, or
+        that nothing is being sent.
     """
-    def __init__(self):
+    def __init__(self, preload=False):
         self.i_reset = Signal()
         self.i_input = Signal(8)
         self.i_send_data = Signal()
         self.i_send_control = Signal()
+        self.i_escape = Signal()
         self.o_output = Signal()
         self.o_ready = Signal()
         self.o_active = Signal()
+        self.o_starving = Signal()
+        self.o_boundary = Signal()
+
+        self._preload = preload
 
     def elaborate(self, platform):
         m = Module()
@@ -56,29 +87,105 @@ class DSOutputCharSR(Elaboratable):
         parity_prev = Signal()
         parity_to_send = Signal()
         send_control = Signal()
-
-        m.d.comb += parity_to_send.eq(~(parity_prev ^ self.i_send_control))
+        # Asserted when the current character is about to end, so that the next
+        # one can be sent without a gap. With a holding register, the decision
+        # can be delayed by one more bit.
+        near_end = Signal()
+        near_end_offset = 2 if self._preload else 3
+        # Next character to be sent, from the inputs or from the holding
+        # register
+        next_input = Signal(8)
+        next_send_data = Signal()
+        next_send_control = Signal()
+        next_escape = Signal()
+        # Holding register (preload only)
+        pending = Signal()
+        pending_input = Signal(8)
+        pending_send_control = Signal()
+        pending_escape = Signal()
+        # Character following the ESC of an escape sequence, sent without
+        # handshake
+        escaped = Signal()
+        escaped_input = Signal(8)
+        escaped_send_control = Signal()
+
+        with m.If(escaped):
+            m.d.comb += [
+                next_input.eq(escaped_input),
+                next_send_data.eq(~escaped_send_control),
+                next_send_control.eq(escaped_send_control),
+            ]
+        if self._preload:
+            with m.Elif(pending):
+                m.d.comb += [
+                    next_input.eq(pending_input),
+                    next_send_data.eq(~pending_send_control),
+                    next_send_control.eq(pending_send_control),
+                    next_escape.eq(pending_escape),
+                ]
+        with m.Else():
+            m.d.comb += [
+                next_input.eq(self.i_input),
+                next_send_data.eq(self.i_send_data),
+                next_send_control.eq(self.i_send_control),
+                next_escape.eq(self.i_escape),
+            ]
+
+        if self._preload:
+            m.d.comb += self.o_starving.eq(near_end & ~pending & ~escaped)
+        else:
+            m.d.comb += [
+                self.o_ready.eq(near_end & ~escaped),
+                self.o_starving.eq(near_end & ~escaped),
+            ]
+
+        m.d.comb += parity_to_send.eq(~(parity_prev ^ (next_send_control | next_escape)))
 
         with m.If(self.i_reset):
-            m.d.sync += [self.o_ready.eq(0), self.o_active.eq(0), parity_prev.eq(0)]
+            m.d.sync += [near_end.eq(0), self.o_active.eq(0), parity_prev.eq(0), escaped.eq(0)]
+            if self._preload:
+                m.d.sync += [self.o_ready.eq(0), pending.eq(0)]
 
         with m.FSM() as fsm:
             with m.State("WAIT"):
-                with m.If(~self.i_reset & (self.i_send_control | self.i_send_data)):
+                with m.If(~self.i_reset & (next_send_control | next_send_data)):
                     m.d.sync += [
-                        char_to_send.eq(self.i_input),
-                        self.o_ready.eq(0),
+                        near_end.eq(0),
                         counter.eq(1),
                         self.o_output.eq(parity_to_send),
-                        send_control.eq(self.i_send_control),
                         self.o_active.eq(1),
                         parity_prev.eq(0),
                     ]
+                    with m.If(next_escape):
+                        # Send the ESC now and the character right after it
+                        m.d.sync += [
+                            char_to_send.eq(CHAR_ESC[0:-1]),
+                            send_control.eq(1),
+                            escaped.eq(1),
+                            escaped_input.eq(next_input),
+                            escaped_send_control.eq(next_send_control),
+                        ]
+                    with m.Else():
+                        m.d.sync += [
+                            char_to_send.eq(next_input),
+                            send_control.eq(next_send_control),
+                            escaped.eq(0),
+                        ]
+                    if self._preload:
+                        # Loading from the holding register frees it, loading
+                        # from the inputs acknowledges them
+                        with m.If(~escaped):
+                            m.d.sync += [
+                                pending.eq(0),
+                                self.o_ready.eq(pending),
+                            ]
                     m.next = "SEND_TYPE"
                 with m.Else():
-                    m.d.sync += [self.o_ready.eq(1), self.o_active.eq(0)]
+                    m.d.sync += [near_end.eq(1), self.o_active.eq(0)]
+                    if self._preload:
+                        m.d.sync += self.o_ready.eq(1)
 
-                with m.If(self.i_send_control):
+                with m.If(next_send_control | next_escape):
                     m.d.sync += counter_limit.eq(4)
                 with m.Else():
                     m.d.sync += counter_limit.eq(10)
@@ -90,8 +197,8 @@ class DSOutputCharSR(Elaboratable):
 
                 with m.If(self.i_reset):
                     m.next = "WAIT"
-                with m.Elif(counter == (counter_limit - 3)):
-                    m.d.sync += self.o_ready.eq(1)
+                with m.Elif(counter == (counter_limit - near_end_offset)):
+                    m.d.sync += near_end.eq(1)
                     m.next = "SEND_CONTENT"
                 with m.Else():
                     m.next = "SEND_CONTENT"
@@ -108,16 +215,172 @@ class DSOutputCharSR(Elaboratable):
                         parity_prev.eq(parity_prev ^ char_to_send[0])
                     ]
 
-                with m.If(counter == (counter_limit - 3)):
-                    m.d.sync += self.o_ready.eq(1)
+                with m.If(counter == (counter_limit - near_end_offset)):
+                    m.d.sync += near_end.eq(1)
                 with m.Elif(counter == (counter_limit - 1)):
                     m.next = "WAIT"
+
+        m.d.comb += self.o_boundary.eq(fsm.ongoing("SEND_TYPE") | ~self.o_active)
+
+        if self._preload:
+            # Store the next character while the current one is being sent
+            with m.If(~self.i_reset & ~fsm.ongoing("WAIT") & ~pending):
+                with m.If(self.o_ready & (self.i_send_control | self.i_send_data)):
+                    m.d.sync += [
+                        pending.eq(1),
+                        pending_input.eq(self.i_input),
+                        pending_send_control.eq(self.i_send_control),
+                        pending_escape.eq(self.i_escape),
+                        self.o_ready.eq(0),
+                    ]
+                with m.Else():
+                    m.d.sync += self.o_ready.eq(1)
+
+        return m
+
+    def ports(self):
+        return [
+            self.i_reset, self.i_input, self.i_send_data, self.i_send_control,
+            self.i_escape,
+            self.o_output, self.o_ready, self.o_active, self.o_starving,
+            self.o_boundary
+        ]
+
+
+class DSOutputWordSR(Elaboratable):
+    """Shift register that outputs several bits of data-chars and control-chars
+    per clock cycle.
+
+    Characters are appended whole to a bit buffer, with their parity bit, and
+    up to ``width`` bits are taken from it in each clock cycle. A character is
+    accepted in the same cycle it is offered, while ``o_ready`` is asserted. As
+    with ``DSOutputCharSR``, an escape sequence is loaded at once with
+    ``i_escape``.
+
+    Parameters
+    ----------
+    width : int
+        Maximum number of bits output per clock cycle.
+
+    Attributes
+    ----------
+    i_reset : Signal(1), in
+        Soft reset
+    i_input : Signal(8), in
+        Character to be sent next, can be a data-char or a control-char. If a
+        control char is sent, only the two LSBs are read.
+    i_send_data : Signal(1), in
+        Indication that a data-char needs to be sent next.
+    i_send_control : Signal(1), in
+        Indication that a control-char needs to be sent next.
+    i_escape : Signal(1), in
+        Indication that the character needs to be preceded by an ESC. Read
+        along with ``i_send_data`` or ``i_send_control``.
+    i_take : Signal(range(width + 1)), in
+        Number of bits to take from the buffer in this cycle.
+    o_output : Signal(width), out
+        Next bits of the buffer, first bit in bit 0. Only the ``i_take`` LSBs
+        are taken, and only when ``o_taken`` is asserted.
+    o_taken : Signal(1), out
+        Indication that the buffer holds at least ``i_take`` bits, which are
+        then taken.
+    o_ready : Signal(1), out
+        Indication that a character offered in this cycle is accepted.
+    o_starving : Signal(1), out
+        Indication that the buffer could run out of bits in the next cycle,
+        unless a character is accepted in this one.
+    """
+    def __init__(self, width):
+        self.i_reset = Signal()
+        self.i_input = Signal(8)
+        self.i_send_data = Signal()
+        self.i_send_control = Signal()
+        self.i_escape = Signal()
+        self.i_take = Signal(range(width + 1))
+        self.o_output = Signal(width)
+        self.o_taken = Signal()
+        self.o_ready = Signal()
+        self.o_starving = Signal()
+
+        self._width = width
+
+    def elaborate(self, platform):
+        m = Module()
+
+        # Room for the longest sequence (ESC and a data-char) on top of the
+        # bits of one cycle
+        size = 14 + self._width
+
+        buf = Signal(size)
+        level = Signal(range(size + 1))
+        remaining = Signal(range(size + 1))
+        # Parity of the content bits of the last character loaded
+        parity_prev = Signal()
+
+        # Character and escape sequence to load, with their parity bits
+        control = Signal()
+        char_bits = Signal(10)
+        char_length = Signal(range(11))
+        seq = Signal(14)
+        seq_length = Signal(range(15))
+
+        m.d.comb += [
+            self.o_output.eq(buf[0:self._width]),
+            self.o_taken.eq(level >= self.i_take),
+            remaining.eq(Mux(self.o_taken, level - self.i_take, level)),
+            self.o_ready.eq(~self.i_reset & (remaining <= size - 14)),
+            self.o_starving.eq(remaining < self._width),
+
+            control.eq(self.i_send_control),
+        ]
+
+        # The ESC content bits have an even parity
+        parity_char = Mux(self.i_escape, ~control, ~(parity_prev ^ control))
+        parity_esc = ~(parity_prev ^ 1)
+
+        with m.If(control):
+            m.d.comb += [
+                char_bits.eq(Cat(parity_char, 1, self.i_input[0:2])),
+                char_length.eq(4),
+            ]
+        with m.Else():
+            m.d.comb += [
+                char_bits.eq(Cat(parity_char, 0, self.i_input)),
+                char_length.eq(10),
+            ]
+
+        with m.If(self.i_escape):
+            m.d.comb += [
+                seq.eq(Cat(parity_esc, 1, CHAR_ESC[0:2], char_bits)),
+                seq_length.eq(char_length + 4),
+            ]
+        with m.Else():
+            m.d.comb += [
+                seq.eq(char_bits),
+                seq_length.eq(char_length),
+            ]
+
+        with m.If(self.i_reset):
+            m.d.sync += [buf.eq(0), level.eq(0), parity_prev.eq(0)]
+        with m.Elif(self.o_ready & (self.i_send_data | self.i_send_control)):
+            m.d.sync += [
+                buf.eq(Mux(self.o_taken, buf >> self.i_take, buf) | (seq << remaining)),
+                level.eq(remaining + seq_length),
+                parity_prev.eq(Mux(control, self.i_input[0:2].xor(), self.i_input.xor())),
+            ]
+        with m.Else():
+            m.d.sync += [
+                buf.eq(Mux(self.o_taken, buf >> self.i_take, buf)),
+                level.eq(remaining),
+            ]
+
         return m
 
     def ports(self):
         return [
             self.i_reset, self.i_input, self.i_send_data, self.i_send_control,
-            self.o_output, self.o_ready, self.o_active
+            self.i_escape, self.i_take,
+            self.o_output, self.o_taken, self.o_ready, self.o_starving
         ]
 
 
@@ -166,15 +429,17 @@ class DSInputCharSR(Elaboratable):
         m = Module()
         size = self.o_char.shape().width
 
-        parities = Signal(self._size - 3)
+        # Parity chain from the last bit received, so that its first stage is
+        # the parity of the control character in the last four bits
+        self._parities = parities = Signal(self._size - 3)
 
         # Bits 0 and 1 are not used to compute parity (parity itself and
         # data/control bit)
-        m.d.comb += parities[0].eq(self.o_char[2] ^ self.o_char[3])
+        m.d.comb += parities[0].eq(self.o_char[size - 1] ^ self.o_char[size - 2])
         # - 4 accounts for parity bit, data/control bit and the already-used
         # bits on the previous line
         for i in range(self._size - 4):
-            m.d.comb += parities[i + 1].eq(parities[i] ^ self.o_char[i + 4])
+            m.d.comb += parities[i + 1].eq(parities[i] ^ self.o_char[size - 3 - i])
         m.d.comb += self.o_parity_next.eq(parities[-1])
 
         with m.If(self.i_reset):
@@ -276,3 +541,84 @@ class DSInputDataCharSR(DSInputCharSR):
         return super().ports() + [
             self.o_detected,
         ]
+
+
+class DSInputUnifiedCharSR(DSInputCharSR):
+    __doc__=DSInputCharSR._doc_template.format(
+    description="""
+    Shift register that stores the serialized input and decodes both data and
+    control characters.
+
+    The last four bits stored are the ones of ``DSInputControlCharSR``, so a
+    single register and a single parity chain replace a
+    ``DSInputControlCharSR`` and a ``DSInputDataCharSR`` fed with the same
+    bits.
+    """.strip(),
+    parameters="",
+    i_attributes="",
+    o_attributes="""
+    o_control_char : Signal(4), out
+        The last four bits stored, as ``o_char`` of ``DSInputControlCharSR``.
+    o_control_parity_next : Signal(1), out
+        Computed parity of the control character in ``o_control_char``.
+    o_detected_fct : Signal(1), out
+        Indication that an FCT control symbol has been detected in
+        ``o_control_char``.
+    o_detected_eop : Signal(1), out
+        Indication that an EOP control symbol has been detected in
+        ``o_control_char``.
+    o_detected_eep : Signal(1), out
+        Indication that an EEP control symbol has been detected in
+        ``o_control_char``.
+    o_detected_esc : Signal(1), out
+        Indication that an ESC control symbol has been detected in
+        ``o_control_char``.
+    o_detected_control : Signal(1), out
+        Indication that a control symbol has been detected in
+        ``o_control_char``.
+    o_detected_data : Signal(1), out
+        Indication that a data character has been detected in ``o_char``.
+    """,
+    )
+
+    def __init__(self):
+        super().__init__(10)
+        self.o_control_char = Signal(4)
+        self.o_control_parity_next = Signal()
+        self.o_detected_fct = Signal()
+        self.o_detected_eop = Signal()
+        self.o_detected_eep = Signal()
+        self.o_detected_esc = Signal()
+        self.o_detected_control = Signal()
+        self.o_detected_data = Signal()
+
+    def elaborate(self, platform):
+        m = super().elaborate(platform)
+
+        m.d.comb += [
+            self.o_control_char.eq(self.o_char[6:10]),
+            self.o_control_parity_next.eq(self._parities[0]),
+            self.o_detected_control.eq(self.o_detected_eep | self.o_detected_eop | self.o_detected_esc | self.o_detected_fct),
+        ]
+
+        with m.Switch(self.o_control_char):
+            with m.Case(DS_CHAR_FCT_MATCHER):
+                m.d.comb += self.o_detected_fct.eq(1)
+            with m.Case(DS_CHAR_EOP_NORMAL_MATCHER):
+                m.d.comb += self.o_detected_eop.eq(1)
+            with m.Case(DS_CHAR_EOP_ERROR_MATCHER):
+                m.d.comb += self.o_detected_eep.eq(1)
+            with m.Case(DS_CHAR_ESC_MATCHER):
+                m.d.comb += self.o_detected_esc.eq(1)
+
+        with m.If(self.o_char.matches(DS_CHAR_DATA_MATCHER)):
+            m.d.comb += self.o_detected_data.eq(1)
+
+        return m
+
+    def ports(self):
+        return super().ports() + [
+            self.o_control_char, self.o_control_parity_next,
+            self.o_detected_fct, self.o_detected_eop, self.o_detected_eep,
+            self.o_detected_esc, self.o_detected_control, self.o_detected_data
+        ]
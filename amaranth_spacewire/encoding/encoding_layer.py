@@ -2,12 +2,29 @@ from amaranth import *
 
 from amaranth_spacewire.encoding.transmitter import Transmitter
 from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.encoding.rate_monitor import _rate_shapes
+from amaranth_spacewire.misc.clock_divider import _divisor
 
 class EncodingLayer(Elaboratable):
     def __init__(self, srcfreq,
                  rstfreq=Transmitter.TX_FREQ_RESET,
                  txfreq=Transmitter.TX_FREQ_RESET,
-                 disconnect_delay=850e-9):
+                 disconnect_delay=850e-9,
+                 tx_streaming=False,
+                 tx_single_clock=False,
+                 tx_programmable_divisor=False,
+                 tx_fractional_divider=False,
+                 tx_ddr=False,
+                 tx_clock_bank=None,
+                 tx_serializer_width=None,
+                 rx_recovered_clock=False,
+                 rx_input_width=None,
+                 rx_early_release=False,
+                 rx_sync_stages=2,
+                 rx_chars_per_cycle=1,
+                 timebase_freq=None,
+                 rx_rate_window=None,
+                 rx_glitch_filter=None):
 
         # Signals for the Data Link layer
         # TX
@@ -18,6 +35,9 @@ class EncodingLayer(Elaboratable):
         self.send_fct = Signal()
         self.sent_fct = Signal()
         self.sent_null = Signal()
+        self.send_time = Signal()
+        self.time = Signal(8)
+        self.sent_time = Signal()
         self.tx_ready = Signal()
 
         # RX
@@ -32,27 +52,95 @@ class EncodingLayer(Elaboratable):
         self.read_error = Signal()
         self.esc_error = Signal()
         self.disconnect_error = Signal()
+        if rx_early_release:
+            # Indication that the parity of the last character received is
+            # valid, with the characters output before it is checked
+            self.parity_valid = Signal()
+        if rx_chars_per_cycle > 1:
+            # Number of FCTs and N-Chars received in the clock cycle, and the
+            # N-Chars, first one in bits 0 to 8
+            self.got_fcts = Signal(range(rx_chars_per_cycle + 1))
+            self.got_n_chars = Signal(range(rx_chars_per_cycle + 1))
+            self.rx_chars = Signal(9 * rx_chars_per_cycle)
+        if rx_rate_window is not None:
+            # Incoming rate measured over the last window: bits received,
+            # shortest and longest clock cycles between bits, and indication
+            # of a new measurement
+            bits_shape, period_shape = _rate_shapes(srcfreq, rx_rate_window, rx_input_width or 1)
+            self.rx_rate_bits = Signal(bits_shape)
+            self.rx_rate_min_period = Signal(period_shape)
+            self.rx_rate_max_period = Signal(period_shape)
+            self.rx_rate_update = Signal()
         
         # Signals for the Physical Layer
         self.data_output = Signal()
         self.strobe_output = Signal()
+        if tx_ddr:
+            # First and second half of the next clock cycle, for DDR outputs
+            self.data_output_ddr = Signal(2)
+            self.strobe_output_ddr = Signal(2)
+        if tx_serializer_width is not None:
+            # Line slots of the next clock cycle, for serializing outputs
+            self.data_output_word = Signal(tx_serializer_width)
+            self.strobe_output_word = Signal(tx_serializer_width)
         self.data_input = Signal()
         self.strobe_input = Signal()
+        if rx_input_width is not None:
+            # Samples of the previous clock cycle, for DDR or deserializing
+            # input buffers
+            self.data_input_word = Signal(rx_input_width)
+            self.strobe_input_word = Signal(rx_input_width)
         
         # Signals for the MIB
         self.tx_switch_freq = Signal()
+        if tx_programmable_divisor:
+            self.tx_divisor = Signal(range(int(srcfreq // Transmitter.MIN_TX_FREQ_USER) + 1),
+                                     reset=round(_divisor(srcfreq, txfreq)))
+        if timebase_freq is not None:
+            # Strobe of the ``Timebase`` counted by the disconnect delay
+            self.timebase_tick = Signal()
 
         # Internals
         self._srcfreq = srcfreq
         self._rstfreq = rstfreq
         self._txfreq = txfreq
         self._disconnect_delay = disconnect_delay
+        self._tx_streaming = tx_streaming
+        self._tx_single_clock = tx_single_clock
+        self._tx_programmable_divisor = tx_programmable_divisor
+        self._tx_fractional_divider = tx_fractional_divider
+        self._tx_ddr = tx_ddr
+        self._tx_clock_bank = tx_clock_bank
+        self._tx_serializer_width = tx_serializer_width
+        self._rx_recovered_clock = rx_recovered_clock
+        self._rx_input_width = rx_input_width
+        self._rx_early_release = rx_early_release
+        self._rx_sync_stages = rx_sync_stages
+        self._rx_chars_per_cycle = rx_chars_per_cycle
+        self._timebase_freq = timebase_freq
+        self._rx_rate_window = rx_rate_window
+        self._rx_glitch_filter = rx_glitch_filter
         
     def elaborate(self, platform):
         m = Module()
 
-        m.submodules.tx = tx = Transmitter(self._srcfreq, self._rstfreq, self._txfreq)
-        m.submodules.rx = rx = Receiver(self._srcfreq, self._disconnect_delay)
+        m.submodules.tx = tx = Transmitter(self._srcfreq, self._rstfreq, self._txfreq,
+                                           streaming=self._tx_streaming,
+                                           single_clock=self._tx_single_clock,
+                                           programmable_divisor=self._tx_programmable_divisor,
+                                           fractional_divider=self._tx_fractional_divider,
+                                           ddr=self._tx_ddr,
+                                           clock_bank=self._tx_clock_bank,
+                                           serializer_width=self._tx_serializer_width)
+        m.submodules.rx = rx = Receiver(self._srcfreq, self._disconnect_delay,
+                                        recovered_clock=self._rx_recovered_clock,
+                                        input_width=self._rx_input_width,
+                                        early_release=self._rx_early_release,
+                                        sync_stages=self._rx_sync_stages,
+                                        chars_per_cycle=self._rx_chars_per_cycle,
+                                        timebase_freq=self._timebase_freq,
+                                        rate_window=self._rx_rate_window,
+                                        glitch_filter=self._rx_glitch_filter)
         
         m.d.comb += [
             rx.data.eq(self.data_input),
@@ -64,6 +152,8 @@ class EncodingLayer(Elaboratable):
             tx.char.eq(self.tx_char),
             tx.send.eq(self.send),
             tx.send_fct.eq(self.send_fct),
+            tx.send_time.eq(self.send_time),
+            tx.time.eq(self.time),
 
             self.got_fct.eq(rx.got_fct),
             self.got_esc.eq(rx.got_esc),
@@ -80,13 +170,56 @@ class EncodingLayer(Elaboratable):
             self.sent_n_char.eq(tx.sent_n_char),
             self.sent_fct.eq(tx.sent_fct),
             self.sent_null.eq(tx.sent_null),
+            self.sent_time.eq(tx.sent_time),
             self.tx_ready.eq(tx.ready),
         ]
 
+        if self._tx_programmable_divisor:
+            m.d.comb += tx.user_tx_divisor.eq(self.tx_divisor)
+
+        if self._tx_ddr:
+            m.d.comb += [
+                self.data_output_ddr.eq(tx.data_ddr),
+                self.strobe_output_ddr.eq(tx.strobe_ddr),
+            ]
+
+        if self._tx_serializer_width is not None:
+            m.d.comb += [
+                self.data_output_word.eq(tx.data_word),
+                self.strobe_output_word.eq(tx.strobe_word),
+            ]
+
+        if self._rx_input_width is not None:
+            m.d.comb += [
+                rx.data_word.eq(self.data_input_word),
+                rx.strobe_word.eq(self.strobe_input_word),
+            ]
+
+        if self._rx_early_release:
+            m.d.comb += self.parity_valid.eq(rx.parity_valid)
+
+        if self._timebase_freq is not None:
+            m.d.comb += rx.timebase_tick.eq(self.timebase_tick)
+
+        if self._rx_rate_window is not None:
+            m.d.comb += [
+                self.rx_rate_bits.eq(rx.rate_bits),
+                self.rx_rate_min_period.eq(rx.rate_min_period),
+                self.rx_rate_max_period.eq(rx.rate_max_period),
+                self.rx_rate_update.eq(rx.rate_update),
+            ]
+
+        if self._rx_chars_per_cycle > 1:
+            m.d.comb += [
+                self.got_fcts.eq(rx.fcts),
+                self.got_n_chars.eq(rx.n_chars),
+                self.rx_chars.eq(rx.chars),
+            ]
+
         return m
     
     def ports(self):
-        return [
+        ports = [
             self.tx_enable,
             self.tx_char,
             self.send,
@@ -94,6 +227,9 @@ class EncodingLayer(Elaboratable):
             self.send_fct,
             self.sent_fct,
             self.sent_null,
+            self.send_time,
+            self.time,
+            self.sent_time,
             self.tx_ready,
             self.rx_enable,
             self.got_fct,
@@ -111,4 +247,21 @@ class EncodingLayer(Elaboratable):
             self.data_input,
             self.strobe_input,
             self.tx_switch_freq,
-        ]
\ No newline at end of file
+        ]
+        if self._tx_programmable_divisor:
+            ports.append(self.tx_divisor)
+        if self._tx_ddr:
+            ports += [self.data_output_ddr, self.strobe_output_ddr]
+        if self._tx_serializer_width is not None:
+            ports += [self.data_output_word, self.strobe_output_word]
+        if self._rx_input_width is not None:
+            ports += [self.data_input_word, self.strobe_input_word]
+        if self._rx_early_release:
+            ports.append(self.parity_valid)
+        if self._rx_chars_per_cycle > 1:
+            ports += [self.got_fcts, self.got_n_chars, self.rx_chars]
+        if self._timebase_freq is not None:
+            ports.append(self.timebase_tick)
+        if self._rx_rate_window is not None:
+            ports += [self.rx_rate_bits, self.rx_rate_min_period, self.rx_rate_max_period, self.rx_rate_update]
+        return ports
\ No newline at end of file
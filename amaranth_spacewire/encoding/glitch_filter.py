@@ -0,0 +1,51 @@
+from amaranth import *
+
+
+class GlitchFilter(Elaboratable):
+    """Remove the pulses shorter than ``width`` clock cycles from a signal.
+
+    The output only takes the value of the input once it was stable for
+    ``width`` consecutive clock cycles, so every change is delayed by
+    ``width`` cycles, and pulses of the input shorter than that are dropped.
+
+    Parameters
+    ----------
+    width : int
+        Minimum pulse width, in clock cycles.
+
+    Attributes
+    ----------
+    i : Signal(1), in
+        Input signal.
+    o : Signal(1), out
+        Filtered signal.
+    latency : int
+        Clock cycles added to each change of the signal.
+    """
+    def __init__(self, width):
+        if width < 1:
+            raise ValueError("The minimum pulse width must be at least one clock cycle")
+
+        self.i = Signal()
+        self.o = Signal()
+        self.latency = width
+
+        self._width = width
+
+    def elaborate(self, platform):
+        m = Module()
+
+        # Clock cycles for which the input has differed from the output
+        count = Signal(range(self._width))
+
+        with m.If(self.i == self.o):
+            m.d.sync += count.eq(0)
+        with m.Elif(count == self._width - 1):
+            m.d.sync += [count.eq(0), self.o.eq(self.i)]
+        with m.Else():
+            m.d.sync += count.eq(count + 1)
+
+        return m
+
+    def ports(self):
+        return [self.i, self.o]
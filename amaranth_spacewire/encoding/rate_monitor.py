@@ -0,0 +1,131 @@
+from amaranth import *
+
+
+def _window_cycles(srcfreq, window):
+    """Number of clock cycles in a measurement window of ``window`` seconds."""
+    window_cycles = round(window * srcfreq)
+    if window_cycles < 2:
+        raise ValueError("The measurement window must span at least two clock cycles")
+    return window_cycles
+
+
+def _rate_shapes(srcfreq, window, bits_per_cycle=1):
+    """Shapes of the bit count and of the periods measured by a
+    ``RateMonitor``."""
+    window_cycles = _window_cycles(srcfreq, window)
+    return range(window_cycles * bits_per_cycle + 1), range(window_cycles + 1)
+
+
+class RateMonitor(Elaboratable):
+    """Measure the rate of the incoming bits.
+
+    The bits received are counted over consecutive windows of ``window``
+    seconds, along with the shortest and longest time between two clock cycles
+    in which bits were received. The incoming rate is ``o_bits / window``, and
+    ``srcfreq / o_max_period`` to ``srcfreq / o_min_period`` when at most one
+    bit is received per clock cycle.
+
+    Parameters
+    ----------
+    srcfreq : int
+        The main core frequency in Hz.
+    window : float
+        Measurement window in seconds.
+    bits_per_cycle : int
+        Maximum number of bits received per clock cycle.
+
+    Attributes
+    ----------
+    i_reset : Signal(1), in
+        Reset signal, clearing the measurements.
+    i_bits : Signal(range(bits_per_cycle + 1)), in
+        Number of bits received in the clock cycle.
+    o_update : Signal(1), out
+        Indication that the measurements were updated at the end of a window.
+    o_bits : Signal, out
+        Number of bits received in the last window.
+    o_min_period : Signal, out
+        Shortest number of clock cycles between two clock cycles with bits in
+        the last window, or 0 if there were not two of them.
+    o_max_period : Signal, out
+        Longest number of clock cycles between two clock cycles with bits in
+        the last window, or 0 if there were not two of them.
+    window_cycles : int
+        Number of clock cycles in a window.
+    """
+    def __init__(self, srcfreq, window, bits_per_cycle=1):
+        self.window_cycles = _window_cycles(srcfreq, window)
+        bits_shape, period_shape = _rate_shapes(srcfreq, window, bits_per_cycle)
+
+        self.i_reset = Signal()
+        self.i_bits = Signal(range(bits_per_cycle + 1))
+        self.o_update = Signal()
+        self.o_bits = Signal(bits_shape)
+        self.o_min_period = Signal(period_shape)
+        self.o_max_period = Signal(period_shape)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        cycle = Signal(range(self.window_cycles))
+        bits = Signal.like(self.o_bits)
+        min_period = Signal.like(self.o_min_period, reset=self.window_cycles)
+        max_period = Signal.like(self.o_max_period)
+        # Clock cycles since the last one with bits, 0 before the first one,
+        # kept across windows
+        since = Signal(range(self.window_cycles + 1))
+        # A period ends in this cycle
+        got_period = Signal()
+
+        m.d.comb += got_period.eq((self.i_bits != 0) & (since != 0))
+
+        # Periods and bits, including the ones of the last cycle of the window
+        min_next = Mux(got_period & (since < min_period), since, min_period)
+        max_next = Mux(got_period & (since > max_period), since, max_period)
+        bits_next = bits + self.i_bits
+
+        with m.If(self.i_reset):
+            m.d.sync += [
+                cycle.eq(0),
+                bits.eq(0),
+                min_period.eq(min_period.reset),
+                max_period.eq(0),
+                since.eq(0),
+                self.o_update.eq(0),
+                self.o_bits.eq(0),
+                self.o_min_period.eq(0),
+                self.o_max_period.eq(0),
+            ]
+        with m.Else():
+            with m.If(self.i_bits != 0):
+                m.d.sync += since.eq(1)
+            with m.Elif((since != 0) & (since != self.window_cycles)):
+                m.d.sync += since.eq(since + 1)
+
+            with m.If(cycle == self.window_cycles - 1):
+                m.d.sync += [
+                    cycle.eq(0),
+                    bits.eq(0),
+                    min_period.eq(min_period.reset),
+                    max_period.eq(0),
+                    self.o_update.eq(1),
+                    self.o_bits.eq(bits_next),
+                    self.o_min_period.eq(Mux(max_next == 0, 0, min_next)),
+                    self.o_max_period.eq(max_next),
+                ]
+            with m.Else():
+                m.d.sync += [
+                    cycle.eq(cycle + 1),
+                    bits.eq(bits_next),
+                    min_period.eq(min_next),
+                    max_period.eq(max_next),
+                    self.o_update.eq(0),
+                ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.i_reset, self.i_bits, self.o_update, self.o_bits,
+            self.o_min_period, self.o_max_period
+        ]
@@ -1,9 +1,13 @@
 from amaranth import *
 from amaranth.lib.cdc import FFSynchronizer
 
-from amaranth_spacewire.encoding.ds_shift_registers import DSInputControlCharSR, DSInputDataCharSR
+from amaranth_spacewire.encoding.ds_shift_registers import DSInputUnifiedCharSR
 from amaranth_spacewire.encoding.ds_decoder import DSDecoder
+from amaranth_spacewire.encoding.ds_recovered_clock_decoder import DSRecoveredClockDecoder
+from amaranth_spacewire.encoding.ds_sample_decoder import DSSampleDecoder
 from amaranth_spacewire.encoding.ds_store_enable import DSStoreEnable
+from amaranth_spacewire.encoding.glitch_filter import GlitchFilter
+from amaranth_spacewire.encoding.rate_monitor import RateMonitor, _rate_shapes
 from amaranth_spacewire.encoding.spw_disconnect_detector import SpWDisconnectDetector
 from amaranth_spacewire.misc.constants import *
 
@@ -17,6 +21,40 @@ class Receiver(Elaboratable):
         The main core frequency in Hz.
     disconnect_delay : int
         The link disconnect delay in seconds.
+    recovered_clock : bool
+        Shift the bits in with a clock recovered from the Data/Strobe pair
+        instead of oversampling them in the ``sync`` domain, so that the link
+        rate can be higher than half the core frequency. See
+        ``DSRecoveredClockDecoder``.
+    input_width : int
+        Number of samples of the Data/Strobe pair per clock cycle, 2, 4 or 8,
+        taken by DDR or deserializing input buffers. The link rate can then be
+        up to ``input_width`` times the core frequency. See
+        ``DSSampleDecoder`` and ``SerDesInput``.
+    early_release : bool
+        Output each character as soon as its last bit is received, before its
+        parity is checked with the header of the next character. The verdict
+        follows on ``parity_valid`` or ``parity_error``.
+    sync_stages : int
+        Number of synchronization stages on the Data/Strobe inputs. A single
+        register can be used when the platform captures the inputs in IO
+        registers, trading MTBF for latency.
+    chars_per_cycle : int
+        Number of characters output per clock cycle with the sampled inputs.
+        At least one character per four samples is required, so 2 with an
+        ``input_width`` of 8.
+    timebase_freq : int
+        If set, the disconnect delay counts the strobes of a ``Timebase`` at
+        this frequency on ``timebase_tick``.
+    rate_window : float
+        If set, measure the incoming bit rate over windows of this many
+        seconds. See ``RateMonitor``. Not available with the recovered clock.
+    glitch_filter : int
+        If set, drop the pulses on the Data and Strobe inputs shorter than
+        this many clock cycles, after their synchronization. See
+        ``GlitchFilter``. Bits must then last longer than that, and the
+        ``latency`` grows by as many cycles. Only available with the
+        oversampling front-end.
 
     Attributes
     ----------
@@ -51,9 +89,16 @@ class Receiver(Elaboratable):
     o_disconnect_error : Signal(1), out
         Indication that a Disconnect Error was detected.
     """
-    def __init__(self, srcfreq, disconnect_delay=850e-9):
+    def __init__(self, srcfreq, disconnect_delay=850e-9, recovered_clock=False, input_width=None,
+                 early_release=False, sync_stages=2, chars_per_cycle=1, timebase_freq=None,
+                 rate_window=None, glitch_filter=None):
         self.data = Signal()
         self.strobe = Signal()
+        if input_width is not None:
+            # Samples taken during the previous clock cycle, first one in bit
+            # 0, replacing ``data`` and ``strobe``
+            self.data_word = Signal(input_width)
+            self.strobe_word = Signal(input_width)
         self.enable = Signal()
         self.got_fct = Signal()
         self.got_esc = Signal()
@@ -65,17 +110,165 @@ class Receiver(Elaboratable):
         self.read_error = Signal()
         self.esc_error = Signal()
         self.disconnect_error = Signal()
+        if early_release:
+            # Indication that the parity of the last character output is valid
+            self.parity_valid = Signal()
+        if chars_per_cycle > 1:
+            # Number of Data characters, EOPs and EEPs received, the characters
+            # themselves, first one in bits 0 to 8, and number of Flow Control
+            # Tokens received. ``got_n_char`` and ``got_fct`` are asserted when
+            # at least one was received, ``char`` holds the Timecode or the
+            # first character.
+            self.n_chars = Signal(range(chars_per_cycle + 1))
+            self.chars = Signal(9 * chars_per_cycle)
+            self.fcts = Signal(range(chars_per_cycle + 1))
+        if timebase_freq is not None:
+            # Strobe of the ``Timebase`` counted by the disconnect delay
+            self.timebase_tick = Signal()
+        if rate_window is not None:
+            # Incoming rate measured over the last window: bits received,
+            # shortest and longest clock cycles between bits, and indication
+            # of a new measurement
+            bits_shape, period_shape = _rate_shapes(srcfreq, rate_window, input_width or 1)
+            self.rate_bits = Signal(bits_shape)
+            self.rate_min_period = Signal(period_shape)
+            self.rate_max_period = Signal(period_shape)
+            self.rate_update = Signal()
 
         self._srcfreq = srcfreq
         self._disconnect_delay = disconnect_delay
+        self._recovered_clock = recovered_clock
+        self._input_width = input_width
+        self._early_release = early_release
+        self._sync_stages = sync_stages
+        self._chars_per_cycle = chars_per_cycle
+        self._timebase_freq = timebase_freq
+        self._rate_window = rate_window
+        self._glitch_filter = glitch_filter
+
+        if sync_stages < 1:
+            raise ValueError("At least one synchronization stage is required")
+
+        self.latency = Receiver.latency_for(recovered_clock, input_width, sync_stages, glitch_filter)
+        if recovered_clock and input_width is not None:
+            raise ValueError("The recovered clock and the sampled inputs cannot be used together")
+        if early_release and (recovered_clock or input_width is not None):
+            raise ValueError("The early release requires the oversampling front-end")
+        if glitch_filter is not None and (recovered_clock or input_width is not None):
+            raise ValueError("The glitch filter requires the oversampling front-end")
+        if rate_window is not None and recovered_clock:
+            raise ValueError("The rate cannot be measured with the recovered clock")
+        if chars_per_cycle > 1 and input_width is None:
+            raise ValueError("Several characters per clock cycle require the sampled inputs")
+        if input_width is not None and 4 * chars_per_cycle < input_width:
+            raise ValueError("At least {0} characters per clock cycle are required with {1} samples".format(
+                input_width // 4, input_width))
 
     def elaborate(self, platform):
         m = Module()
+
+        if self._recovered_clock or self._input_width is not None:
+            m.submodules.disc = disc = self._disconnect_detector(m)
+
+            if self._recovered_clock:
+                m.submodules.decoder = decoder = DSRecoveredClockDecoder()
+
+                # Bit activity for the disconnect detection: transitions seen
+                # in the sync domain, or received characters when the link rate
+                # is too high for the former
+                data = Signal()
+                strobe = Signal()
+                data_prev = Signal()
+                strobe_prev = Signal()
+
+                m.submodules += self._synchronizer(self.data, data)
+                m.submodules += self._synchronizer(self.strobe, strobe)
+                m.d.sync += [data_prev.eq(data), strobe_prev.eq(strobe)]
+
+                m.d.comb += [
+                    decoder.i_d.eq(self.data),
+                    decoder.i_s.eq(self.strobe),
+                    disc.i_store_en.eq((data != data_prev) | (strobe != strobe_prev) | decoder.o_valid),
+                ]
+            else:
+                m.submodules.decoder = decoder = DSSampleDecoder(self._input_width, self._chars_per_cycle)
+
+                m.d.comb += [
+                    decoder.i_d.eq(self.data_word),
+                    decoder.i_s.eq(self.strobe_word),
+                    disc.i_store_en.eq(decoder.o_activity),
+                ]
+                self._measure_rate(m, decoder.o_bits)
+
+            m.d.comb += [
+                decoder.i_reset.eq(~self.enable),
+                disc.i_reset.eq(~self.enable),
+                self.disconnect_error.eq(disc.o_disconnected),
+            ]
+
+            m.d.sync += [
+                self.got_n_char.eq(0),
+                self.got_fct.eq(0),
+                self.got_esc.eq(0),
+                self.got_null.eq(0),
+                self.got_bc.eq(0)
+            ]
+            if self._chars_per_cycle > 1:
+                m.d.sync += [self.n_chars.eq(0), self.fcts.eq(0)]
+
+            # The Timecode, or else the first character decoded in the cycle
+            char = Signal(9)
+            for k in reversed(range(self._chars_per_cycle)):
+                with m.If(decoder.o_got_n_char[k]):
+                    m.d.comb += char.eq(decoder.o_char.word_select(k, 9))
+            for k in reversed(range(self._chars_per_cycle)):
+                with m.If(decoder.o_got_bc[k]):
+                    m.d.comb += char.eq(decoder.o_char.word_select(k, 9))
+
+            with m.If(~self.enable):
+                m.d.sync += [
+                    self.char.eq(0),
+                    self.parity_error.eq(0),
+                    self.read_error.eq(0),
+                    self.esc_error.eq(0)
+                ]
+            with m.Else():
+                if self._recovered_clock:
+                    # A lost character is reported as a read error
+                    with m.If(decoder.o_overflow):
+                        m.d.sync += self.read_error.eq(1)
+                with m.If(decoder.o_valid.any()):
+                    m.d.sync += [
+                        self.got_n_char.eq(decoder.o_got_n_char.any()),
+                        self.got_fct.eq(decoder.o_got_fct.any()),
+                        self.got_esc.eq(decoder.o_got_esc.any()),
+                        self.got_null.eq(decoder.o_got_null.any()),
+                        self.got_bc.eq(decoder.o_got_bc.any()),
+                        self.parity_error.eq(decoder.o_parity_error.any()),
+                        self.esc_error.eq(decoder.o_esc_error.any()),
+                    ]
+                    with m.If(decoder.o_got_n_char.any() | decoder.o_got_bc.any()):
+                        m.d.sync += self.char.eq(char)
+                    if self._chars_per_cycle > 1:
+                        # Pack the characters, lanes holding an ESC or a
+                        # control code being skipped
+                        position = C(0, range(self._chars_per_cycle + 1))
+                        for k in range(self._chars_per_cycle):
+                            for j in range(k + 1):
+                                with m.If(decoder.o_got_n_char[k] & (position == j)):
+                                    m.d.sync += self.chars.word_select(j, 9).eq(decoder.o_char.word_select(k, 9))
+                            position = position + decoder.o_got_n_char[k]
+                        m.d.sync += [
+                            self.n_chars.eq(position),
+                            self.fcts.eq(sum(decoder.o_got_fct[k] for k in range(self._chars_per_cycle))),
+                        ]
+
+            return m
+
         m.submodules.ds_decoder = decoder = DSDecoder()
         m.submodules.store_en = store_en = DSStoreEnable()
-        m.submodules.control_sr = control_sr = DSInputControlCharSR()
-        m.submodules.data_sr = data_sr = DSInputDataCharSR()
-        m.submodules.disc = disc = SpWDisconnectDetector(self._srcfreq, self._disconnect_delay)
+        m.submodules.char_sr = char_sr = DSInputUnifiedCharSR()
+        m.submodules.disc = disc = self._disconnect_detector(m)
 
         # Counter used to read 4 by 4 the shift register output.
         counter = Signal(4)
@@ -131,25 +324,33 @@ class Receiver(Elaboratable):
                 self.esc_error.eq(0)
             ]
 
-        m.submodules += FFSynchronizer(self.data, decoder.i_d, reset=0)
-        m.submodules += FFSynchronizer(self.strobe, decoder.i_s, reset=0)
+        if self._glitch_filter is None:
+            m.submodules += self._synchronizer(self.data, decoder.i_d)
+            m.submodules += self._synchronizer(self.strobe, decoder.i_s)
+        else:
+            m.submodules.filter_d = filter_d = GlitchFilter(self._glitch_filter)
+            m.submodules.filter_s = filter_s = GlitchFilter(self._glitch_filter)
+            m.submodules += self._synchronizer(self.data, filter_d.i)
+            m.submodules += self._synchronizer(self.strobe, filter_s.i)
+            m.d.comb += [
+                decoder.i_d.eq(filter_d.o),
+                decoder.i_s.eq(filter_s.o),
+            ]
 
         m.d.comb += [
             store_en.i_reset.eq(~self.enable),
             store_en.i_d.eq(decoder.o_d),
             store_en.i_clk_ddr.eq(decoder.o_clk_ddr),
-            control_sr.i_reset.eq(~self.enable),
-            control_sr.i_input.eq(store_en.o_d),
-            control_sr.i_store.eq(store_en.o_store_en),
-            data_sr.i_reset.eq(~self.enable),
-            data_sr.i_input.eq(store_en.o_d),
-            data_sr.i_store.eq(store_en.o_store_en),
-            parity_control_next.eq(control_sr.o_parity_next),
-            parity_data_next.eq(data_sr.o_parity_next),
+            char_sr.i_reset.eq(~self.enable),
+            char_sr.i_input.eq(store_en.o_d),
+            char_sr.i_store.eq(store_en.o_store_en),
+            parity_control_next.eq(char_sr.o_control_parity_next),
+            parity_data_next.eq(char_sr.o_parity_next),
             disc.i_store_en.eq(store_en.o_store_en),
             disc.i_reset.eq(~self.enable),
             self.disconnect_error.eq(disc.o_disconnected)
         ]
+        self._measure_rate(m, store_en.o_store_en)
 
         m.d.comb += [
             counter_full.eq(counter == counter_limit)
@@ -164,6 +365,8 @@ class Receiver(Elaboratable):
             self.got_null.eq(0),
             self.got_bc.eq(0)
         ]
+        if self._early_release:
+            m.d.sync += self.parity_valid.eq(0)
 
         # Manage counter
         with m.If(~self.enable):
@@ -179,22 +382,62 @@ class Receiver(Elaboratable):
         with m.Else():
             m.d.sync += counter.eq(counter)
 
+        def release(char_type, control_char, data_char):
+            # Output a character once its parity is checked, or as soon as it
+            # is stored with the early release
+            with m.If(char_type):
+                with m.Switch(control_char):
+                    with m.Case("001-"):
+                        with m.If(prev_got_esc):
+                            m.d.sync += [self.got_null.eq(1), prev_got_esc.eq(0)]
+                        with m.Else():
+                            m.d.sync += [self.got_fct.eq(1), prev_got_eop.eq(0), prev_got_eep.eq(0)]
+                    with m.Case("101-"):
+                        with m.If(prev_got_esc):
+                            m.d.sync += [self.esc_error.eq(1)]
+                            m.next = "ERROR"
+                        with m.Else():
+                            m.d.sync += [self.got_n_char.eq(1), prev_got_eop.eq(1), prev_got_eep.eq(0)]
+                            m.d.sync += self.char.eq(CHAR_EOP)
+                    with m.Case("011-"):
+                        with m.If(prev_got_esc):
+                            m.d.sync += [self.esc_error.eq(1)]
+                            m.next = "ERROR"
+                        with m.Else():
+                            m.d.sync += [self.got_n_char.eq(1), prev_got_eep.eq(1), prev_got_eop.eq(0)]
+                            m.d.sync += self.char.eq(CHAR_EEP)
+                    with m.Case("111-"):
+                        with m.If(prev_got_esc):
+                            m.d.sync += [self.esc_error.eq(1)]
+                            m.next = "ERROR"
+                        with m.Else():
+                            m.d.sync += [self.got_esc.eq(1), prev_got_esc.eq(1), prev_got_eep.eq(0), prev_got_eop.eq(0)]
+            with m.Else():
+                with m.If(prev_got_esc):
+                    m.d.sync += [self.got_bc.eq(1), prev_got_esc.eq(0)]
+                with m.Else():
+                    m.d.sync += self.got_n_char.eq(1)
+                m.d.sync += self.char.eq(Cat(data_char, char_type))
+                m.d.sync += [prev_got_eop.eq(0), prev_got_eep.eq(0)]
+
         # Start expecting a control char ESC
         with m.FSM() as fsm:
             with m.State("SYNC"):
-                with m.If(self.enable & control_sr.o_detected_esc):
+                with m.If(self.enable & char_sr.o_detected_esc):
                     m.d.sync += [
                         counter.eq(0),
                         parity_prev.eq(parity_control_next),
-                        prev_control_char_wait_parity.eq(control_sr.o_char),
+                        prev_control_char_wait_parity.eq(char_sr.o_control_char),
                         prev_char_type.eq(1)
                     ]
                     m.next = "READ_HEADER"
+                    if self._early_release:
+                        release(C(1), char_sr.o_control_char, prev_data_char_wait_parity)
             with m.State("READ_HEADER"):
                 with m.If(~self.enable):
                     m.next = "SYNC"
                 with m.Elif(counter == 2):
-                    with m.If(control_sr.o_char[3] == 1):
+                    with m.If(char_sr.o_control_char[3] == 1):
                         m.next = "READ_CONTROL_CHAR"
                         m.d.sync += counter_limit.eq(4)
                     with m.Else():
@@ -202,41 +445,11 @@ class Receiver(Elaboratable):
                         m.d.sync += counter_limit.eq(10)
 
                     # This XOR operation needs to be 1 to have a valid parity
-                    with m.If((parity_prev ^ control_sr.o_char[2]) ^ control_sr.o_char[3]):
-                        with m.If(prev_char_type):
-                            with m.Switch(prev_control_char_wait_parity):
-                                with m.Case("001-"):
-                                    with m.If(prev_got_esc):
-                                        m.d.sync += [self.got_null.eq(1), prev_got_esc.eq(0)]
-                                    with m.Else():
-                                        m.d.sync += [self.got_fct.eq(1), prev_got_eop.eq(0), prev_got_eep.eq(0)]
-                                with m.Case("101-"):
-                                    with m.If(prev_got_esc):
-                                        m.d.sync += [self.esc_error.eq(1)]
-                                        m.next = "ERROR"
-                                    with m.Else():
-                                        m.d.sync += [self.got_n_char.eq(1), prev_got_eop.eq(1), prev_got_eep.eq(0)]
-                                        m.d.sync += self.char.eq(CHAR_EOP)
-                                with m.Case("011-"):
-                                    with m.If(prev_got_esc):
-                                        m.d.sync += [self.esc_error.eq(1)]
-                                        m.next = "ERROR"
-                                    with m.Else():
-                                        m.d.sync += [self.got_n_char.eq(1), prev_got_eep.eq(1), prev_got_eop.eq(0)]
-                                        m.d.sync += self.char.eq(CHAR_EEP)
-                                with m.Case("111-"):
-                                    with m.If(prev_got_esc):
-                                        m.d.sync += [self.esc_error.eq(1)]
-                                        m.next = "ERROR"
-                                    with m.Else():
-                                        m.d.sync += [self.got_esc.eq(1), prev_got_esc.eq(1), prev_got_eep.eq(0), prev_got_eop.eq(0)]
-                        with m.Else():
-                            with m.If(prev_got_esc):
-                                m.d.sync += [self.got_bc.eq(1), prev_got_esc.eq(0)]
-                            with m.Else():
-                                m.d.sync += self.got_n_char.eq(1)
-                            m.d.sync += self.char.eq(Cat(prev_data_char_wait_parity, prev_char_type))
-                            m.d.sync += [prev_got_eop.eq(0), prev_got_eep.eq(0)]
+                    with m.If((parity_prev ^ char_sr.o_control_char[2]) ^ char_sr.o_control_char[3]):
+                        if self._early_release:
+                            m.d.sync += self.parity_valid.eq(1)
+                        else:
+                            release(prev_char_type, prev_control_char_wait_parity, prev_data_char_wait_parity)
                     with m.Else():
                         m.d.sync += [
                             self.parity_error.eq(1)
@@ -245,27 +458,31 @@ class Receiver(Elaboratable):
             with m.State("READ_CONTROL_CHAR"):
                 with m.If(~self.enable):
                     m.next = "SYNC"
-                with m.Elif(counter_full & control_sr.o_detected):
+                with m.Elif(counter_full & char_sr.o_detected_control):
                     m.d.sync += [
                         parity_prev.eq(parity_control_next),
-                        prev_control_char_wait_parity.eq(control_sr.o_char),
+                        prev_control_char_wait_parity.eq(char_sr.o_control_char),
                         prev_char_type.eq(1)
                     ]
                     m.next = "READ_HEADER"
-                with m.Elif(counter_full & ~control_sr.o_detected):
+                    if self._early_release:
+                        release(C(1), char_sr.o_control_char, prev_data_char_wait_parity)
+                with m.Elif(counter_full & ~char_sr.o_detected_control):
                     m.d.sync += self.read_error.eq(1)
                     m.next = "ERROR"
             with m.State("READ_DATA_CHAR"):
                 with m.If(~self.enable):
                     m.next = "SYNC"
-                with m.Elif(counter_full & data_sr.o_detected):
+                with m.Elif(counter_full & char_sr.o_detected_data):
                     m.d.sync += [
                         parity_prev.eq(parity_data_next),
-                        prev_data_char_wait_parity.eq(data_sr.o_char[2:10]),
+                        prev_data_char_wait_parity.eq(char_sr.o_char[2:10]),
                         prev_char_type.eq(0)
                     ]
                     m.next = "READ_HEADER"
-                with m.Elif(counter_full & ~control_sr.o_detected):
+                    if self._early_release:
+                        release(C(0), prev_control_char_wait_parity, char_sr.o_char[2:10])
+                with m.Elif(counter_full & ~char_sr.o_detected_control):
                     m.d.sync += self.read_error.eq(1)
                     m.next = "ERROR"
             with m.State("ERROR"):
@@ -274,10 +491,65 @@ class Receiver(Elaboratable):
 
         return m
 
+    def _disconnect_detector(self, m):
+        disc = SpWDisconnectDetector(self._srcfreq, self._disconnect_delay, timebase_freq=self._timebase_freq)
+        if self._timebase_freq is not None:
+            m.d.comb += disc.i_tick.eq(self.timebase_tick)
+        return disc
+
+    def _measure_rate(self, m, bits):
+        if self._rate_window is None:
+            return
+        m.submodules.rate_monitor = rate_monitor = RateMonitor(self._srcfreq, self._rate_window,
+                                                               bits_per_cycle=self._input_width or 1)
+        m.d.comb += [
+            rate_monitor.i_reset.eq(~self.enable),
+            rate_monitor.i_bits.eq(bits),
+            self.rate_bits.eq(rate_monitor.o_bits),
+            self.rate_min_period.eq(rate_monitor.o_min_period),
+            self.rate_max_period.eq(rate_monitor.o_max_period),
+            self.rate_update.eq(rate_monitor.o_update),
+        ]
+
+    def _synchronizer(self, i, o):
+        if self._sync_stages == 1:
+            m = Module()
+            m.d.sync += o.eq(i)
+            return m
+        return FFSynchronizer(i, o, reset=0, stages=self._sync_stages)
+
     def ports(self):
-        return [
+        ports = [
             self.data, self.strobe, self.enable, self.got_fct,
             self.got_esc, self.got_null, self.char,
             self.got_n_char, self.parity_error, self.read_error,
             self.esc_error, self.disconnect_error, self.got_bc
         ]
+        if self._input_width is not None:
+            ports += [self.data_word, self.strobe_word]
+        if self._early_release:
+            ports.append(self.parity_valid)
+        if self._chars_per_cycle > 1:
+            ports += [self.n_chars, self.chars, self.fcts]
+        if self._timebase_freq is not None:
+            ports.append(self.timebase_tick)
+        if self._rate_window is not None:
+            ports += [self.rate_bits, self.rate_min_period, self.rate_max_period, self.rate_update]
+        return ports
+
+    @staticmethod
+    def latency_for(recovered_clock=False, input_width=None, sync_stages=2, glitch_filter=None):
+        """Latency of a ``Receiver`` built with these parameters, available in
+        its ``latency`` attribute, in clock cycles. None with the recovered
+        clock and the sampled inputs.
+        """
+        if recovered_clock or input_width is not None:
+            return None
+        # Clock cycles from the edge ending the last bit needed to output a
+        # character (the data/control bit of the next character, or its own
+        # last bit with the early release) to its output: synchronization,
+        # edge detection (3), shift register and character detection
+        latency = sync_stages + 5
+        if glitch_filter is not None:
+            latency += glitch_filter
+        return latency
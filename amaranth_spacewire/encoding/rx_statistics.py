@@ -0,0 +1,126 @@
+from amaranth import *
+
+
+class RxStatistics(Elaboratable):
+    """Count the characters received and the receive errors.
+
+    The counters saturate, and are only cleared with ``i_clear``, so that they
+    are kept over the link resets caused by the errors. Each error is counted
+    once, when it is raised.
+
+    The error rate is estimated over blocks of one million characters: at the
+    end of each block, the number of errors seen during it is available in
+    ``o_errors_per_million``.
+
+    Parameters
+    ----------
+    max_chars_per_cycle : int
+        Maximum number of characters received per clock cycle.
+
+    Attributes
+    ----------
+    i_clear : Signal(1), in
+        Clear all the counters.
+    i_chars : Signal(range(max_chars_per_cycle + 1)), in
+        Number of characters received in the clock cycle.
+    i_parity_error : Signal(1), in
+        Parity error, held until the receiver is reset.
+    i_esc_error : Signal(1), in
+        Escape error, held until the receiver is reset.
+    i_read_error : Signal(1), in
+        Read error, held until the receiver is reset.
+    i_disconnect_error : Signal(1), in
+        Disconnect error, held until the receiver is reset.
+    o_chars : Signal(CHARS_WIDTH), out
+        Number of characters received.
+    o_parity_errors : Signal(ERRORS_WIDTH), out
+        Number of parity errors.
+    o_esc_errors : Signal(ERRORS_WIDTH), out
+        Number of escape errors.
+    o_read_errors : Signal(ERRORS_WIDTH), out
+        Number of read errors.
+    o_disconnect_errors : Signal(ERRORS_WIDTH), out
+        Number of disconnect errors.
+    o_errors_per_million : Signal(ERRORS_WIDTH), out
+        Number of errors during the last block of one million characters.
+    """
+    CHARS_WIDTH = 32
+    ERRORS_WIDTH = 16
+    BLOCK = 1000000
+
+    def __init__(self, max_chars_per_cycle=1):
+        self.i_clear = Signal()
+        self.i_chars = Signal(range(max_chars_per_cycle + 1))
+        self.i_parity_error = Signal()
+        self.i_esc_error = Signal()
+        self.i_read_error = Signal()
+        self.i_disconnect_error = Signal()
+        self.o_chars = Signal(self.CHARS_WIDTH)
+        self.o_parity_errors = Signal(self.ERRORS_WIDTH)
+        self.o_esc_errors = Signal(self.ERRORS_WIDTH)
+        self.o_read_errors = Signal(self.ERRORS_WIDTH)
+        self.o_disconnect_errors = Signal(self.ERRORS_WIDTH)
+        self.o_errors_per_million = Signal(self.ERRORS_WIDTH)
+
+        self._max_chars_per_cycle = max_chars_per_cycle
+
+    def elaborate(self, platform):
+        m = Module()
+
+        def saturating_add(counter, value):
+            total = counter + value
+            return Mux(total > 2**len(counter) - 1, 2**len(counter) - 1, total)
+
+        # Errors raised in this cycle
+        errors = []
+        for error, counter in [(self.i_parity_error, self.o_parity_errors),
+                               (self.i_esc_error, self.o_esc_errors),
+                               (self.i_read_error, self.o_read_errors),
+                               (self.i_disconnect_error, self.o_disconnect_errors)]:
+            error_prev = Signal(name="{0}_prev".format(error.name))
+            raised = Signal(name="{0}_raised".format(error.name))
+            m.d.sync += error_prev.eq(error)
+            m.d.comb += raised.eq(error & ~error_prev)
+            with m.If(self.i_clear):
+                m.d.sync += counter.eq(0)
+            with m.Else():
+                m.d.sync += counter.eq(saturating_add(counter, raised))
+            errors.append(raised)
+        raised = sum(errors)
+
+        # Characters and errors of the current block
+        block_chars = Signal(range(self.BLOCK + self._max_chars_per_cycle))
+        block_errors = Signal(self.ERRORS_WIDTH)
+        block_chars_next = block_chars + self.i_chars
+        block_errors_next = saturating_add(block_errors, raised)
+
+        with m.If(self.i_clear):
+            m.d.sync += [
+                self.o_chars.eq(0),
+                block_chars.eq(0),
+                block_errors.eq(0),
+                self.o_errors_per_million.eq(0),
+            ]
+        with m.Else():
+            m.d.sync += self.o_chars.eq(saturating_add(self.o_chars, self.i_chars))
+            with m.If(block_chars_next >= self.BLOCK):
+                m.d.sync += [
+                    block_chars.eq(block_chars_next - self.BLOCK),
+                    block_errors.eq(0),
+                    self.o_errors_per_million.eq(block_errors_next),
+                ]
+            with m.Else():
+                m.d.sync += [
+                    block_chars.eq(block_chars_next),
+                    block_errors.eq(block_errors_next),
+                ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.i_clear, self.i_chars, self.i_parity_error, self.i_esc_error,
+            self.i_read_error, self.i_disconnect_error, self.o_chars,
+            self.o_parity_errors, self.o_esc_errors, self.o_read_errors,
+            self.o_disconnect_errors, self.o_errors_per_million
+        ]
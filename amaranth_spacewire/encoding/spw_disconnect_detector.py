@@ -15,6 +15,9 @@ class SpWDisconnectDetector(Elaboratable):
         The main core frequency in Hz.
     disconnect_delay : int
         The disconnect delay in seconds.
+    timebase_freq : int
+        If set, the delay counts the strobes of a ``Timebase`` at this
+        frequency on ``i_tick``. See ``SpWDelay``.
 
     Attributes
     ----------
@@ -22,22 +25,30 @@ class SpWDisconnectDetector(Elaboratable):
         Reset signal.
     i_store_en : Signal(1), in
         Indication that a bit was received.
+    i_tick : Signal(1), in
+        Strobe of the ``Timebase``. Only present with ``timebase_freq``.
     o_disconnected : Signal(1), out
         Indication that the ``disconnect_delay`` has elapsed without
         ``i_store_en`` being asserted.
     """
-    def __init__(self, srcfreq, disconnect_delay=850e-9):
+    def __init__(self, srcfreq, disconnect_delay=850e-9, timebase_freq=None):
         self.i_reset = Signal()
         self.i_store_en = Signal()
+        if timebase_freq is not None:
+            self.i_tick = Signal()
         self.o_disconnected = Signal()
 
         self._srcfreq = srcfreq
         self._disconnect_delay = disconnect_delay
+        self._timebase_freq = timebase_freq
 
     def elaborate(self, platform):
         m = Module()
 
-        m.submodules.delay = delay = SpWDelay(self._srcfreq, self._disconnect_delay, strategy='at_most')
+        m.submodules.delay = delay = SpWDelay(self._srcfreq, self._disconnect_delay, strategy='at_most',
+                                              tick_freq=self._timebase_freq, half=False)
+        if self._timebase_freq is not None:
+            m.d.comb += delay.i_tick.eq(self.i_tick)
 
         m.d.comb += [
             self.o_disconnected.eq(delay.o_elapsed)
@@ -62,4 +73,7 @@ class SpWDisconnectDetector(Elaboratable):
         return m
 
     def ports(self):
-        return [self.i_reset, self.i_store_en, self.o_disconnected]
+        ports = [self.i_reset, self.i_store_en, self.o_disconnected]
+        if self._timebase_freq is not None:
+            ports.append(self.i_tick)
+        return ports
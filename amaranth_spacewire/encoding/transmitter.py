@@ -1,8 +1,8 @@
 import enum
 from amaranth import *
-from amaranth_spacewire.encoding.ds_shift_registers import DSOutputCharSR
-from amaranth_spacewire.encoding.ds_encoder import DSEncoder
-from amaranth_spacewire.misc.clock_divider import ClockDivider
+from amaranth_spacewire.encoding.ds_shift_registers import DSOutputCharSR, DSOutputWordSR
+from amaranth_spacewire.encoding.ds_encoder import DSEncoder, DSWordEncoder
+from amaranth_spacewire.misc.clock_divider import ClockDivider, _divisor
 from amaranth_spacewire.misc.clock_mux import ClockMux
 from amaranth_spacewire.misc.constants import CHAR_ESC, CHAR_FCT, CHAR_EOP, CHAR_EEP
 from amaranth_spacewire.misc.states import TransmitterState
@@ -22,7 +22,9 @@ class Transmitter(Elaboratable):
     TX_FREQ_RESET = 10e6
     MIN_TX_FREQ_USER = 2e6
 
-    def __init__(self, srcfreq, rstfreq=TX_FREQ_RESET, txfreq=TX_FREQ_RESET):
+    def __init__(self, srcfreq, rstfreq=TX_FREQ_RESET, txfreq=TX_FREQ_RESET, streaming=False, single_clock=False,
+                 programmable_divisor=False, fractional_divider=False, ddr=False, clock_bank=None,
+                 serializer_width=None):
         self.data = Signal()
         self.strobe = Signal()
         self.enable = Signal()
@@ -33,28 +35,120 @@ class Transmitter(Elaboratable):
         self.send_fct = Signal()
         self.sent_fct = Signal()
         self.sent_null = Signal()
+        self.send_time = Signal()
+        # Time-code: time in bits 0 to 5, control flags in bits 6 and 7
+        self.time = Signal(8)
+        self.sent_time = Signal()
         self.ready = Signal()
 
         self._srcfreq = srcfreq
         self._rstfreq = rstfreq
         self._txfreq = txfreq
+        self._streaming = streaming
+        self._single_clock = single_clock
+        self._programmable_divisor = programmable_divisor
+        self._fractional_divider = fractional_divider
+        self._ddr = ddr
+        self._clock_bank = clock_bank
+        self._serializer_width = serializer_width
+
+        if ddr:
+            # Values output during the first ([0]) and the second ([1]) half of
+            # the next clock cycle, for DDR output buffers
+            self.data_ddr = Signal(2)
+            self.strobe_ddr = Signal(2)
+
+        if serializer_width is not None:
+            # Values of the ``serializer_width`` line slots of the next clock
+            # cycle, first one in bit 0, for serializing output buffers. At the
+            # user rate, ``txfreq`` can then be 1, 2, 4 or 8 times ``srcfreq``,
+            # and up to ``serializer_width`` bits are sent per cycle.
+            self.data_word = Signal(serializer_width)
+            self.strobe_word = Signal(serializer_width)
+
+        if programmable_divisor:
+            # Lowest user rate
+            self._max_divisor = int(srcfreq // Transmitter.MIN_TX_FREQ_USER)
+            # Source clock cycles per bit at the user rate. Applied at the next
+            # character boundary.
+            self.user_tx_divisor = Signal(range(self._max_divisor + 1), reset=round(_divisor(srcfreq, txfreq)))
+
+        if programmable_divisor and fractional_divider:
+            raise ValueError("The programmable divisor and the fractional divider cannot be used together")
+        if ddr and (not single_clock or programmable_divisor or fractional_divider):
+            raise ValueError("The DDR output requires the single clock transmitter, with a fixed integer divider")
+        if serializer_width is not None:
+            if serializer_width not in (4, 8):
+                raise ValueError("The serializer width must be 4 or 8")
+            if not single_clock or programmable_divisor or fractional_divider or ddr or clock_bank is not None:
+                raise ValueError("The serializer output requires the single clock transmitter, with its own fixed integer dividers")
+        if clock_bank is not None:
+            if not single_clock or programmable_divisor:
+                raise ValueError("A shared clock bank requires the single clock transmitter, without a programmable divisor")
+            if ((clock_bank._srcfreq, clock_bank._rstfreq, clock_bank._txfreq, clock_bank._fractional, clock_bank._ddr) !=
+                    (srcfreq, rstfreq, txfreq, fractional_divider, ddr)):
+                raise ValueError("The transmitter and the clock bank must use the same frequencies and dividers")
 
         if txfreq < Transmitter.MIN_TX_FREQ_USER:
             raise WrongSignallingRate("Signalling rate must be at least 2 Mb/s (provided {0} Mb/s)".format(txfreq/1e6))
+        elif ddr:
+            # One bit per source clock cycle at most, starting on either edge
+            if srcfreq < rstfreq or srcfreq < txfreq:
+                raise WrongSourceFrequency("The source frequency must be at least the transmit frequency with a DDR output. Expected > {0}, given {1}".format(max(rstfreq, txfreq), srcfreq))
         elif srcfreq < 2 * rstfreq:
             raise WrongSourceFrequency("The source frequency must be at least 2 times the reset transmit frequency. Expected > {0}, given {1}".format(2 * Transmitter.rstfreq, srcfreq))
+        elif serializer_width is not None and txfreq >= srcfreq:
+            # Bits per clock cycle at the user rate
+            if txfreq % srcfreq or serializer_width % (txfreq // srcfreq):
+                raise WrongSignallingRate("The transmit frequency must be 1, 2, 4 or 8 times the source frequency, up to {0} times with this serializer (provided {1} Mb/s)".format(serializer_width, txfreq/1e6))
         elif srcfreq < 2 * txfreq:
             raise WrongSourceFrequency("The source frequency must be at least 2 times the transmit frequency. Expected > {0}, given {1}".format(2 * txfreq, srcfreq))
 
     def elaborate(self, platform):
         m = Module()
 
-        m.submodules.tr_clk_reset = tr_clk_reset = ClockDivider(self._srcfreq, self._rstfreq)
-        m.submodules.tr_clk_user = tr_clk_user = ClockDivider(self._srcfreq, self._txfreq)
-        m.submodules.tr_clk_mux = tr_clk_mux = ClockMux()
-        m.domains.tx = ClockDomain("tx", local=True)
-        m.submodules.encoder = encoder = DomainRenamer("tx")(DSEncoder())
-        m.submodules.sr = sr = DomainRenamer("tx")(DSOutputCharSR())
+        if self._clock_bank is not None:
+            reset_stb = self._clock_bank.o_reset_stb
+            user_stb = self._clock_bank.o_user_stb
+            if self._ddr:
+                reset_stb_late = self._clock_bank.o_reset_stb_late
+                user_stb_late = self._clock_bank.o_user_stb_late
+        else:
+            m.submodules.tr_clk_reset = tr_clk_reset = ClockDivider(self._srcfreq, self._rstfreq, fractional=self._fractional_divider, ddr=self._ddr)
+            if self._ddr:
+                m.submodules.tr_clk_user = tr_clk_user = ClockDivider(self._srcfreq, self._txfreq, ddr=True)
+            elif self._serializer_width is not None and self._txfreq >= self._srcfreq:
+                # Bits are sent on every clock cycle
+                tr_clk_user = None
+            elif self._programmable_divisor:
+                m.submodules.tr_clk_user = tr_clk_user = ClockDivider(self._srcfreq, self._txfreq, max_divisor=self._max_divisor)
+            else:
+                m.submodules.tr_clk_user = tr_clk_user = ClockDivider(self._srcfreq, self._txfreq, fractional=self._fractional_divider)
+
+            reset_stb = tr_clk_reset.o_stb
+            user_stb = tr_clk_user.o_stb if tr_clk_user is not None else C(1)
+            if self._ddr:
+                reset_stb_late = tr_clk_reset.o_stb_late
+                user_stb_late = tr_clk_user.o_stb_late
+
+        if self._serializer_width is not None:
+            # Bit rate enable for the shift register, which takes 1 bit at the
+            # reset rate and ``user_bits`` at the user rate
+            tx_stb = Signal()
+            user_bits = max(1, int(self._txfreq // self._srcfreq))
+            m.submodules.encoder = encoder = DSWordEncoder(self._serializer_width)
+            m.submodules.sr = sr = DSOutputWordSR(self._serializer_width)
+        elif self._single_clock:
+            # Bit rate enable for the encoder and the shift register, which run
+            # in the sync domain
+            tx_stb = Signal()
+            m.submodules.encoder = encoder = EnableInserter(tx_stb)(DSEncoder())
+            m.submodules.sr = sr = EnableInserter(tx_stb)(DSOutputCharSR(preload=self._streaming))
+        else:
+            m.submodules.tr_clk_mux = tr_clk_mux = ClockMux()
+            m.domains.tx = ClockDomain("tx", local=True)
+            m.submodules.encoder = encoder = DomainRenamer("tx")(DSEncoder())
+            m.submodules.sr = sr = DomainRenamer("tx")(DSOutputCharSR(preload=self._streaming))
 
         parity_control = Signal()
         parity_data = Signal()
@@ -64,115 +158,220 @@ class Transmitter(Elaboratable):
         encoder_reset_feedback_2 = Signal()
 
         m.d.comb += [
-            encoder.i_d.eq(sr.o_output),
             encoder.i_reset.eq(encoder_reset),
-            encoder.i_en.eq(sr.o_active),
             sr.i_reset.eq(encoder_reset),
-            self.data.eq(encoder.o_d),
-            self.strobe.eq(encoder.o_s),
-            tr_clk_mux.i_sel.eq(self.switch_user_tx_freq),
-            tr_clk_mux.i_clk_a.eq(tr_clk_reset.o),
-            tr_clk_mux.i_clk_b.eq(tr_clk_user.o),
-            ClockSignal("tx").eq(tr_clk_mux.o_clk)
         ]
 
-        m.d.tx += [encoder_reset_feedback_1.eq(encoder_reset), encoder_reset_feedback_2.eq(encoder_reset_feedback_1)]
+        if self._serializer_width is not None:
+            m.d.comb += [
+                self.data_word.eq(encoder.o_d),
+                self.strobe_word.eq(encoder.o_s),
+                # Line levels at the end of the cycle
+                self.data.eq(encoder.o_d[-1]),
+                self.strobe.eq(encoder.o_s[-1]),
+            ]
+        else:
+            m.d.comb += [
+                encoder.i_d.eq(sr.o_output),
+                encoder.i_en.eq(sr.o_active),
+                self.data.eq(encoder.o_d),
+                self.strobe.eq(encoder.o_s),
+            ]
+
+        if self._single_clock:
+            # Strobe selection. The new rate is only applied on a strobe of the
+            # current one, and the first strobe of the new rate is dropped, so
+            # that no bit is shorter than expected.
+            tx_stb_sel = Signal()
+            tx_stb_switching = Signal()
+
+            m.d.comb += tx_stb.eq(Mux(tx_stb_sel, user_stb, reset_stb) & ~tx_stb_switching)
+
+            with m.If(tx_stb_switching):
+                with m.If(Mux(tx_stb_sel, user_stb, reset_stb)):
+                    m.d.sync += tx_stb_switching.eq(0)
+            with m.Elif(tx_stb & (tx_stb_sel != self.switch_user_tx_freq)):
+                m.d.sync += [
+                    tx_stb_sel.eq(self.switch_user_tx_freq),
+                    tx_stb_switching.eq(1),
+                ]
+
+            with m.If(tx_stb):
+                m.d.sync += [encoder_reset_feedback_1.eq(encoder_reset), encoder_reset_feedback_2.eq(encoder_reset_feedback_1)]
+
+            user_tx_freq_selected = tx_stb_sel
+
+            if self._ddr:
+                # A new bit starting in the second half of a cycle is preceded by
+                # the previous one during the first half
+                late = Signal()
+                data_prev = Signal()
+                strobe_prev = Signal()
+
+                m.d.sync += [
+                    late.eq(tx_stb & Mux(tx_stb_sel, user_stb_late, reset_stb_late)),
+                    data_prev.eq(encoder.o_d),
+                    strobe_prev.eq(encoder.o_s),
+                ]
+                m.d.comb += [
+                    self.data_ddr.eq(Cat(Mux(late, data_prev, encoder.o_d), encoder.o_d)),
+                    self.strobe_ddr.eq(Cat(Mux(late, strobe_prev, encoder.o_s), encoder.o_s)),
+                ]
+
+            if self._serializer_width is not None:
+                # Each bit spans ``slots_per_bit`` line slots at the user rate,
+                # and a whole cycle or more at the reset rate
+                slots_per_bit = self._serializer_width // user_bits
+
+                m.d.comb += sr.i_take.eq(Mux(tx_stb, Mux(tx_stb_sel, user_bits, 1), 0))
+
+                with m.If(tx_stb & sr.o_taken):
+                    with m.If(tx_stb_sel):
+                        m.d.comb += [
+                            encoder.i_d.eq(Cat(sr.o_output[i // slots_per_bit] for i in range(self._serializer_width))),
+                            encoder.i_new.eq(Cat(C(int(i % slots_per_bit == 0)) for i in range(self._serializer_width))),
+                        ]
+                    with m.Else():
+                        m.d.comb += [
+                            encoder.i_d.eq(sr.o_output[0]),
+                            encoder.i_new.eq(1),
+                        ]
+        else:
+            m.d.comb += [
+                tr_clk_mux.i_sel.eq(self.switch_user_tx_freq),
+                tr_clk_mux.i_clk_a.eq(tr_clk_reset.o),
+                tr_clk_mux.i_clk_b.eq(tr_clk_user.o),
+                ClockSignal("tx").eq(tr_clk_mux.o_clk)
+            ]
+
+            m.d.tx += [encoder_reset_feedback_1.eq(encoder_reset), encoder_reset_feedback_2.eq(encoder_reset_feedback_1)]
+
+            user_tx_freq_selected = self.switch_user_tx_freq
+
+        if self._programmable_divisor:
+            # Only change the user rate between two characters
+            m.d.comb += [
+                tr_clk_user.i_divisor.eq(self.user_tx_divisor),
+                tr_clk_user.i_update.eq(~user_tx_freq_selected | sr.o_boundary),
+            ]
 
         with m.If(~self.enable):
             m.d.sync += encoder_reset.eq(1)
         with m.Elif(encoder_reset_feedback_2):
             m.d.sync += encoder_reset.eq(0)
 
-        with m.FSM() as tr_fsm:
-            with m.State(TransmitterState.WAIT):
-                with m.If(self.enable & self.ready):
-                    with m.If(self.send_fct):
-                        m.d.sync += [
-                            sr.i_send_control.eq(1),
-                            sr.i_input.eq(CHAR_FCT[0:-1])
-                        ]
-                        m.d.comb += self.sent_fct.eq(1)
-                        m.next = TransmitterState.WAIT_TX_START_CONTROL
-                    with m.Elif(self.send):
-                        m.d.sync += [
-                            sr.i_send_data.eq(~self.char[-1]),
-                            sr.i_send_control.eq(self.char[-1]),
-                            sr.i_input.eq(self.char[0:-1])
-                        ]
-
-                        with m.If(self.char[-1]):
-                            m.next = TransmitterState.WAIT_TX_START_CONTROL
-                        with m.Else():
-                            m.next = TransmitterState.WAIT_TX_START_DATA
+        if self._serializer_width is not None:
+            # Characters are accepted in the cycle they are offered, with the
+            # same priorities as below
+            m.d.comb += self.ready.eq(sr.o_ready & encoder.o_ready & ~encoder_reset)
 
-                        m.d.comb += self.sent_n_char.eq(1)
-                    with m.Else():
-                        m.d.sync += [
-                            sr.i_send_control.eq(1),
-                            sr.i_input.eq(CHAR_ESC[0:-1])
-                        ]
-                        m.d.comb += self.sent_null.eq(1)
-                        m.next = TransmitterState.SEND_NULL_A
-            with m.State(TransmitterState.SEND_NULL_A):
-                with m.If(~self.enable):
-                    m.next = TransmitterState.WAIT
-                    m.d.sync += [
-                        sr.i_send_control.eq(0),
-                        sr.i_send_data.eq(0)
-                    ]
-                with m.Elif(~sr.o_ready):
-                    m.d.sync += sr.i_send_control.eq(0)
-                    m.next = TransmitterState.SEND_NULL_B
-            with m.State(TransmitterState.SEND_NULL_B):
-                with m.If(~self.enable):
-                    m.next = TransmitterState.WAIT
-                    m.d.sync += [
-                        sr.i_send_control.eq(0),
-                        sr.i_send_data.eq(0)
+            with m.If(self.enable & self.ready):
+                with m.If(self.send_time):
+                    m.d.comb += [
+                        sr.i_send_data.eq(1),
+                        sr.i_escape.eq(1),
+                        sr.i_input.eq(self.time),
+                        self.sent_time.eq(1),
                     ]
-                with m.Elif(sr.o_ready):
-                    m.d.sync += [
+                with m.Elif(self.send_fct):
+                    m.d.comb += [
                         sr.i_send_control.eq(1),
-                        sr.i_input.eq(CHAR_FCT[0:-1])
+                        sr.i_input.eq(CHAR_FCT[0:-1]),
+                        self.sent_fct.eq(1),
                     ]
-                    m.next = TransmitterState.SEND_NULL_C
-            with m.State(TransmitterState.SEND_NULL_C):
-                with m.If(~self.enable):
-                    m.next = TransmitterState.WAIT
-                    m.d.sync += [
-                        sr.i_send_control.eq(0),
-                        sr.i_send_data.eq(0)
+                with m.Elif(self.send):
+                    m.d.comb += [
+                        sr.i_send_data.eq(~self.char[-1]),
+                        sr.i_send_control.eq(self.char[-1]),
+                        sr.i_input.eq(self.char[0:-1]),
+                        self.sent_n_char.eq(1),
                     ]
-                with m.Elif(~sr.o_ready):
-                    m.d.sync += sr.i_send_control.eq(0)
-                    m.next = TransmitterState.WAIT
-            with m.State(TransmitterState.WAIT_TX_START_CONTROL):
-                with m.If(~self.enable):
-                    m.next = TransmitterState.WAIT
-                    m.d.sync += [
-                        sr.i_send_control.eq(0),
-                        sr.i_send_data.eq(0)
-                    ]
-                with m.Elif(~sr.o_ready):
-                    m.d.sync += sr.i_send_control.eq(0)
-                    m.next = TransmitterState.WAIT
-            with m.State(TransmitterState.WAIT_TX_START_DATA):
-                with m.If(~self.enable):
-                    m.next = TransmitterState.WAIT
-                    m.d.sync += [
-                        sr.i_send_control.eq(0),
-                        sr.i_send_data.eq(0)
+                with m.Elif(sr.o_starving):
+                    m.d.comb += [
+                        sr.i_send_control.eq(1),
+                        sr.i_escape.eq(1),
+                        sr.i_input.eq(CHAR_FCT[0:-1]),
+                        self.sent_null.eq(1),
                     ]
-                with m.Elif(~sr.o_ready):
-                    m.d.sync += sr.i_send_data.eq(0)
-                    m.next = TransmitterState.WAIT
+        else:
+            with m.FSM() as tr_fsm:
+                with m.State(TransmitterState.WAIT):
+                    with m.If(self.enable & self.ready):
+                        # Time-codes go before anything else
+                        with m.If(self.send_time):
+                            m.d.sync += [
+                                sr.i_send_data.eq(1),
+                                sr.i_escape.eq(1),
+                                sr.i_input.eq(self.time)
+                            ]
+                            m.d.comb += self.sent_time.eq(1)
+                            m.next = TransmitterState.WAIT_TX_START_DATA
+                        with m.Elif(self.send_fct):
+                            m.d.sync += [
+                                sr.i_send_control.eq(1),
+                                sr.i_input.eq(CHAR_FCT[0:-1])
+                            ]
+                            m.d.comb += self.sent_fct.eq(1)
+                            m.next = TransmitterState.WAIT_TX_START_CONTROL
+                        with m.Elif(self.send):
+                            m.d.sync += [
+                                sr.i_send_data.eq(~self.char[-1]),
+                                sr.i_send_control.eq(self.char[-1]),
+                                sr.i_input.eq(self.char[0:-1])
+                            ]
+
+                            with m.If(self.char[-1]):
+                                m.next = TransmitterState.WAIT_TX_START_CONTROL
+                            with m.Else():
+                                m.next = TransmitterState.WAIT_TX_START_DATA
+
+                            m.d.comb += self.sent_n_char.eq(1)
+                        # Fill with NULLs only when the shift register would
+                        # otherwise run out of characters
+                        with m.Elif(sr.o_starving):
+                            # ESC and FCT in a single load
+                            m.d.sync += [
+                                sr.i_send_control.eq(1),
+                                sr.i_escape.eq(1),
+                                sr.i_input.eq(CHAR_FCT[0:-1])
+                            ]
+                            m.d.comb += self.sent_null.eq(1)
+                            m.next = TransmitterState.WAIT_TX_START_CONTROL
+                with m.State(TransmitterState.WAIT_TX_START_CONTROL):
+                    with m.If(~self.enable):
+                        m.next = TransmitterState.WAIT
+                        m.d.sync += [
+                            sr.i_send_control.eq(0),
+                            sr.i_send_data.eq(0),
+                            sr.i_escape.eq(0)
+                        ]
+                    with m.Elif(~sr.o_ready):
+                        m.d.sync += [
+                            sr.i_send_control.eq(0),
+                            sr.i_escape.eq(0)
+                        ]
+                        m.next = TransmitterState.WAIT
+                with m.State(TransmitterState.WAIT_TX_START_DATA):
+                    with m.If(~self.enable):
+                        m.next = TransmitterState.WAIT
+                        m.d.sync += [
+                            sr.i_send_control.eq(0),
+                            sr.i_send_data.eq(0),
+                            sr.i_escape.eq(0)
+                        ]
+                    with m.Elif(~sr.o_ready):
+                        m.d.sync += [
+                            sr.i_send_data.eq(0),
+                            sr.i_escape.eq(0)
+                        ]
+                        m.next = TransmitterState.WAIT
 
-            m.d.comb += self.ready.eq(tr_fsm.ongoing(TransmitterState.WAIT) & sr.o_ready & encoder.o_ready & ~encoder_reset)
+                m.d.comb += self.ready.eq(tr_fsm.ongoing(TransmitterState.WAIT) & sr.o_ready & encoder.o_ready & ~encoder_reset)
 
         return m
 
     def ports(self):
-        return [
+        ports = [
             self.enable,
             self.switch_user_tx_freq,
             self.char,
@@ -180,7 +379,17 @@ class Transmitter(Elaboratable):
             self.send_fct,
             self.sent_fct,
             self.sent_null,
+            self.send_time,
+            self.time,
+            self.sent_time,
             self.ready,
             self.data,
             self.strobe,
         ]
+        if self._programmable_divisor:
+            ports.append(self.user_tx_divisor)
+        if self._ddr:
+            ports += [self.data_ddr, self.strobe_ddr]
+        if self._serializer_width is not None:
+            ports += [self.data_word, self.strobe_word]
+        return ports
@@ -0,0 +1,76 @@
+from amaranth import *
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.misc.clock_divider import ClockDivider
+
+
+class TxClockBank(Elaboratable):
+    """Reset and user bit rate strobes, shared by several transmitters.
+
+    Each transmitter built with ``single_clock`` normally has its own pair of
+    dividers. When several ports run from the same source clock at the same
+    rates, a single bank can feed all of them through the ``clock_bank``
+    parameter of ``Transmitter``, ``EncodingLayer`` and ``Node``. Each port still
+    selects the reset or the user rate on its own. The bank must be added once
+    as a submodule.
+
+    Parameters:
+    ----------
+    srcfreq : int
+        Source frequency in Hz.
+    rstfreq : int
+        Reset bit rate in Hz.
+    txfreq : int
+        User bit rate in Hz.
+    fractional : bool
+        Use fractional dividers.
+    ddr : bool
+        Build the strobes for transmitters with a DDR output.
+
+    Attributes
+    ----------
+    o_reset_stb : Signal(1), out
+        Reset bit rate strobe.
+    o_user_stb : Signal(1), out
+        User bit rate strobe.
+    o_reset_stb_late : Signal(1), out
+        Only present in DDR mode. Qualifies ``o_reset_stb``.
+    o_user_stb_late : Signal(1), out
+        Only present in DDR mode. Qualifies ``o_user_stb``.
+    """
+    def __init__(self, srcfreq, rstfreq=Transmitter.TX_FREQ_RESET, txfreq=Transmitter.TX_FREQ_RESET, fractional=False, ddr=False):
+        self.o_reset_stb = Signal()
+        self.o_user_stb = Signal()
+        if ddr:
+            self.o_reset_stb_late = Signal()
+            self.o_user_stb_late = Signal()
+
+        self._srcfreq = srcfreq
+        self._rstfreq = rstfreq
+        self._txfreq = txfreq
+        self._fractional = fractional
+        self._ddr = ddr
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.submodules.tr_clk_reset = tr_clk_reset = ClockDivider(self._srcfreq, self._rstfreq, fractional=self._fractional, ddr=self._ddr)
+        m.submodules.tr_clk_user = tr_clk_user = ClockDivider(self._srcfreq, self._txfreq, fractional=self._fractional, ddr=self._ddr)
+
+        m.d.comb += [
+            self.o_reset_stb.eq(tr_clk_reset.o_stb),
+            self.o_user_stb.eq(tr_clk_user.o_stb),
+        ]
+
+        if self._ddr:
+            m.d.comb += [
+                self.o_reset_stb_late.eq(tr_clk_reset.o_stb_late),
+                self.o_user_stb_late.eq(tr_clk_user.o_stb_late),
+            ]
+
+        return m
+
+    def ports(self):
+        ports = [self.o_reset_stb, self.o_user_stb]
+        if self._ddr:
+            ports += [self.o_reset_stb_late, self.o_user_stb_late]
+        return ports
@@ -0,0 +1,75 @@
+from amaranth import *
+from amaranth.lib.fifo import SyncFIFOBuffered
+
+
+class BypassFIFO(Elaboratable):
+    """``SyncFIFOBuffered`` whose written entry is readable in the same clock
+    cycle while it is empty.
+
+    An entry written to the empty FIFO is also presented on the read port,
+    and is not stored if it is read in the same clock cycle. Otherwise it is
+    stored, and available again once through the FIFO, so ``r_rdy`` may drop
+    in between. The entries are read in the order they are written.
+
+    Parameters:
+    ----------
+    width : int
+        Bit width of an entry.
+    depth : int
+        Number of entries.
+
+    Attributes
+    ----------
+    w_en : Signal(1), in
+        Write enable.
+    w_data : Signal(width), in
+        Entry to write.
+    w_rdy : Signal(1), out
+        Indication that an entry can be written.
+    r_en : Signal(1), in
+        Read enable.
+    r_data : Signal(width), out
+        Entry at the head of the FIFO, or the one written to the empty FIFO.
+    r_rdy : Signal(1), out
+        Indication that ``r_data`` is valid.
+    level : Signal(range(depth + 1)), out
+        Number of entries stored in the FIFO.
+    """
+    def __init__(self, width, depth):
+        self.w_en = Signal()
+        self.w_data = Signal(width)
+        self.w_rdy = Signal()
+        self.r_en = Signal()
+        self.r_data = Signal(width)
+        self.r_rdy = Signal()
+        self.level = Signal(range(depth + 1))
+
+        self._width = width
+        self._depth = depth
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.submodules.fifo = fifo = SyncFIFOBuffered(width=self._width, depth=self._depth)
+
+        bypass = Signal()
+        m.d.comb += [
+            bypass.eq(self.w_en & (fifo.level == 0)),
+
+            fifo.w_en.eq(self.w_en & ~(bypass & self.r_en)),
+            fifo.w_data.eq(self.w_data),
+            self.w_rdy.eq(fifo.w_rdy),
+
+            fifo.r_en.eq(self.r_en & fifo.r_rdy),
+            self.r_data.eq(Mux(fifo.r_rdy, fifo.r_data, self.w_data)),
+            self.r_rdy.eq(fifo.r_rdy | bypass),
+            self.level.eq(fifo.level),
+        ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.w_en, self.w_data, self.w_rdy, self.r_en, self.r_data,
+            self.r_rdy, self.level
+        ]
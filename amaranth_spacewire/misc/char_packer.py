@@ -0,0 +1,212 @@
+from amaranth import *
+from amaranth.lib.fifo import SyncFIFOBuffered
+
+from amaranth_spacewire.misc.wide_sync_fifo import WideSyncFIFO
+
+
+def _check_lanes(lanes):
+    if lanes < 2:
+        raise ValueError("A word must pack at least two characters")
+
+
+class CharPacker(Elaboratable):
+    """Pack the characters written one per clock cycle into words of ``lanes``
+    characters.
+
+    A word is complete when all its lanes are filled, or after an end of
+    packet marker, so that packets are not held back. A partial word is also
+    completed once no character was written for ``flush_timeout`` clock
+    cycles, so that it does not wait for characters which are not coming.
+
+    Parameters:
+    ----------
+    lanes : int
+        Number of characters in a word.
+    flush_timeout : int
+        Number of clock cycles without a written character after which a
+        partial word is completed. If ``None``, partial words are only
+        completed by an end of packet marker.
+
+    Attributes
+    ----------
+    w_en : Signal(1), in
+        Write enable.
+    w_data : Signal(9), in
+        Character to write: data byte, or end of packet marker with the high
+        bit set.
+    w_rdy : Signal(1), out
+        Indication that a character can be written.
+    r_en : Signal(1), in
+        Read enable.
+    r_data : Signal(8 * lanes), out
+        Data bytes of the word at the head, first character in the low bits.
+    r_valid : Signal(lanes), out
+        Valid lanes of the word at the head, the first ones.
+    r_eop : Signal(lanes), out
+        Lanes holding an end of packet marker, whose code is in ``r_data``.
+    r_rdy : Signal(1), out
+        Indication that a word is available.
+    """
+    def __init__(self, lanes, flush_timeout=None):
+        _check_lanes(lanes)
+        if flush_timeout is not None and flush_timeout < 1:
+            raise ValueError("The flush timeout must be at least one clock cycle")
+
+        self.w_en = Signal()
+        self.w_data = Signal(9)
+        self.w_rdy = Signal()
+        self.r_en = Signal()
+        self.r_data = Signal(8 * lanes)
+        self.r_valid = Signal(lanes)
+        self.r_eop = Signal(lanes)
+        self.r_rdy = Signal()
+
+        self._lanes = lanes
+        self._flush_timeout = flush_timeout
+
+    def elaborate(self, platform):
+        m = Module()
+        lanes = self._lanes
+
+        m.submodules.words = words = SyncFIFOBuffered(width=10 * lanes, depth=2)
+
+        # Word being packed
+        chars = Signal(9 * lanes)
+        count = Signal(range(lanes + 1))
+        ended = Signal()
+
+        full = Signal()
+        idle = Signal()
+        flush = Signal()
+        lane = Signal(range(lanes))
+
+        if self._flush_timeout is not None:
+            # Clock cycles since the last written character
+            idle_count = Signal(range(self._flush_timeout + 1))
+            with m.If(self.w_en & self.w_rdy):
+                m.d.sync += idle_count.eq(0)
+            with m.Elif(idle_count != self._flush_timeout):
+                m.d.sync += idle_count.eq(idle_count + 1)
+            m.d.comb += idle.eq(idle_count == self._flush_timeout)
+
+        m.d.comb += [
+            full.eq((count == lanes) | ended),
+            flush.eq((count != 0) & words.w_rdy & (full | idle)),
+            self.w_rdy.eq(~full | words.w_rdy),
+            lane.eq(Mux(flush, 0, count)),
+
+            words.w_en.eq(flush),
+            words.w_data.eq(Cat(chars, ((C(1, lanes + 1) << count) - 1)[:lanes])),
+        ]
+
+        with m.If(flush):
+            m.d.sync += [count.eq(0), ended.eq(0)]
+        with m.If(self.w_en & self.w_rdy):
+            m.d.sync += [
+                chars.word_select(lane, 9).eq(self.w_data),
+                count.eq(lane + 1),
+                ended.eq(self.w_data[8]),
+            ]
+
+        # Split the lanes of the word at the head
+        head = words.r_data
+        m.d.comb += [
+            words.r_en.eq(self.r_en),
+            self.r_rdy.eq(words.r_rdy),
+            self.r_valid.eq(head[9 * lanes:]),
+        ]
+        for i in range(lanes):
+            m.d.comb += [
+                self.r_data.word_select(i, 8).eq(head.word_select(i, 9)[:8]),
+                self.r_eop[i].eq(head.word_select(i, 9)[8]),
+            ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.w_en, self.w_data, self.w_rdy, self.r_en, self.r_data,
+            self.r_valid, self.r_eop, self.r_rdy
+        ]
+
+
+class CharUnpacker(Elaboratable):
+    """Unpack words of ``lanes`` characters into characters read one per clock
+    cycle.
+
+    The valid lanes of each word are read in order, and the others are
+    skipped. The characters are buffered in a ``WideSyncFIFO`` of two words.
+
+    Parameters:
+    ----------
+    lanes : int
+        Number of characters in a word.
+
+    Attributes
+    ----------
+    w_en : Signal(1), in
+        Write enable.
+    w_data : Signal(8 * lanes), in
+        Data bytes of the word, first character in the low bits.
+    w_valid : Signal(lanes), in
+        Lanes of the word to write.
+    w_eop : Signal(lanes), in
+        Lanes holding an end of packet marker, whose code is in ``w_data``.
+    w_rdy : Signal(1), out
+        Indication that a word can be written.
+    r_en : Signal(1), in
+        Read enable.
+    r_data : Signal(9), out
+        Character at the head: data byte, or end of packet marker with the
+        high bit set.
+    r_rdy : Signal(1), out
+        Indication that ``r_data`` is valid.
+    """
+    def __init__(self, lanes, flush_timeout=None):
+        _check_lanes(lanes)
+        if flush_timeout is not None and flush_timeout < 1:
+            raise ValueError("The flush timeout must be at least one clock cycle")
+
+        self.w_en = Signal()
+        self.w_data = Signal(8 * lanes)
+        self.w_valid = Signal(lanes)
+        self.w_eop = Signal(lanes)
+        self.w_rdy = Signal()
+        self.r_en = Signal()
+        self.r_data = Signal(9)
+        self.r_rdy = Signal()
+
+        self._lanes = lanes
+        self._flush_timeout = flush_timeout
+
+    def elaborate(self, platform):
+        m = Module()
+        lanes = self._lanes
+
+        m.submodules.fifo = fifo = WideSyncFIFO(9, 2 * lanes, lanes)
+
+        # Move the valid lanes to the first ones
+        packed = Signal(9 * lanes)
+        for i in range(lanes):
+            position = sum(self.w_valid[:i]) if i > 0 else C(0)
+            for j in range(i + 1):
+                with m.If(self.w_valid[i] & (position == j)):
+                    m.d.comb += packed.word_select(j, 9).eq(Cat(self.w_data.word_select(i, 8), self.w_eop[i]))
+
+        m.d.comb += [
+            fifo.w_count.eq(Mux(self.w_en & fifo.w_rdy, sum(self.w_valid), 0)),
+            fifo.w_data.eq(packed),
+            self.w_rdy.eq(fifo.w_rdy),
+
+            fifo.r_en.eq(self.r_en),
+            self.r_data.eq(fifo.r_data),
+            self.r_rdy.eq(fifo.r_rdy),
+        ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.w_en, self.w_data, self.w_valid, self.w_eop, self.w_rdy,
+            self.r_en, self.r_data, self.r_rdy
+        ]
@@ -0,0 +1,154 @@
+from amaranth import *
+
+from amaranth_spacewire.misc.constants import CHAR_EOP, CHAR_EEP
+
+
+class StreamToChars(Elaboratable):
+    """Turn a stream of packet bytes into the characters written one per clock
+    cycle to the link.
+
+    The stream follows the ``amaranth.lib`` stream conventions: a transfer
+    takes place when ``valid`` and ``ready`` are both asserted, and ``ready``
+    does not depend on ``valid``. The end of packet marker is written after
+    the byte with ``last`` asserted: an EEP if ``error`` is asserted with it,
+    an EOP otherwise.
+
+    Attributes
+    ----------
+    data : Signal(8), in
+        Packet byte.
+    last : Signal(1), in
+        Last byte of the packet.
+    error : Signal(1), in
+        Packet ended by an error, with ``last``.
+    valid : Signal(1), in
+        Indication that a byte is available.
+    ready : Signal(1), out
+        Indication that the byte is taken.
+    r_en : Signal(1), in
+        Read enable.
+    r_data : Signal(9), out
+        Character at the head.
+    r_rdy : Signal(1), out
+        Indication that ``r_data`` is valid.
+    """
+    def __init__(self):
+        self.data = Signal(8)
+        self.last = Signal()
+        self.error = Signal()
+        self.valid = Signal()
+        self.ready = Signal()
+        self.r_en = Signal()
+        self.r_data = Signal(9)
+        self.r_rdy = Signal()
+
+    def elaborate(self, platform):
+        m = Module()
+
+        # End of packet marker to write before the next byte
+        end_pending = Signal()
+        end_error = Signal()
+
+        m.d.comb += [
+            self.ready.eq(~end_pending & self.r_en),
+            self.r_rdy.eq(end_pending | self.valid),
+            self.r_data.eq(Mux(end_pending, Mux(end_error, CHAR_EEP, CHAR_EOP), self.data)),
+        ]
+
+        with m.If(end_pending):
+            with m.If(self.r_en):
+                m.d.sync += end_pending.eq(0)
+        with m.Elif(self.valid & self.ready & self.last):
+            m.d.sync += [end_pending.eq(1), end_error.eq(self.error)]
+
+        return m
+
+    def ports(self):
+        return [
+            self.data, self.last, self.error, self.valid, self.ready,
+            self.r_en, self.r_data, self.r_rdy
+        ]
+
+
+class CharsToStream(Elaboratable):
+    """Turn the characters read one per clock cycle from the link into a
+    stream of packet bytes.
+
+    Each byte is held until the next character is known, so that ``last`` is
+    asserted with the byte before an end of packet marker, and ``error`` too
+    if the marker is an EEP. Markers ending empty packets are dropped. The
+    stream is registered, and follows the ``amaranth.lib`` stream
+    conventions: ``valid`` does not depend on ``ready``.
+
+    Attributes
+    ----------
+    w_en : Signal(1), in
+        Write enable.
+    w_data : Signal(9), in
+        Character to write.
+    w_rdy : Signal(1), out
+        Indication that a character can be written.
+    data : Signal(8), out
+        Packet byte.
+    last : Signal(1), out
+        Last byte of the packet.
+    error : Signal(1), out
+        Packet ended by an EEP, with ``last``.
+    valid : Signal(1), out
+        Indication that a byte is available.
+    ready : Signal(1), in
+        Indication that the byte is taken.
+    """
+    def __init__(self):
+        self.w_en = Signal()
+        self.w_data = Signal(9)
+        self.w_rdy = Signal()
+        self.data = Signal(8)
+        self.last = Signal()
+        self.error = Signal()
+        self.valid = Signal()
+        self.ready = Signal()
+
+    def elaborate(self, platform):
+        m = Module()
+
+        # Byte waiting for the next character
+        held = Signal(8)
+        held_valid = Signal()
+
+        out_free = Signal()
+        m.d.comb += [
+            out_free.eq(~self.valid | self.ready),
+            self.w_rdy.eq(~held_valid | out_free),
+        ]
+
+        with m.If(self.ready):
+            m.d.sync += self.valid.eq(0)
+
+        with m.If(self.w_en & self.w_rdy):
+            with m.If(self.w_data[8]):
+                m.d.sync += held_valid.eq(0)
+                with m.If(held_valid):
+                    m.d.sync += [
+                        self.data.eq(held),
+                        self.last.eq(1),
+                        self.error.eq(self.w_data == CHAR_EEP),
+                        self.valid.eq(1),
+                    ]
+            with m.Else():
+                m.d.sync += [held.eq(self.w_data[:8]), held_valid.eq(1)]
+                with m.If(held_valid):
+                    m.d.sync += [
+                        self.data.eq(held),
+                        self.last.eq(0),
+                        self.error.eq(0),
+                        self.valid.eq(1),
+                    ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.w_en, self.w_data, self.w_rdy, self.data, self.last,
+            self.error, self.valid, self.ready
+        ]
@@ -8,15 +8,32 @@ def _divisor(freq_in, freq_out, max_ppm=None):
     """
     divisor = freq_in // freq_out
     if divisor <= 0:
-        raise ArgumentError("output frequency is too high")
+        raise ValueError("output frequency is too high")
 
     ppm = 1000000 * ((freq_in / divisor) - freq_out) / freq_out
     if max_ppm is not None and ppm > max_ppm:
-        raise ArgumentError("output frequency deviation is too high")
+        raise ValueError("output frequency deviation is too high")
 
     return divisor
 
 
+def _phase_increment(freq_in, freq_out, bits, max_ppm=None):
+    """Phase accumulator increment producing ``freq_out`` from ``freq_in`` with
+    a ``bits`` wide accumulator.
+
+    Returns the increment and the resulting frequency error, in ppm.
+    """
+    increment = round(freq_out * 2**bits / freq_in)
+    if increment <= 0 or increment > 2**(bits - 1):
+        raise ValueError("output frequency is out of range")
+
+    ppm = 1000000 * ((freq_in * increment / 2**bits) - freq_out) / freq_out
+    if max_ppm is not None and abs(ppm) > max_ppm:
+        raise ValueError("output frequency deviation is too high")
+
+    return increment, ppm
+
+
 class ClockDivider(Elaboratable):
     """Generate a clock from a base frequency.
 
@@ -25,28 +42,133 @@ class ClockDivider(Elaboratable):
     i_freq : int
         Source frequency in Hz.
     o_freq : int
-        Target frequency in Hz.
+        Target frequency in Hz. When the divisor is programmable, this is the
+        frequency used at reset.
+    max_divisor : int
+        If set, the divisor can be changed at runtime through ``i_divisor``, up
+        to this value.
+    fractional : bool
+        Use a phase accumulator instead of an integer divisor. The average
+        output frequency is then within ``ppm`` of ``o_freq``, at the cost of a
+        period jitter of one source clock cycle. Cannot be combined with
+        ``max_divisor``.
+    acc_bits : int
+        Width of the phase accumulator in fractional mode.
+    ddr : bool
+        Count in half source clock cycles, for outputs driven through DDR
+        buffers. The output frequency can then be up to ``i_freq``. Only
+        ``o_stb`` and ``o_stb_late`` are driven in this mode, and it cannot be
+        combined with ``max_divisor`` or ``fractional``.
 
     Attributes
     ----------
+    i_divisor : Signal(range(max_divisor + 1)), in
+        Runtime divisor, only present if ``max_divisor`` is set. A new value is
+        applied at the end of an output period, while ``i_update`` is asserted.
+        Values lower than 2 or greater than ``max_divisor`` are ignored.
+    i_update : Signal(1), in
+        Indication that ``i_divisor`` can be applied at the end of the current
+        output period. Only present if ``max_divisor`` is set.
     o : Signal(1), out
         Output clock signal.
+    o_stb : Signal(1), out
+        Strobe asserted during one source clock cycle per output period, in the
+        cycle where ``o`` rises. Meant to be used as a clock enable. In DDR
+        mode, asserted in the cycle before the one in which an output period
+        starts.
+    o_stb_late : Signal(1), out
+        Only present in DDR mode. Qualifies ``o_stb``: the output period starts
+        in the second half of the next cycle instead of the first half.
+    ppm : float
+        Deviation of the average output frequency from ``o_freq``, in ppm.
     """
-    def __init__(self, i_freq, o_freq):
+    def __init__(self, i_freq, o_freq, max_divisor=None, fractional=False, acc_bits=32, ddr=False):
         self.o = Signal()
+        self.o_stb = Signal()
         self._n = round(_divisor(i_freq, o_freq))
+        self._max_n = max_divisor
+        self._fractional = fractional
+        self._acc_bits = acc_bits
+        self._ddr = ddr
+
+        if ddr:
+            if max_divisor is not None or fractional:
+                raise ValueError("a DDR divider cannot be programmable or fractional")
+            self.o_stb_late = Signal()
+            # Divisor in half source clock cycles
+            self._n = round(_divisor(2 * i_freq, o_freq))
+            if self._n < 2:
+                raise ValueError("output frequency is too high")
+            self.ppm = 1000000 * ((2 * i_freq / self._n) - o_freq) / o_freq
+        elif fractional:
+            if max_divisor is not None:
+                raise ValueError("a fractional divider cannot be programmed at runtime")
+            self._increment, self.ppm = _phase_increment(i_freq, o_freq, acc_bits)
+        else:
+            self.ppm = 1000000 * ((i_freq / self._n) - o_freq) / o_freq
+
+        if max_divisor is not None:
+            if max_divisor < self._n:
+                raise ValueError("maximum divisor is lower than the reset divisor")
+            self.i_divisor = Signal(range(max_divisor + 1), reset=self._n)
+            self.i_update = Signal(reset=1)
 
     def elaborate(self, platform):
         m = Module()
 
-        counter = Signal(bits_for(self._n - 1), reset=self._n - 1)
+        if self._ddr:
+            # Half cycle index, modulo the divisor, at the start of the next
+            # cycle. At most one period starts per cycle.
+            counter = Signal(range(self._n), reset=0)
+
+            m.d.comb += [
+                self.o_stb.eq((counter == 0) | (counter == self._n - 1)),
+                self.o_stb_late.eq(counter == self._n - 1),
+            ]
+
+            with m.If(counter + 2 >= self._n):
+                m.d.sync += counter.eq(counter + 2 - self._n)
+            with m.Else():
+                m.d.sync += counter.eq(counter + 2)
+
+            return m
+
+        if self._fractional:
+            acc = Signal(self._acc_bits)
+            acc_next = Signal(self._acc_bits)
+
+            # The accumulator MSB is the output clock. It rises once every
+            # floor or ceil of i_freq/o_freq source clock cycles.
+            m.d.comb += [
+                acc_next.eq(acc + self._increment),
+                self.o_stb.eq(~acc[-1] & acc_next[-1]),
+            ]
+            m.d.sync += [
+                acc.eq(acc_next),
+                self.o.eq(acc_next[-1]),
+            ]
+
+            return m
+
+        if self._max_n is None:
+            n = self._n
+            counter = Signal(bits_for(self._n - 1), reset=self._n - 1)
+        else:
+            n = Signal(range(self._max_n + 1), reset=self._n)
+            counter = Signal(bits_for(self._max_n - 1), reset=self._n - 1)
+
+            with m.If((counter == n - 1) & self.i_update
+                      & (self.i_divisor >= 2) & (self.i_divisor <= self._max_n)):
+                m.d.sync += n.eq(self.i_divisor)
+
+        m.d.comb += self.o_stb.eq(counter == n - 1)
 
-        with m.If(counter == self._n - 1):
+        with m.If(counter == n - 1):
             m.d.sync += self.o.eq(~self.o)
-        with m.If(counter == self._n//2 - 1):
+        with m.If(counter == n//2 - 1):
             m.d.sync += self.o.eq(~self.o)
 
-        with m.If(counter == self._n - 1):
+        with m.If(counter == n - 1):
             m.d.sync += counter.eq(0)
         with m.Else():
             m.d.sync += counter.eq(counter + 1)
@@ -0,0 +1,51 @@
+from amaranth import *
+
+
+class DDROutput(Elaboratable):
+    """Drive an output with two values per clock cycle.
+
+    On hardware, a platform DDR pin (requested with ``xdr=2``) is used. Without
+    a pin, a generic simulation model with the same one cycle latency is built
+    instead.
+
+    Parameters:
+    ----------
+    pin : Pin
+        Platform pin requested with ``xdr=2``. If ``None``, the simulation model
+        drives ``o``.
+
+    Attributes
+    ----------
+    i_d0 : Signal(1), in
+        Value output during the first half of the next clock cycle.
+    i_d1 : Signal(1), in
+        Value output during the second half of the next clock cycle.
+    o : Signal(1), out
+        Output of the simulation model. Not driven when ``pin`` is set.
+    """
+    def __init__(self, pin=None):
+        self.i_d0 = Signal()
+        self.i_d1 = Signal()
+        self.o = Signal()
+        self._pin = pin
+
+    def elaborate(self, platform):
+        m = Module()
+
+        if self._pin is not None:
+            m.d.comb += [
+                self._pin.o_clk.eq(ClockSignal()),
+                self._pin.o0.eq(self.i_d0),
+                self._pin.o1.eq(self.i_d1),
+            ]
+        else:
+            d0 = Signal()
+            d1 = Signal()
+
+            m.d.sync += [d0.eq(self.i_d0), d1.eq(self.i_d1)]
+            m.d.comb += self.o.eq(Mux(ClockSignal(), d0, d1))
+
+        return m
+
+    def ports(self):
+        return [self.i_d0, self.i_d1, self.o]
@@ -0,0 +1,58 @@
+from amaranth import *
+
+
+class SerDesInput(Elaboratable):
+    """Sample an input ``width`` times per clock cycle.
+
+    On hardware, a platform deserializer pin (requested with ``xdr=width``, as
+    a DDR input buffer for a width of 2, or the gearbox inputs of ECP5 devices)
+    is used. Without a pin, a generic simulation model is built instead. It
+    samples ``i`` in the ``fast_domain`` clock domain, which must run at
+    ``width`` times the frequency of the ``sync`` domain, with a rising edge
+    on each rising edge of ``sync``.
+
+    Parameters:
+    ----------
+    width : int
+        Number of samples per clock cycle.
+    pin : Pin
+        Platform pin requested with ``xdr=width``. If ``None``, the simulation
+        model samples ``i``.
+    fast_domain : str
+        Serial clock domain, driving the fast clock of the pin if it has one,
+        or the simulation model.
+
+    Attributes
+    ----------
+    i : Signal(1), in
+        Input of the simulation model. Not used when ``pin`` is set.
+    o_d : Signal(width), out
+        Samples taken during the previous clock cycle, first one in bit 0.
+    """
+    def __init__(self, width, pin=None, fast_domain="fast"):
+        self.i = Signal()
+        self.o_d = Signal(width)
+        self._width = width
+        self._pin = pin
+        self._fast_domain = fast_domain
+
+    def elaborate(self, platform):
+        m = Module()
+
+        if self._pin is not None:
+            m.d.comb += self._pin.i_clk.eq(ClockSignal())
+            if hasattr(self._pin, "i_fclk"):
+                m.d.comb += self._pin.i_fclk.eq(ClockSignal(self._fast_domain))
+            m.d.comb += self.o_d.eq(Cat(getattr(self._pin, "i{0}".format(i)) for i in range(self._width)))
+        else:
+            # The last ``width`` samples, taken by ``sync`` on each of its
+            # edges
+            samples = Signal(self._width)
+
+            m.d[self._fast_domain] += samples.eq(Cat(samples[1:], self.i))
+            m.d.sync += self.o_d.eq(samples)
+
+        return m
+
+    def ports(self):
+        return [self.i, self.o_d]
@@ -0,0 +1,68 @@
+from amaranth import *
+
+
+class SerDesOutput(Elaboratable):
+    """Drive an output with ``width`` values per clock cycle.
+
+    On hardware, a platform serializer pin (requested with ``xdr=width``, as
+    for the gearbox outputs of ECP5 devices) is used. Without a pin, a generic
+    simulation model with the same one cycle latency is built instead. It runs
+    in the ``fast_domain`` clock domain, which must run at ``width`` times the
+    frequency of the ``sync`` domain, with a rising edge on each rising edge of
+    ``sync``.
+
+    Parameters:
+    ----------
+    width : int
+        Number of values per clock cycle.
+    pin : Pin
+        Platform pin requested with ``xdr=width``. If ``None``, the simulation
+        model drives ``o``.
+    fast_domain : str
+        Serial clock domain, driving the fast clock of the pin if it has one,
+        or the simulation model.
+
+    Attributes
+    ----------
+    i_d : Signal(width), in
+        Values output during the next clock cycle, first one in bit 0.
+    o : Signal(1), out
+        Output of the simulation model. Not driven when ``pin`` is set.
+    """
+    def __init__(self, width, pin=None, fast_domain="fast"):
+        self.i_d = Signal(width)
+        self.o = Signal()
+        self._width = width
+        self._pin = pin
+        self._fast_domain = fast_domain
+
+    def elaborate(self, platform):
+        m = Module()
+
+        if self._pin is not None:
+            m.d.comb += self._pin.o_clk.eq(ClockSignal())
+            if hasattr(self._pin, "o_fclk"):
+                m.d.comb += self._pin.o_fclk.eq(ClockSignal(self._fast_domain))
+            for i in range(self._width):
+                m.d.comb += getattr(self._pin, "o{0}".format(i)).eq(self.i_d[i])
+        else:
+            # The values are taken on the last edge of ``fast_domain`` before
+            # the next edge of ``sync``, when they are stable, and the output
+            # is registered, so that it is free of glitches
+            d = Signal(self._width)
+            # Slot being output, zero right after each rising edge of ``sync``
+            slot = Signal(range(self._width), reset=self._width - 1)
+            slot_next = Signal(range(self._width))
+
+            m.d.comb += slot_next.eq(Mux(slot == self._width - 1, 0, slot + 1))
+            m.d[self._fast_domain] += [
+                slot.eq(slot_next),
+                self.o.eq(d.bit_select(slot_next, 1)),
+            ]
+            with m.If(slot_next == self._width - 1):
+                m.d[self._fast_domain] += d.eq(self.i_d)
+
+        return m
+
+    def ports(self):
+        return [self.i_d, self.o]
@@ -15,10 +15,10 @@ def _ticksForDelay(freq, delay, max_ppm=None, strategy='at_most'):
     ppm = 1000000 * ((period * ticks) - delay) / delay
 
     if max_ppm is not None and ppm > max_ppm:
-        raise ArgumentError("Ticks deviation is too high")
+        raise ValueError("Ticks deviation is too high")
 
     if delay == 0 or delay is None or ticks == 0:
-        raise ArgumentError("Frequency is too low for the requested delay")
+        raise ValueError("Frequency is too low for the requested delay")
 
     return ticks
 
@@ -27,7 +27,8 @@ class SpWDelay(Elaboratable):
 
     Two indications are output from this module, a half-elapsed indication and a
     full-elapsed indication. This would normally match the 6.4 us and 12.8 us
-    delays, but can be customized for specific needs.
+    delays, but can be customized for specific needs. The half-elapsed
+    indication can be left out when only the full delay is needed.
 
     Parameters:
     ----------
@@ -42,50 +43,115 @@ class SpWDelay(Elaboratable):
         generate a delay of no more than ``delay`` seconds, guaranteeing the
         upper limit; ``at_least`` will generate a delay of at least ``delay``
         seconds, even if that means to generate a bit longer delay.
+    tick_freq : int
+        If set, count the strobes of a ``Timebase`` at this frequency on
+        ``i_tick`` instead of clock cycles, so that the counter is narrower.
+        As the countdown starts anywhere between two strobes, the delay is then
+        only known to one strobe period.
+    max_error : float
+        Maximum deviation of ``min_delay`` and ``max_delay`` from ``delay``,
+        relative to it, with ``tick_freq``. The half delay is held to the same
+        bound.
+    half : bool
+        Output the half-elapsed indication.
 
     Attributes
     ----------
     i_start : Signal(1), in
         Indication that the countdown should start. Once started, it is ignored
         until the delay has elapsed, or ``i_reset`` is asserted.
+    i_tick : Signal(1), in
+        Strobe of the ``Timebase``. Only present with ``tick_freq``.
     o_half_elapsed : Signal(1), out
-        Half-time elapsed indication.
+        Half-time elapsed indication. Only present with ``half``.
     o_elapsed : Signal(1), out
         Full-time elapsed indication.
+    min_delay : float
+        Shortest full delay generated, in seconds.
+    max_delay : float
+        Longest full delay generated, in seconds.
     """
-    def __init__(self, srcfreq, delay, strategy='at_least'):
+    def __init__(self, srcfreq, delay, strategy='at_least', tick_freq=None, max_error=0.1, half=True):
         self.i_start = Signal()
-        self.o_half_elapsed = Signal()
+        if tick_freq is not None:
+            self.i_tick = Signal()
+        if half:
+            self.o_half_elapsed = Signal()
         self.o_elapsed = Signal()
-        ticks = _ticksForDelay(srcfreq, delay, strategy=strategy)
         self._strategy = strategy
+        self._tick_freq = tick_freq
+        self._half = half
 
-        self._counter = Signal(bits_for(ticks))
+        if tick_freq is None:
+            ticks = _ticksForDelay(srcfreq, delay, strategy=strategy)
 
-        if self._strategy == 'at_least':
-            self._counter_half = math.ceil(ticks/2)
-            self._counter_max = ticks
+            if self._strategy == 'at_least':
+                self._counter_half = math.ceil(ticks/2)
+                self._counter_max = ticks
+            else:
+                # Count one less cycle because the user will react one cycle later
+                self._counter_half = math.floor(ticks/2) - 1
+                self._counter_max = ticks - 1
+
+            self.min_delay = self.max_delay = ticks / srcfreq
         else:
-            # Count one less cycle because the user will react one cycle later
-            self._counter_half = math.floor(ticks/2) - 1
-            self._counter_max = ticks - 1
+            # The first strobe comes up to one period after the start: count
+            # one more to guarantee the lower limit, or the number of periods
+            # fitting in the delay, less the cycle to output the indication,
+            # to guarantee the upper one
+            delays = [delay, delay / 2] if half else [delay]
+            if self._strategy == 'at_least':
+                counts = [_ticksForDelay(tick_freq, d, strategy=strategy) + 1 for d in delays]
+            else:
+                if (delays[-1] - 1 / srcfreq) * tick_freq < 1:
+                    raise ValueError("The timebase at {0} Hz is too slow for a delay of {1} s".format(tick_freq, delays[-1]))
+                counts = [_ticksForDelay(tick_freq, d - 1 / srcfreq, strategy=strategy) for d in delays]
+
+            self._counter_max = counts[0]
+            if half:
+                self._counter_half = counts[1]
+
+            # Plus the cycle to output the indication
+            self.min_delay = (self._counter_max - 1) / tick_freq + 1 / srcfreq
+            self.max_delay = self._counter_max / tick_freq + 1 / srcfreq
+
+            for d, count in zip(delays, counts):
+                shortest = (count - 1) / tick_freq + 1 / srcfreq
+                longest = count / tick_freq + 1 / srcfreq
+                error = max(abs(shortest - d), abs(longest - d)) / d
+                if error > max_error:
+                    raise ValueError("The timebase at {0} Hz is too slow for a delay of {1} s: {2:.1%} error".format(
+                        tick_freq, d, error))
+
+        self._counter = Signal(bits_for(self._counter_max))
 
     def elaborate(self, platform):
         m = Module()
 
+        tick = self.i_tick if self._tick_freq is not None else C(1)
+
         with m.If(~self.i_start):
             m.d.sync += self._counter.eq(0)
-        with m.Else():
+        with m.Elif(tick):
             m.d.sync += self._counter.eq(self._counter + 1)
 
         with m.If(~self.i_start):
-            m.d.sync += [self.o_elapsed.eq(0), self.o_half_elapsed.eq(0)]
-        with m.Elif(self._counter == (self._counter_half - 1)):
-            m.d.sync += self.o_half_elapsed.eq(1)
-        with m.Elif(self._counter == self._counter_max - 1):
+            m.d.sync += self.o_elapsed.eq(0)
+        with m.Elif(tick & (self._counter == self._counter_max - 1)):
             m.d.sync += self.o_elapsed.eq(1)
 
+        if self._half:
+            with m.If(~self.i_start):
+                m.d.sync += self.o_half_elapsed.eq(0)
+            with m.Elif(tick & (self._counter == (self._counter_half - 1))):
+                m.d.sync += self.o_half_elapsed.eq(1)
+
         return m
 
     def ports(self):
-        return [self.i_start, self.o_elapsed, self.o_half_elapsed]
+        ports = [self.i_start, self.o_elapsed]
+        if self._half:
+            ports.append(self.o_half_elapsed)
+        if self._tick_freq is not None:
+            ports.append(self.i_tick)
+        return ports
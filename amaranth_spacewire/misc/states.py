@@ -20,7 +20,4 @@ class TransmitterState(enum.Enum):
     WAIT                    = 0
     WAIT_TX_START_DATA      = 1
     WAIT_TX_START_CONTROL   = 2
-    SEND_NULL_A             = 4
-    SEND_NULL_B             = 5
-    SEND_NULL_C             = 6
 
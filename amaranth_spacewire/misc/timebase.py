@@ -0,0 +1,50 @@
+from amaranth import *
+
+from amaranth_spacewire.misc.clock_divider import _divisor
+
+
+def _timebase_freq(srcfreq, freq):
+    """Frequency of the strobe generated by a ``Timebase``, the closest one
+    not above ``freq`` which divides ``srcfreq``."""
+    return srcfreq / int(_divisor(srcfreq, freq))
+
+
+class Timebase(Elaboratable):
+    """Strobe shared by the ``SpWDelay`` timers, so that they count prescaled
+    ticks instead of clock cycles.
+
+    Parameters:
+    ----------
+    srcfreq : int
+        The main core frequency in Hz.
+    freq : int
+        Frequency of the strobe in Hz. The closest frequency not above it
+        which divides ``srcfreq`` is used, available in ``freq``.
+
+    Attributes
+    ----------
+    o_tick : Signal(1), out
+        Strobe asserted for one clock cycle every ``srcfreq / freq`` cycles.
+    freq : float
+        Actual frequency of the strobe in Hz.
+    """
+    def __init__(self, srcfreq, freq):
+        self.o_tick = Signal()
+
+        self._divisor = int(_divisor(srcfreq, freq))
+        self.freq = srcfreq / self._divisor
+
+    def elaborate(self, platform):
+        m = Module()
+
+        counter = Signal(range(self._divisor))
+
+        with m.If(counter == self._divisor - 1):
+            m.d.sync += [counter.eq(0), self.o_tick.eq(1)]
+        with m.Else():
+            m.d.sync += [counter.eq(counter + 1), self.o_tick.eq(0)]
+
+        return m
+
+    def ports(self):
+        return [self.o_tick]
@@ -0,0 +1,97 @@
+from amaranth import *
+from amaranth.lib.fifo import SyncFIFOBuffered
+
+
+class WideSyncFIFO(Elaboratable):
+    """Synchronous FIFO written with up to ``lanes`` entries per clock cycle
+    and read with one.
+
+    The entries are interleaved over ``lanes`` ``SyncFIFOBuffered`` banks:
+    each write puts at most one entry in each bank, starting with the bank
+    following the last one written, and the banks are read in the same order.
+
+    Parameters:
+    ----------
+    width : int
+        Bit width of an entry.
+    depth : int
+        Number of entries, a multiple of ``lanes``.
+    lanes : int
+        Maximum number of entries written per clock cycle.
+
+    Attributes
+    ----------
+    w_count : Signal(range(lanes + 1)), in
+        Number of entries written, taken from the first lanes of ``w_data``.
+    w_data : Signal(width * lanes), in
+        Entries to write, first one in the low bits.
+    w_rdy : Signal(1), out
+        Indication that ``lanes`` entries can be written.
+    r_en : Signal(1), in
+        Read enable.
+    r_data : Signal(width), out
+        Entry at the head of the FIFO.
+    r_rdy : Signal(1), out
+        Indication that ``r_data`` is valid.
+    level : Signal(range(depth + 1)), out
+        Number of entries in the FIFO.
+    """
+    def __init__(self, width, depth, lanes):
+        self.w_count = Signal(range(lanes + 1))
+        self.w_data = Signal(width * lanes)
+        self.w_rdy = Signal()
+        self.r_en = Signal()
+        self.r_data = Signal(width)
+        self.r_rdy = Signal()
+        self.level = Signal(range(depth + 1))
+
+        if depth % lanes != 0:
+            raise ValueError("The depth must be a multiple of the number of lanes")
+        self._width = width
+        self._depth = depth
+        self._lanes = lanes
+
+    def elaborate(self, platform):
+        m = Module()
+        lanes = self._lanes
+
+        banks = [SyncFIFOBuffered(width=self._width, depth=self._depth // lanes) for _ in range(lanes)]
+        for i, bank in enumerate(banks):
+            m.submodules["bank_{0}".format(i)] = bank
+
+        # Next bank to write and to read
+        w_sel = Signal(range(lanes))
+        r_sel = Signal(range(lanes))
+
+        with m.Switch(w_sel):
+            for s in range(lanes):
+                with m.Case(s):
+                    for i, bank in enumerate(banks):
+                        lane = (i - s) % lanes
+                        m.d.comb += [
+                            bank.w_en.eq(self.w_count > lane),
+                            bank.w_data.eq(self.w_data.word_select(lane, self._width)),
+                        ]
+        m.d.sync += w_sel.eq((w_sel + self.w_count) % lanes)
+
+        r_data = Array(bank.r_data for bank in banks)
+        r_rdy = Array(bank.r_rdy for bank in banks)
+        for i, bank in enumerate(banks):
+            m.d.comb += bank.r_en.eq(self.r_en & (r_sel == i))
+        with m.If(self.r_en & self.r_rdy):
+            m.d.sync += r_sel.eq(Mux(r_sel == lanes - 1, 0, r_sel + 1))
+
+        m.d.comb += [
+            self.r_data.eq(r_data[r_sel]),
+            self.r_rdy.eq(r_rdy[r_sel]),
+            self.w_rdy.eq(Cat(bank.w_rdy for bank in banks).all()),
+            self.level.eq(sum(bank.level for bank in banks)),
+        ]
+
+        return m
+
+    def ports(self):
+        return [
+            self.w_count, self.w_data, self.w_rdy, self.r_en, self.r_data,
+            self.r_rdy, self.level
+        ]
@@ -1,7 +1,13 @@
 from amaranth import *
 from amaranth_spacewire.encoding.encoding_layer import EncodingLayer
 from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.rate_monitor import _rate_shapes
+from amaranth_spacewire.encoding.rx_statistics import RxStatistics
 from amaranth_spacewire.datalink.datalink_layer import DataLinkLayer, DataLinkState
+from amaranth_spacewire.misc.clock_divider import _divisor
+from amaranth_spacewire.misc.char_packer import CharPacker, CharUnpacker
+from amaranth_spacewire.misc.char_stream import StreamToChars, CharsToStream
+from amaranth_spacewire.misc.timebase import Timebase, _timebase_freq
 from amaranth_spacewire.misc.constants import MAX_TX_CREDIT, MAX_RX_CREDIT
 
 
@@ -11,32 +17,139 @@ class Node(Elaboratable):
                        txfreq=Transmitter.TX_FREQ_RESET,
                        transission_delay=12.8e-6,
                        disconnect_delay=850e-9,
-                       fifo_depth_tokens=7):
+                       fifo_depth_tokens=7,
+                       tx_streaming=False,
+                       tx_single_clock=False,
+                       tx_programmable_divisor=False,
+                       tx_fractional_divider=False,
+                       tx_ddr=False,
+                       tx_clock_bank=None,
+                       tx_serializer_width=None,
+                       rx_recovered_clock=False,
+                       rx_input_width=None,
+                       rx_early_release=False,
+                       rx_sync_stages=2,
+                       rx_chars_per_cycle=1,
+                       time_code_filter=False,
+                       timebase_freq=None,
+                       timebase_shared=False,
+                       rx_rate_window=None,
+                       rx_glitch_filter=None,
+                       rx_statistics=False,
+                       user_chars_per_word=None,
+                       user_flush_timeout=None,
+                       user_stream=False,
+                       user_async=False,
+                       packet_fifo=False,
+                       tx_packet_threshold=None,
+                       fifo_bypass=False):
         # Data/Strobe
         self.data_input = Signal()
         self.strobe_input = Signal()
+        if rx_input_width is not None:
+            # Samples of the previous clock cycle, for DDR or deserializing
+            # input buffers
+            self.data_input_word = Signal(rx_input_width)
+            self.strobe_input_word = Signal(rx_input_width)
         self.data_output = Signal()
         self.strobe_output = Signal()
+        if tx_ddr:
+            # First and second half of the next clock cycle, for DDR outputs
+            self.data_output_ddr = Signal(2)
+            self.strobe_output_ddr = Signal(2)
+        if tx_serializer_width is not None:
+            # Line slots of the next clock cycle, for serializing outputs
+            self.data_output_word = Signal(tx_serializer_width)
+            self.strobe_output_word = Signal(tx_serializer_width)
 
-        # FIFO
-        self.r_en = Signal()
-        self.r_data = Signal(9)
-        self.r_rdy = Signal()
-        self.w_en = Signal()
-        self.w_data = Signal(9)
-        self.w_rdy = Signal()
+        # FIFO, in the ``user`` clock domain with ``user_async``
+        if user_stream:
+            # Packet bytes streams, with the end of packet markers as flags
+            self.tx_data = Signal(8)
+            self.tx_last = Signal()
+            self.tx_error = Signal()
+            self.tx_valid = Signal()
+            self.tx_ready = Signal()
+            self.rx_data = Signal(8)
+            self.rx_last = Signal()
+            self.rx_error = Signal()
+            self.rx_valid = Signal()
+            self.rx_ready = Signal()
+        elif user_chars_per_word is None:
+            self.r_en = Signal()
+            self.r_data = Signal(9)
+            self.r_rdy = Signal()
+            self.w_en = Signal()
+            self.w_data = Signal(9)
+            self.w_rdy = Signal()
+            if packet_fifo:
+                # Complete packets in the RX FIFO, and number of data
+                # characters of the one at the head, valid while
+                # ``r_packets`` is not zero
+                self.r_packets = Signal(range(8 * fifo_depth_tokens + 1))
+                self.r_length = Signal(DataLinkLayer.MAX_PACKET_LENGTH_BITS)
+        else:
+            # Words of characters: data bytes, valid lanes and lanes holding
+            # an end of packet marker
+            self.r_en = Signal()
+            self.r_data = Signal(8 * user_chars_per_word)
+            self.r_valid = Signal(user_chars_per_word)
+            self.r_eop = Signal(user_chars_per_word)
+            self.r_rdy = Signal()
+            self.w_en = Signal()
+            self.w_data = Signal(8 * user_chars_per_word)
+            self.w_valid = Signal(user_chars_per_word)
+            self.w_eop = Signal(user_chars_per_word)
+            self.w_rdy = Signal()
+
+        # Time-codes
+        self.tick_in = Signal()
+        self.tx_time_value = Signal(6)
+        self.tx_time_flags = Signal(2)
+        self.tick_out = Signal()
+        self.time_value = Signal(6)
+        self.time_flags = Signal(2)
 
         # Status signals
         self.link_state = Signal(DataLinkState)
         self.link_error_flags = Signal(5)
         self.link_tx_credit = Signal(range(MAX_TX_CREDIT + 1))
         self.link_rx_credit = Signal(range(MAX_RX_CREDIT(fifo_depth_tokens) + 1))
+        if rx_rate_window is not None:
+            # Incoming rate measured over the last window: bits received,
+            # shortest and longest clock cycles between bits, and indication
+            # of a new measurement
+            bits_shape, period_shape = _rate_shapes(srcfreq, rx_rate_window, rx_input_width or 1)
+            self.rx_rate_bits = Signal(bits_shape)
+            self.rx_rate_min_period = Signal(period_shape)
+            self.rx_rate_max_period = Signal(period_shape)
+            self.rx_rate_update = Signal()
+        if rx_statistics:
+            # Saturating counters of the characters received and of each
+            # receive error, kept over link resets, and errors during the
+            # last million characters. A NULL counts as one character, as
+            # does a time-code.
+            self.rx_chars_received = Signal(RxStatistics.CHARS_WIDTH)
+            self.rx_parity_errors = Signal(RxStatistics.ERRORS_WIDTH)
+            self.rx_esc_errors = Signal(RxStatistics.ERRORS_WIDTH)
+            self.rx_read_errors = Signal(RxStatistics.ERRORS_WIDTH)
+            self.rx_disconnect_errors = Signal(RxStatistics.ERRORS_WIDTH)
+            self.rx_errors_per_million = Signal(RxStatistics.ERRORS_WIDTH)
 
         # Control signals
         self.tx_switch_freq = Signal()
+        if tx_programmable_divisor:
+            self.tx_divisor = Signal(range(int(srcfreq // Transmitter.MIN_TX_FREQ_USER) + 1),
+                                     reset=round(_divisor(srcfreq, txfreq)))
         self.link_disabled = Signal()
         self.link_start = Signal()
         self.autostart = Signal()
+        if timebase_shared:
+            # Strobe of a ``Timebase`` at ``timebase_freq`` shared with other
+            # nodes, counted by the link and disconnect delays
+            self.timebase_tick = Signal()
+        if rx_statistics:
+            self.rx_statistics_clear = Signal()
 
         self._srcfreq = srcfreq
         self._txfreq = txfreq
@@ -44,12 +157,82 @@ class Node(Elaboratable):
         self._transission_delay = transission_delay
         self._disconnect_delay = disconnect_delay
         self._fifo_depth_tokens = fifo_depth_tokens
+        self._tx_streaming = tx_streaming
+        self._tx_single_clock = tx_single_clock
+        self._tx_programmable_divisor = tx_programmable_divisor
+        self._tx_fractional_divider = tx_fractional_divider
+        self._tx_ddr = tx_ddr
+        self._tx_clock_bank = tx_clock_bank
+        self._tx_serializer_width = tx_serializer_width
+        self._rx_recovered_clock = rx_recovered_clock
+        self._rx_input_width = rx_input_width
+        self._rx_early_release = rx_early_release
+        self._rx_sync_stages = rx_sync_stages
+        self._rx_chars_per_cycle = rx_chars_per_cycle
+        self._time_code_filter = time_code_filter
+        self._timebase_freq = timebase_freq
+        self._timebase_shared = timebase_shared
+        self._rx_rate_window = rx_rate_window
+        self._rx_glitch_filter = rx_glitch_filter
+        self._rx_statistics = rx_statistics
+        self._user_chars_per_word = user_chars_per_word
+        self._user_flush_timeout = user_flush_timeout
+        self._user_stream = user_stream
+        self._user_async = user_async
+        self._packet_fifo = packet_fifo
+        self._tx_packet_threshold = tx_packet_threshold
+        self._fifo_bypass = fifo_bypass
+
+        if timebase_shared and timebase_freq is None:
+            raise ValueError("A shared timebase requires its frequency")
+        if user_stream and user_chars_per_word is not None:
+            raise ValueError("The user stream carries one byte per clock cycle")
+        if user_flush_timeout is not None and user_chars_per_word is None:
+            raise ValueError("The flush timeout only applies to words of characters")
+        if user_async and rx_chars_per_cycle > 1:
+            raise ValueError("The RX FIFO cannot be written with several characters per clock cycle across clock domains")
+        if packet_fifo and (user_stream or user_chars_per_word is not None):
+            raise ValueError("The packet FIFO sideband requires the character FIFO interface")
+        if fifo_bypass and (user_async or rx_chars_per_cycle > 1 or packet_fifo):
+            raise ValueError("The FIFO bypass requires a single clock domain, one character per clock cycle "
+                             "and no packet FIFO")
 
     def elaborate(self, platform):
         m = Module()
 
-        m.submodules.encoding_layer = encoding_layer = EncodingLayer(self._srcfreq, self._rstfreq, self._txfreq, self._disconnect_delay)
-        m.submodules.datalink_layer = datalink_layer = DataLinkLayer(srcfreq=self._srcfreq, transission_delay=self._transission_delay, fifo_depth_tokens=self._fifo_depth_tokens)
+        if self._timebase_freq is not None:
+            # Actual frequency of the strobes counted by the delays
+            tick_freq = _timebase_freq(self._srcfreq, self._timebase_freq)
+        else:
+            tick_freq = None
+
+        m.submodules.encoding_layer = encoding_layer = EncodingLayer(self._srcfreq, self._rstfreq, self._txfreq, self._disconnect_delay,
+                                                                     tx_streaming=self._tx_streaming,
+                                                                     tx_single_clock=self._tx_single_clock,
+                                                                     tx_programmable_divisor=self._tx_programmable_divisor,
+                                                                     tx_fractional_divider=self._tx_fractional_divider,
+                                                                     tx_ddr=self._tx_ddr,
+                                                                     tx_clock_bank=self._tx_clock_bank,
+                                                                     tx_serializer_width=self._tx_serializer_width,
+                                                                     rx_recovered_clock=self._rx_recovered_clock,
+                                                                     rx_input_width=self._rx_input_width,
+                                                                     rx_early_release=self._rx_early_release,
+                                                                     rx_sync_stages=self._rx_sync_stages,
+                                                                     rx_chars_per_cycle=self._rx_chars_per_cycle,
+                                                                     timebase_freq=tick_freq,
+                                                                     rx_rate_window=self._rx_rate_window,
+                                                                     rx_glitch_filter=self._rx_glitch_filter)
+        m.submodules.datalink_layer = datalink_layer = DataLinkLayer(srcfreq=self._srcfreq, transission_delay=self._transission_delay, fifo_depth_tokens=self._fifo_depth_tokens,
+                                                                     rx_chars_per_cycle=self._rx_chars_per_cycle,
+                                                                     timebase_freq=tick_freq,
+                                                                     user_async=self._user_async,
+                                                                     packet_fifo=self._packet_fifo,
+                                                                     tx_packet_threshold=self._tx_packet_threshold,
+                                                                     fifo_bypass=self._fifo_bypass)
+        if self._user_async:
+            user_domain = DomainRenamer("user")
+        else:
+            user_domain = lambda elaboratable: elaboratable
 
         m.d.comb += [
             encoding_layer.tx_enable.eq(datalink_layer.tx_enable),
@@ -59,9 +242,9 @@ class Node(Elaboratable):
             encoding_layer.rx_enable.eq(datalink_layer.rx_enable),
             encoding_layer.data_input.eq(self.data_input),
             encoding_layer.strobe_input.eq(self.strobe_input),
-            encoding_layer.tx_switch_freq.eq(self.tx_switch_freq),
+            # The reset signalling rate is kept until the link is running
+            encoding_layer.tx_switch_freq.eq(self.tx_switch_freq & (datalink_layer.link_state == DataLinkState.RUN)),
 
-            datalink_layer.r_en.eq(self.r_en),
             datalink_layer.got_null.eq(encoding_layer.got_null),
             datalink_layer.got_fct.eq(encoding_layer.got_fct),
             datalink_layer.got_bc.eq(encoding_layer.got_bc),
@@ -78,40 +261,235 @@ class Node(Elaboratable):
             datalink_layer.sent_fct.eq(encoding_layer.sent_fct),
             datalink_layer.sent_null.eq(encoding_layer.sent_null),
             datalink_layer.tx_ready.eq(encoding_layer.tx_ready),
-            datalink_layer.w_en.eq(self.w_en),
-            datalink_layer.w_data.eq(self.w_data),
 
-            self.w_rdy.eq(datalink_layer.w_rdy),
             self.link_state.eq(datalink_layer.link_state),
             self.link_error_flags.eq(datalink_layer.link_error_flags),
             self.link_tx_credit.eq(datalink_layer.link_tx_credit),
             self.link_rx_credit.eq(datalink_layer.link_rx_credit),
             self.data_output.eq(encoding_layer.data_output),
             self.strobe_output.eq(encoding_layer.strobe_output),
-            self.r_data.eq(datalink_layer.r_data),
-            self.r_rdy.eq(datalink_layer.r_rdy),
         ]
 
+        if self._user_stream:
+            m.submodules.tx_stream = tx_stream = user_domain(StreamToChars())
+            m.submodules.rx_stream = rx_stream = user_domain(CharsToStream())
+            m.d.comb += [
+                tx_stream.data.eq(self.tx_data),
+                tx_stream.last.eq(self.tx_last),
+                tx_stream.error.eq(self.tx_error),
+                tx_stream.valid.eq(self.tx_valid),
+                self.tx_ready.eq(tx_stream.ready),
+                datalink_layer.w_en.eq(tx_stream.r_rdy),
+                datalink_layer.w_data.eq(tx_stream.r_data),
+                tx_stream.r_en.eq(datalink_layer.w_rdy),
+
+                rx_stream.w_en.eq(datalink_layer.r_rdy),
+                rx_stream.w_data.eq(datalink_layer.r_data),
+                datalink_layer.r_en.eq(rx_stream.w_rdy),
+                self.rx_data.eq(rx_stream.data),
+                self.rx_last.eq(rx_stream.last),
+                self.rx_error.eq(rx_stream.error),
+                self.rx_valid.eq(rx_stream.valid),
+                rx_stream.ready.eq(self.rx_ready),
+            ]
+        elif self._user_chars_per_word is None:
+            m.d.comb += [
+                datalink_layer.r_en.eq(self.r_en),
+                self.r_data.eq(datalink_layer.r_data),
+                self.r_rdy.eq(datalink_layer.r_rdy),
+                datalink_layer.w_en.eq(self.w_en),
+                datalink_layer.w_data.eq(self.w_data),
+                self.w_rdy.eq(datalink_layer.w_rdy),
+            ]
+            if self._packet_fifo:
+                m.d.comb += [
+                    self.r_packets.eq(datalink_layer.r_packets),
+                    self.r_length.eq(datalink_layer.r_length),
+                ]
+        else:
+            m.submodules.packer = packer = user_domain(
+                CharPacker(self._user_chars_per_word, self._user_flush_timeout))
+            m.submodules.unpacker = unpacker = user_domain(CharUnpacker(self._user_chars_per_word))
+            m.d.comb += [
+                packer.w_en.eq(datalink_layer.r_rdy),
+                packer.w_data.eq(datalink_layer.r_data),
+                datalink_layer.r_en.eq(packer.w_rdy),
+                packer.r_en.eq(self.r_en),
+                self.r_data.eq(packer.r_data),
+                self.r_valid.eq(packer.r_valid),
+                self.r_eop.eq(packer.r_eop),
+                self.r_rdy.eq(packer.r_rdy),
+
+                unpacker.w_en.eq(self.w_en),
+                unpacker.w_data.eq(self.w_data),
+                unpacker.w_valid.eq(self.w_valid),
+                unpacker.w_eop.eq(self.w_eop),
+                self.w_rdy.eq(unpacker.w_rdy),
+                datalink_layer.w_en.eq(unpacker.r_rdy),
+                datalink_layer.w_data.eq(unpacker.r_data),
+                unpacker.r_en.eq(datalink_layer.w_rdy),
+            ]
+
+        # Time-codes are only sent in Run, ahead of anything else at the next
+        # character boundary. A tick is sent straight away if the transmitter
+        # is ready, or kept until it is.
+        running = Signal()
+        tick_pending = Signal()
+        time_pending = Signal(8)
+
+        m.d.comb += [
+            running.eq(datalink_layer.link_state == DataLinkState.RUN),
+            encoding_layer.send_time.eq((self.tick_in | tick_pending) & running),
+            encoding_layer.time.eq(Mux(self.tick_in, Cat(self.tx_time_value, self.tx_time_flags), time_pending)),
+        ]
+
+        with m.If(~running | encoding_layer.sent_time):
+            m.d.sync += tick_pending.eq(0)
+        with m.Elif(self.tick_in):
+            m.d.sync += [
+                tick_pending.eq(1),
+                time_pending.eq(Cat(self.tx_time_value, self.tx_time_flags)),
+            ]
+
+        # Received time-codes, also only in Run. ``tick_out`` is raised in the
+        # cycle after the time-code parity was validated, with the new time
+        # value and flags.
+        got_time = Signal()
+        time_counter = Signal(6)
+        flags = Signal(2)
+
+        m.d.comb += [
+            got_time.eq(encoding_layer.got_bc & running),
+            self.time_value.eq(Mux(got_time, encoding_layer.rx_char[0:6], time_counter)),
+            self.time_flags.eq(Mux(got_time, encoding_layer.rx_char[6:8], flags)),
+        ]
+
+        with m.If(got_time):
+            m.d.sync += [
+                time_counter.eq(encoding_layer.rx_char[0:6]),
+                flags.eq(encoding_layer.rx_char[6:8]),
+            ]
+
+        if self._time_code_filter:
+            # Only tick when the time is one more than the previous one. The
+            # time counter is updated anyway.
+            m.d.comb += self.tick_out.eq(got_time & (encoding_layer.rx_char[0:6] == (time_counter + 1)[0:6]))
+        else:
+            m.d.comb += self.tick_out.eq(got_time)
+
+        if self._tx_programmable_divisor:
+            m.d.comb += encoding_layer.tx_divisor.eq(self.tx_divisor)
+
+        if self._tx_ddr:
+            m.d.comb += [
+                self.data_output_ddr.eq(encoding_layer.data_output_ddr),
+                self.strobe_output_ddr.eq(encoding_layer.strobe_output_ddr),
+            ]
+
+        if self._tx_serializer_width is not None:
+            m.d.comb += [
+                self.data_output_word.eq(encoding_layer.data_output_word),
+                self.strobe_output_word.eq(encoding_layer.strobe_output_word),
+            ]
+
+        if self._rx_input_width is not None:
+            m.d.comb += [
+                encoding_layer.data_input_word.eq(self.data_input_word),
+                encoding_layer.strobe_input_word.eq(self.strobe_input_word),
+            ]
+
+        if self._timebase_freq is not None:
+            if self._timebase_shared:
+                tick = self.timebase_tick
+            else:
+                m.submodules.timebase = timebase = Timebase(self._srcfreq, self._timebase_freq)
+                tick = timebase.o_tick
+            m.d.comb += [
+                encoding_layer.timebase_tick.eq(tick),
+                datalink_layer.timebase_tick.eq(tick),
+            ]
+
+        if self._rx_rate_window is not None:
+            m.d.comb += [
+                self.rx_rate_bits.eq(encoding_layer.rx_rate_bits),
+                self.rx_rate_min_period.eq(encoding_layer.rx_rate_min_period),
+                self.rx_rate_max_period.eq(encoding_layer.rx_rate_max_period),
+                self.rx_rate_update.eq(encoding_layer.rx_rate_update),
+            ]
+
+        if self._rx_chars_per_cycle > 1:
+            m.d.comb += [
+                datalink_layer.got_fcts.eq(encoding_layer.got_fcts),
+                datalink_layer.got_n_chars.eq(encoding_layer.got_n_chars),
+                datalink_layer.rx_chars.eq(encoding_layer.rx_chars),
+            ]
+
+        if self._rx_statistics:
+            m.submodules.rx_statistics = rx_statistics = RxStatistics(self._rx_chars_per_cycle + 2)
+            if self._rx_chars_per_cycle > 1:
+                n_chars = encoding_layer.got_n_chars + encoding_layer.got_fcts
+            else:
+                n_chars = encoding_layer.got_n_char + encoding_layer.got_fct
+            m.d.comb += [
+                rx_statistics.i_clear.eq(self.rx_statistics_clear),
+                rx_statistics.i_chars.eq(n_chars + encoding_layer.got_null + encoding_layer.got_bc),
+                rx_statistics.i_parity_error.eq(encoding_layer.parity_error),
+                rx_statistics.i_esc_error.eq(encoding_layer.esc_error),
+                rx_statistics.i_read_error.eq(encoding_layer.read_error),
+                rx_statistics.i_disconnect_error.eq(encoding_layer.disconnect_error),
+                self.rx_chars_received.eq(rx_statistics.o_chars),
+                self.rx_parity_errors.eq(rx_statistics.o_parity_errors),
+                self.rx_esc_errors.eq(rx_statistics.o_esc_errors),
+                self.rx_read_errors.eq(rx_statistics.o_read_errors),
+                self.rx_disconnect_errors.eq(rx_statistics.o_disconnect_errors),
+                self.rx_errors_per_million.eq(rx_statistics.o_errors_per_million),
+            ]
+
         return m
 
     def ports(self):
-        return [
+        ports = [
             self.data_input,
             self.strobe_input,
             self.data_output,
             self.strobe_output,
-            self.r_en,
-            self.r_data,
-            self.r_rdy,
-            self.w_en,
-            self.w_data,
-            self.w_rdy,
             self.link_state,
             self.link_error_flags,
             self.link_tx_credit,
             self.link_rx_credit,
+            self.tick_in,
+            self.tx_time_value,
+            self.tx_time_flags,
+            self.tick_out,
+            self.time_value,
+            self.time_flags,
             self.tx_switch_freq,
             self.link_disabled,
             self.link_start,
             self.autostart,
         ]
+        if self._user_stream:
+            ports += [self.tx_data, self.tx_last, self.tx_error, self.tx_valid, self.tx_ready,
+                      self.rx_data, self.rx_last, self.rx_error, self.rx_valid, self.rx_ready]
+        else:
+            ports += [self.r_en, self.r_data, self.r_rdy, self.w_en, self.w_data, self.w_rdy]
+        if self._packet_fifo:
+            ports += [self.r_packets, self.r_length]
+        if self._tx_programmable_divisor:
+            ports.append(self.tx_divisor)
+        if self._tx_ddr:
+            ports += [self.data_output_ddr, self.strobe_output_ddr]
+        if self._tx_serializer_width is not None:
+            ports += [self.data_output_word, self.strobe_output_word]
+        if self._rx_input_width is not None:
+            ports += [self.data_input_word, self.strobe_input_word]
+        if self._timebase_shared:
+            ports.append(self.timebase_tick)
+        if self._rx_rate_window is not None:
+            ports += [self.rx_rate_bits, self.rx_rate_min_period, self.rx_rate_max_period, self.rx_rate_update]
+        if self._rx_statistics:
+            ports += [self.rx_statistics_clear, self.rx_chars_received, self.rx_parity_errors, self.rx_esc_errors,
+                      self.rx_read_errors, self.rx_disconnect_errors, self.rx_errors_per_million]
+        if self._user_chars_per_word is not None:
+            ports += [self.r_valid, self.r_eop, self.w_valid, self.w_eop]
+        return ports
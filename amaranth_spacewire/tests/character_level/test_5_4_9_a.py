@@ -5,9 +5,11 @@ from amaranth import *
 from amaranth.sim import Simulator, Delay, Settle
 
 from amaranth_spacewire import SpWNode, SpWTransmitterStates, SpWNodeFSMStates
+from amaranth_spacewire.encoding.receiver import Receiver
 from amaranth_spacewire.tests.spw_test_utils import *
 
 SRCFREQ = 30e6
+RX_LATENCY = Receiver.latency_for()
 SIMSTART = 10e-6
 TX_FREQ = 10e6
 RST_FREQ = 10e6
@@ -65,7 +67,7 @@ class Test(unittest.TestCase):
     def _test_nulls(self):
         while (yield self.dut.link_state != SpWNodeFSMStates.ERROR_WAIT):
             yield Tick()
-        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.o_debug_rx_got_null, 1)
+        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.o_debug_rx_got_null, 1, RX_LATENCY)
 
     def reset_link(self):
         yield self.dut.link_error_clear.eq(1)
@@ -84,19 +86,19 @@ class Test(unittest.TestCase):
         while (yield self.dut.link_state != SpWNodeFSMStates.ERROR_WAIT):
             yield Tick()
         yield from self.inter_error_delay()
-        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.link_error_flags, 1)
+        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.link_error_flags, 1, RX_LATENCY)
         yield from self.reset_link()
 
         while (yield self.dut.link_state != SpWNodeFSMStates.ERROR_WAIT):
             yield Tick()
         yield from self.inter_error_delay()
-        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.link_error_flags, 1)
+        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.link_error_flags, 1, RX_LATENCY)
         yield from self.reset_link()
 
         while (yield self.dut.link_state != SpWNodeFSMStates.ERROR_WAIT):
             yield Tick()
         yield from self.inter_error_delay()
-        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.link_error_flags, 1)
+        yield from validate_multiple_symbol_received(SRCFREQ, BIT_TIME, self.dut.link_error_flags, 1, RX_LATENCY)
         yield from self.reset_link()
 
     def test_spec_5_4_9_a(self):
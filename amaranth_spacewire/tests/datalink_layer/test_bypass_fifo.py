@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.misc.bypass_fifo import BypassFIFO
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+DEPTH = 8
+TICKS = 2000
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.fifo = BypassFIFO(9, DEPTH)
+        self.sim = Simulator(self.fifo)
+        self.sim.add_clock(1/SRCFREQ)
+
+    def stimuli(self):
+        rng = random.Random(25)
+        written = []
+        read = []
+        bypassed = 0
+        value = 0
+        for i in range(TICKS):
+            # Bursts of writes, then of reads
+            writing = (i // 100) % 2 == 0
+            yield self.fifo.w_en.eq(rng.random() < (0.7 if writing else 0.2))
+            yield self.fifo.w_data.eq(value)
+            yield self.fifo.r_en.eq(rng.random() < (0.3 if writing else 0.9))
+            yield Settle()
+            if (yield self.fifo.w_en) and (yield self.fifo.w_rdy):
+                written.append(value)
+                value = (value + 1) & 0x1ff
+            if (yield self.fifo.r_en) and (yield self.fifo.r_rdy):
+                read.append((yield self.fifo.r_data))
+                if (yield self.fifo.level) == 0:
+                    bypassed += 1
+            yield Tick()
+
+        self.assertGreater(bypassed, 0)
+        self.assertGreater(len(read), DEPTH)
+        self.assertEqual(read, written[:len(read)])
+
+    def test_fifo(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.run()
+
+    def test_latency(self):
+        def process():
+            # Read in the same clock cycle while empty
+            yield self.fifo.w_en.eq(1)
+            yield self.fifo.w_data.eq(0x42)
+            yield self.fifo.r_en.eq(1)
+            yield Settle()
+            self.assertTrue((yield self.fifo.r_rdy))
+            self.assertEqual((yield self.fifo.r_data), 0x42)
+            yield Tick()
+            yield self.fifo.w_en.eq(0)
+            yield Settle()
+            self.assertFalse((yield self.fifo.r_rdy))
+            self.assertEqual((yield self.fifo.level), 0)
+
+            # Not read, so stored, and available again two cycles later
+            yield self.fifo.w_en.eq(1)
+            yield self.fifo.w_data.eq(0x43)
+            yield self.fifo.r_en.eq(0)
+            yield Tick()
+            yield self.fifo.w_en.eq(0)
+            yield Settle()
+            self.assertFalse((yield self.fifo.r_rdy))
+            yield Tick()
+            yield Settle()
+            self.assertTrue((yield self.fifo.r_rdy))
+            self.assertEqual((yield self.fifo.r_data), 0x43)
+
+        self.sim.add_process(process)
+        self.sim.run()
+
+
+if __name__ == "__main__":
+    unittest.main()
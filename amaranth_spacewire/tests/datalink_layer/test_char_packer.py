@@ -0,0 +1,155 @@
+import random
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.misc.char_packer import CharPacker, CharUnpacker
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+LANES = 4
+TICKS = 2000
+FLUSH_TIMEOUT = 16
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.build(FLUSH_TIMEOUT)
+
+    def build(self, flush_timeout):
+        m = Module()
+        m.submodules.unpacker = self.unpacker = CharUnpacker(LANES)
+        m.submodules.packer = self.packer = CharPacker(LANES, flush_timeout)
+        # Characters between the two, on some clock cycles only, like the
+        # link FIFOs
+        self.link_gate = Signal()
+        m.d.comb += [
+            self.packer.w_en.eq(self.unpacker.r_rdy & self.link_gate),
+            self.packer.w_data.eq(self.unpacker.r_data),
+            self.unpacker.r_en.eq(self.packer.w_rdy & self.link_gate),
+        ]
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.written = []
+        self.words = []
+
+    def stimuli(self):
+        rng = random.Random(21)
+        for i in range(TICKS):
+            # Bursts of words, then of idle link
+            writing = (i // 300) % 2 == 0
+            yield self.link_gate.eq(rng.random() < (0.9 if writing else 0.5))
+            valid = rng.randrange(2**LANES) if writing else 0
+            eop = 0
+            chars = []
+            for j in range(LANES):
+                if valid & (1 << j):
+                    if rng.random() < 0.1:
+                        eop |= 1 << j
+                        chars.append(rng.choice([CHAR_EOP.value, CHAR_EEP.value]))
+                    else:
+                        chars.append(rng.randrange(256))
+                else:
+                    chars.append(0)
+            yield self.unpacker.w_en.eq(valid != 0)
+            yield self.unpacker.w_valid.eq(valid)
+            yield self.unpacker.w_eop.eq(eop)
+            yield self.unpacker.w_data.eq(sum((c & 0xff) << (8 * j) for j, c in enumerate(chars)))
+            yield Settle()
+            if valid and (yield self.unpacker.w_rdy):
+                self.written += [c for j, c in enumerate(chars) if valid & (1 << j)]
+            yield Tick()
+        yield self.unpacker.w_en.eq(0)
+
+    def capture(self, read_rate):
+        rng = random.Random(12)
+        for _ in range(TICKS + 100):
+            yield self.packer.r_en.eq(rng.random() < read_rate)
+            yield Settle()
+            if (yield self.packer.r_en) and (yield self.packer.r_rdy):
+                data = yield self.packer.r_data
+                valid = yield self.packer.r_valid
+                eop = yield self.packer.r_eop
+                self.words.append([((data >> (8 * j)) & 0xff) | (((eop >> j) & 1) << 8)
+                                   for j in range(LANES) if valid & (1 << j)])
+                self.assertEqual(valid & (valid + 1), 0)
+            yield Tick()
+
+    def check_packer(self, name, read_rate):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(lambda: (yield from self.capture(read_rate)))
+
+        vcd = get_vcd_filename(name)
+        gtkw = get_gtkw_filename(name)
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.unpacker.ports() + self.packer.ports()):
+            self.sim.run()
+
+        received = [c for word in self.words for c in word]
+        self.assertEqual(received, self.written)
+        # End of packet markers end the words
+        for word in self.words:
+            self.assertTrue(all(c < 0x100 for c in word[:-1]))
+        print("{0} characters in {1} words, {2} full".format(
+            len(received), len(self.words), sum(len(word) == LANES for word in self.words)))
+        self.assertGreater(sum(len(word) == LANES for word in self.words), len(self.words) // 2)
+
+    def test_packer(self):
+        self.check_packer("char_packer", 0.3)
+
+    def test_polling(self):
+        # A reader polling all the time still gets full words
+        self.check_packer("char_packer_polling", 1)
+
+    def test_no_timeout(self):
+        self.build(None)
+
+        def write(c, eop=0):
+            yield self.unpacker.w_en.eq(1)
+            yield self.unpacker.w_valid.eq(1)
+            yield self.unpacker.w_eop.eq(eop)
+            yield self.unpacker.w_data.eq(c & 0xff)
+            yield Settle()
+            while not (yield self.unpacker.w_rdy):
+                yield Tick()
+                yield Settle()
+            yield Tick()
+            yield self.unpacker.w_en.eq(0)
+
+        def process():
+            yield self.link_gate.eq(1)
+            yield self.packer.r_en.eq(1)
+            for c in [1, 2, 3]:
+                yield from write(c)
+            # The partial word waits for its last character
+            for _ in range(100):
+                yield Settle()
+                self.assertFalse((yield self.packer.r_rdy))
+                yield Tick()
+            yield from write(CHAR_EOP.value, eop=1)
+            for _ in range(10):
+                yield Settle()
+                if (yield self.packer.r_rdy):
+                    break
+                yield Tick()
+            self.assertEqual((yield self.packer.r_valid), 0b1111)
+            self.assertEqual((yield self.packer.r_eop), 0b1000)
+            self.assertEqual((yield self.packer.r_data), 0x030201 | (CHAR_EOP.value & 0xff) << 24)
+
+        self.sim.add_process(process)
+        self.sim.run()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            CharPacker(1)
+        with self.assertRaises(ValueError):
+            CharPacker(LANES, 0)
+        with self.assertRaises(ValueError):
+            CharUnpacker(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
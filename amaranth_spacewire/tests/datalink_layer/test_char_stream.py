@@ -0,0 +1,125 @@
+import random
+import unittest
+
+from amaranth import *
+from amaranth.lib.fifo import SyncFIFOBuffered
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.misc.char_stream import StreamToChars, CharsToStream
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+PACKETS = 40
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.to_chars = self.to_chars = StreamToChars()
+        m.submodules.fifo = self.fifo = SyncFIFOBuffered(width=9, depth=8)
+        m.submodules.to_stream = self.to_stream = CharsToStream()
+        m.d.comb += [
+            self.fifo.w_en.eq(self.to_chars.r_rdy),
+            self.fifo.w_data.eq(self.to_chars.r_data),
+            self.to_chars.r_en.eq(self.fifo.w_rdy),
+            self.to_stream.w_en.eq(self.fifo.r_rdy),
+            self.to_stream.w_data.eq(self.fifo.r_data),
+            self.fifo.r_en.eq(self.to_stream.w_rdy),
+        ]
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+
+        rng = random.Random(22)
+        self.packets = [([rng.randrange(256) for _ in range(rng.randrange(1, 12))], rng.random() < 0.3)
+                        for _ in range(PACKETS)]
+        self.chars = []
+        self.received = []
+
+    def stimuli(self):
+        rng = random.Random(1)
+        for data, error in self.packets:
+            for i, byte in enumerate(data):
+                yield self.to_chars.valid.eq(0)
+                while rng.random() < 0.3:
+                    yield Tick()
+                yield self.to_chars.valid.eq(1)
+                yield self.to_chars.data.eq(byte)
+                yield self.to_chars.last.eq(i == len(data) - 1)
+                yield self.to_chars.error.eq(error and i == len(data) - 1)
+                yield Settle()
+                while not (yield self.to_chars.ready):
+                    yield Tick()
+                    yield Settle()
+                yield Tick()
+        yield self.to_chars.valid.eq(0)
+
+    def monitor(self):
+        # Characters written to the FIFO
+        for _ in range(2000):
+            yield Settle()
+            if (yield self.fifo.w_en) and (yield self.fifo.w_rdy):
+                self.chars.append((yield self.fifo.w_data))
+            yield Tick()
+
+    def capture(self):
+        rng = random.Random(2)
+        packet = []
+        for _ in range(2000):
+            yield self.to_stream.ready.eq(rng.random() < 0.6)
+            yield Settle()
+            if (yield self.to_stream.valid) and (yield self.to_stream.ready):
+                packet.append((yield self.to_stream.data))
+                if (yield self.to_stream.last):
+                    self.received.append((packet, bool((yield self.to_stream.error))))
+                    packet = []
+                else:
+                    self.assertFalse((yield self.to_stream.error))
+            yield Tick()
+
+    def test_stream(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.monitor)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("char_stream")
+        gtkw = get_gtkw_filename("char_stream")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.to_chars.ports() + self.to_stream.ports()):
+            self.sim.run()
+
+        expected_chars = []
+        for data, error in self.packets:
+            expected_chars += data + [CHAR_EEP.value if error else CHAR_EOP.value]
+        self.assertEqual(self.chars, expected_chars)
+        self.assertEqual(self.received, self.packets)
+
+    def test_empty_packet(self):
+        # Markers without bytes are dropped
+        def process():
+            yield self.to_stream.ready.eq(1)
+            for c in [CHAR_EOP.value, 0x12, CHAR_EEP.value, CHAR_EEP.value, 0x34, 0x56, CHAR_EOP.value]:
+                yield self.to_stream.w_en.eq(1)
+                yield self.to_stream.w_data.eq(c)
+                yield Tick()
+            yield self.to_stream.w_en.eq(0)
+
+        def capture():
+            for _ in range(12):
+                yield Settle()
+                if (yield self.to_stream.valid):
+                    self.received.append(((yield self.to_stream.data), (yield self.to_stream.last), (yield self.to_stream.error)))
+                yield Tick()
+
+        sim = Simulator(self.to_stream)
+        sim.add_clock(1/SRCFREQ)
+        sim.add_process(process)
+        sim.add_process(capture)
+        sim.run()
+
+        self.assertEqual(self.received, [(0x12, 1, 1), (0x34, 0, 0), (0x56, 1, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
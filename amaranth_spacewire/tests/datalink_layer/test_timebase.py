@@ -0,0 +1,60 @@
+import unittest
+
+from amaranth import *
+
+from amaranth_spacewire.datalink.fsm import DataLinkFSM
+from amaranth_spacewire.encoding.spw_disconnect_detector import SpWDisconnectDetector
+from amaranth_spacewire.misc.spw_delay import SpWDelay
+from amaranth_spacewire.misc.timebase import Timebase
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 200e6
+TIMEBASE_FREQ = 25e6
+
+
+class Benchmark(unittest.TestCase):
+    def test_benchmark(self):
+        timebase = Timebase(SRCFREQ, TIMEBASE_FREQ)
+        designs = {
+            "clock cycles": [DataLinkFSM(SRCFREQ), SpWDisconnectDetector(SRCFREQ)],
+            "timebase": [DataLinkFSM(SRCFREQ, timebase_freq=timebase.freq),
+                         SpWDisconnectDetector(SRCFREQ, timebase_freq=timebase.freq)],
+        }
+        results = {}
+        for name, (fsm, disc) in designs.items():
+            fsm_stats = rtlil_stats(fsm, fsm.ports())
+            disc_stats = rtlil_stats(disc, disc.ports())
+            results[name] = fsm_stats['ff_bits'] + disc_stats['ff_bits']
+            print("Delays counting {0}: {1} flip-flop bits in the link FSM, {2} in the disconnect detector".format(
+                name, fsm_stats['ff_bits'], disc_stats['ff_bits']))
+        timebase_bits = rtlil_stats(timebase, timebase.ports())['ff_bits']
+        print("Timebase shared by all the delays: {0} flip-flop bits".format(timebase_bits))
+
+        self.assertLess(results["timebase"], results["clock cycles"])
+
+    def test_bounds(self):
+        # The link delays, and the disconnect delay without its half
+        for delay, half in [(12.8e-6, True), (850e-9, False)]:
+            d = SpWDelay(SRCFREQ, delay, strategy='at_most', tick_freq=TIMEBASE_FREQ, half=half)
+            print("{0:.0f} ns delay: {1:.0f} to {2:.0f} ns".format(delay * 1e9, d.min_delay * 1e9, d.max_delay * 1e9))
+            self.assertLessEqual(d.max_delay, delay)
+            self.assertGreaterEqual(d.min_delay, 0.9 * delay)
+            d = SpWDelay(SRCFREQ, delay, strategy='at_least', tick_freq=TIMEBASE_FREQ, half=half)
+            self.assertGreaterEqual(d.min_delay, delay)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            SpWDelay(SRCFREQ, 850e-9, strategy='at_most', tick_freq=1e6)
+        with self.assertRaises(ValueError):
+            SpWDelay(SRCFREQ, 850e-9, strategy='at_most', tick_freq=10e6)
+        # Long enough for the full delay, not for the half one
+        with self.assertRaises(ValueError):
+            SpWDelay(SRCFREQ, 850e-9, strategy='at_most', tick_freq=2e6)
+        # The full delay is within the bound, not the half one
+        SpWDelay(SRCFREQ, 850e-9, strategy='at_most', tick_freq=TIMEBASE_FREQ, half=False)
+        with self.assertRaises(ValueError):
+            SpWDelay(SRCFREQ, 850e-9, strategy='at_most', tick_freq=TIMEBASE_FREQ)
+
+
+if __name__ == "__main__":
+    unittest.main()
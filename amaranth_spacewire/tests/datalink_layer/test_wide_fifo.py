@@ -0,0 +1,59 @@
+import random
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.misc.wide_sync_fifo import WideSyncFIFO
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+LANES = 2
+DEPTH = 56
+TICKS = 2000
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.fifo = self.fifo = WideSyncFIFO(9, DEPTH, LANES)
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+
+    def stimuli(self):
+        rng = random.Random(16)
+        written = []
+        read = []
+        value = 0
+        for i in range(TICKS):
+            # Bursts of writes, then of reads
+            writing = (i // 200) % 2 == 0
+            count = rng.randrange(LANES + 1) if writing or rng.random() < 0.2 else 0
+            if not (yield self.fifo.w_rdy):
+                count = 0
+            yield self.fifo.w_count.eq(count)
+            yield self.fifo.w_data.eq(sum(((value + j) & 0x1ff) << (9 * j) for j in range(count)))
+            written += [(value + j) & 0x1ff for j in range(count)]
+            value += count
+            yield self.fifo.r_en.eq(rng.random() < (0.3 if writing else 0.9))
+            yield Settle()
+            if (yield self.fifo.r_en) and (yield self.fifo.r_rdy):
+                read.append((yield self.fifo.r_data))
+            yield Tick()
+            yield Settle()
+            self.assertLessEqual((yield self.fifo.level), DEPTH)
+
+        self.assertGreater(len(read), DEPTH)
+        self.assertEqual(read, written[:len(read)])
+
+    def test_fifo(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.run()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            WideSyncFIFO(9, DEPTH + 1, LANES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import random
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.ds_shift_registers import DSInputControlCharSR, DSInputDataCharSR, DSInputUnifiedCharSR
+from amaranth_spacewire.tests.spw_test_utils import *
+
+PORTS = 8
+TICKS = 3000
+
+
+class SplitSRs(Elaboratable):
+    """The control and data shift registers, fed with the same bits."""
+    def __init__(self):
+        self.i_reset = Signal()
+        self.i_input = Signal()
+        self.i_store = Signal()
+        self.control_sr = DSInputControlCharSR()
+        self.data_sr = DSInputDataCharSR()
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.control_sr = self.control_sr
+        m.submodules.data_sr = self.data_sr
+        for sr in [self.control_sr, self.data_sr]:
+            m.d.comb += [
+                sr.i_reset.eq(self.i_reset),
+                sr.i_input.eq(self.i_input),
+                sr.i_store.eq(self.i_store),
+            ]
+        return m
+
+    def ports(self):
+        return [self.i_reset, self.i_input, self.i_store] + self.control_sr.ports()[2:] + [
+            self.control_sr.o_detected, self.data_sr.o_char, self.data_sr.o_parity_next, self.data_sr.o_detected
+        ]
+
+
+class Benchmark(unittest.TestCase):
+    def test_benchmark(self):
+        split = SplitSRs()
+        unified = DSInputUnifiedCharSR()
+        results = {
+            "control and data shift registers": rtlil_stats(split, split.ports()),
+            "unified shift register": rtlil_stats(unified, unified.ports()),
+        }
+        for name, result in results.items():
+            print("{0}: {1} flip-flop bits, {2} logic cells per port, {3} and {4} for {5} ports".format(
+                name, result['ff_bits'], result['cells'], PORTS * result['ff_bits'], PORTS * result['cells'], PORTS))
+
+        self.assertLess(results["unified shift register"]['ff_bits'], results["control and data shift registers"]['ff_bits'])
+        self.assertLess(results["unified shift register"]['cells'], results["control and data shift registers"]['cells'])
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.split = self.split = SplitSRs()
+        m.submodules.unified = self.unified = DSInputUnifiedCharSR()
+        m.d.comb += [
+            self.unified.i_reset.eq(self.split.i_reset),
+            self.unified.i_input.eq(self.split.i_input),
+            self.unified.i_store.eq(self.split.i_store),
+        ]
+        self.sim = Simulator(m)
+        self.sim.add_clock(1e-6)
+
+    def stimuli(self):
+        rng = random.Random(14)
+        control_sr = self.split.control_sr
+        data_sr = self.split.data_sr
+        for _ in range(TICKS):
+            yield self.split.i_reset.eq(rng.random() < 0.01)
+            yield self.split.i_input.eq(rng.getrandbits(1))
+            yield self.split.i_store.eq(rng.random() < 0.7)
+            yield Tick()
+            yield Settle()
+            pairs = [
+                (self.unified.o_char, data_sr.o_char),
+                (self.unified.o_parity_next, data_sr.o_parity_next),
+                (self.unified.o_detected_data, data_sr.o_detected),
+                (self.unified.o_control_char, control_sr.o_char),
+                (self.unified.o_control_parity_next, control_sr.o_parity_next),
+                (self.unified.o_detected_fct, control_sr.o_detected_fct),
+                (self.unified.o_detected_eop, control_sr.o_detected_eop),
+                (self.unified.o_detected_eep, control_sr.o_detected_eep),
+                (self.unified.o_detected_esc, control_sr.o_detected_esc),
+                (self.unified.o_detected_control, control_sr.o_detected),
+            ]
+            for unified, split in pairs:
+                self.assertEqual((yield unified), (yield split))
+
+    def test_shift_register(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.run()
+
+
+if __name__ == "__main__":
+    unittest.main()
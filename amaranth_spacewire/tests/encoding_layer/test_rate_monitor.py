@@ -0,0 +1,81 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 54e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+TXFREQ = 18e6
+WINDOW = 10e-6
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.tr = self.tr = Transmitter(SRCFREQ, RSTFREQ, TXFREQ, single_clock=True)
+        m.submodules.rx = self.rx = Receiver(SRCFREQ, rate_window=WINDOW)
+        m.d.comb += [
+            self.rx.data.eq(self.tr.data),
+            self.rx.strobe.eq(self.tr.strobe),
+        ]
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.measurements = []
+
+    def stimuli(self):
+        yield self.tr.enable.eq(1)
+        yield self.rx.enable.eq(1)
+        yield from ds_sim_delay(4 * WINDOW, SRCFREQ)
+        yield self.tr.switch_user_tx_freq.eq(1)
+
+    def capture(self):
+        for _ in range(ds_sim_period_to_ticks(8 * WINDOW, SRCFREQ)):
+            yield Tick()
+            yield Settle()
+            if (yield self.rx.rate_update):
+                self.measurements.append((
+                    (yield self.rx.rate_bits),
+                    (yield self.rx.rate_min_period),
+                    (yield self.rx.rate_max_period),
+                ))
+
+    def test_rate(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("rate_monitor")
+        gtkw = get_gtkw_filename("rate_monitor")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.rx.ports()):
+            self.sim.run()
+
+        for bits, min_period, max_period in self.measurements:
+            print("{0} bits, {1:.1f} Mb/s, bit period {2} to {3} clock cycles".format(
+                bits, bits / WINDOW / 1e6, min_period, max_period))
+
+        self.assertEqual(len(self.measurements), 8)
+        # The first window starts when the receiver is enabled, before the
+        # first bit. Then at the reset rate, from an integer divisor, and at
+        # the user rate once the transmitter switched.
+        reset_divisor = round(SRCFREQ / RSTFREQ)
+        for bits, min_period, max_period in self.measurements[1:4]:
+            self.assertAlmostEqual(bits, SRCFREQ / reset_divisor * WINDOW, delta=1)
+            self.assertEqual((min_period, max_period), (reset_divisor, reset_divisor))
+        for bits, min_period, max_period in self.measurements[-3:]:
+            self.assertAlmostEqual(bits, TXFREQ * WINDOW, delta=1)
+            self.assertEqual((min_period, max_period), (3, 3))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Receiver(SRCFREQ, recovered_clock=True, rate_window=WINDOW)
+        with self.assertRaises(ValueError):
+            Receiver(SRCFREQ, rate_window=1 / SRCFREQ)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 54e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+TXFREQ = 10e6
+CAPTURE_TICKS = 8000
+DATA = [(i * 37) & 0xff for i in range(40)]
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.tr = self.tr = Transmitter(SRCFREQ, RSTFREQ, TXFREQ, single_clock=True)
+        m.submodules.rx = self.rx = Receiver(SRCFREQ)
+        m.submodules.rx_early = self.rx_early = Receiver(SRCFREQ, early_release=True)
+        for rx in [self.rx, self.rx_early]:
+            m.d.comb += [
+                rx.data.eq(self.tr.data),
+                rx.strobe.eq(self.tr.strobe),
+            ]
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.received = {}
+        self.parity_valid = 0
+
+    def stimuli(self):
+        yield self.tr.enable.eq(1)
+        yield self.rx.enable.eq(1)
+        yield self.rx_early.enable.eq(1)
+        yield from ds_sim_delay(5e-6, SRCFREQ)
+        yield self.tr.switch_user_tx_freq.eq(1)
+        yield from ds_sim_delay(2e-6, SRCFREQ)
+
+        yield self.tr.send.eq(1)
+        for c in DATA + [CHAR_EOP.value]:
+            yield self.tr.char.eq(c)
+            yield Settle()
+            while not (yield self.tr.sent_n_char):
+                yield Tick()
+                yield Settle()
+            yield Tick()
+        yield self.tr.send.eq(0)
+
+    def capture(self, rx):
+        def process():
+            received = self.received[rx] = []
+            for i in range(CAPTURE_TICKS):
+                yield Tick()
+                yield Settle()
+                if (yield rx.got_n_char):
+                    received.append((i, (yield rx.char)))
+                if (yield rx.parity_error) | (yield rx.read_error) | (yield rx.esc_error):
+                    received.append((i, None))
+                if rx is self.rx_early:
+                    self.parity_valid += yield rx.parity_valid
+        return process
+
+    def test_receiver(self):
+        self.sim.add_process(self.stimuli)
+        for rx in [self.rx, self.rx_early]:
+            self.sim.add_process(self.capture(rx))
+
+        vcd = get_vcd_filename("early_release")
+        gtkw = get_gtkw_filename("early_release")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.rx_early.ports()):
+            self.sim.run()
+
+        normal = self.received[self.rx]
+        early = self.received[self.rx_early]
+        expected = DATA + [CHAR_EOP.value]
+        self.assertEqual([c for _, c in normal], expected)
+        self.assertEqual([c for _, c in early], expected)
+        # Each character but the last one was checked by the next one
+        self.assertGreaterEqual(self.parity_valid, len(expected) - 1)
+
+        # The characters are output before the next header is received
+        savings = [n - e for (n, _), (e, _) in zip(normal, early)]
+        print("Character output {0} to {1} clock cycles earlier, two bits are {2:.1f} cycles".format(
+            min(savings), max(savings), 2 * SRCFREQ / TXFREQ))
+        self.assertGreaterEqual(min(savings), int(2 * SRCFREQ / TXFREQ))
+
+
+if __name__ == "__main__":
+    unittest.main()
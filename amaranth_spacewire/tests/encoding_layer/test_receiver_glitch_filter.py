@@ -0,0 +1,121 @@
+import random
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 100e6
+# Ten clock cycles per bit
+TXFREQ = Transmitter.TX_FREQ_RESET
+GLITCH_FILTER = 3
+# Glitches of up to two clock cycles, on Data or Strobe
+GLITCH_WIDTHS = [1, 2]
+GLITCH_SPACING = 37
+GLITCH_START = 5e-6
+CAPTURE_TICKS = 6000
+DATA = [(i * 53) & 0xff for i in range(30)]
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.tr = self.tr = Transmitter(SRCFREQ, TXFREQ, TXFREQ, single_clock=True)
+        m.submodules.rx = self.rx = Receiver(SRCFREQ)
+        m.submodules.rx_filter = self.rx_filter = Receiver(SRCFREQ, glitch_filter=GLITCH_FILTER)
+        self.glitch_d = Signal()
+        self.glitch_s = Signal()
+        for rx in [self.rx, self.rx_filter]:
+            m.d.comb += [
+                rx.data.eq(self.tr.data ^ self.glitch_d),
+                rx.strobe.eq(self.tr.strobe ^ self.glitch_s),
+            ]
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.received = {}
+        self.nulls = {}
+        self.glitches = 0
+
+    def stimuli(self):
+        yield self.tr.enable.eq(1)
+        yield self.rx.enable.eq(1)
+        yield self.rx_filter.enable.eq(1)
+        yield from ds_sim_delay(GLITCH_START + 2e-6, SRCFREQ)
+
+        yield self.tr.send.eq(1)
+        for c in DATA + [CHAR_EOP.value]:
+            yield self.tr.char.eq(c)
+            yield Settle()
+            while not (yield self.tr.sent_n_char):
+                yield Tick()
+                yield Settle()
+            yield Tick()
+        yield self.tr.send.eq(0)
+
+    def glitch(self):
+        rng = random.Random(19)
+        yield from ds_sim_delay(GLITCH_START, SRCFREQ)
+        for _ in range((CAPTURE_TICKS - ds_sim_period_to_ticks(GLITCH_START, SRCFREQ)) // GLITCH_SPACING):
+            signal = self.glitch_d if rng.random() < 0.5 else self.glitch_s
+            width = rng.choice(GLITCH_WIDTHS)
+            yield signal.eq(1)
+            for _ in range(width):
+                yield Tick()
+            yield signal.eq(0)
+            self.glitches += 1
+            for _ in range(GLITCH_SPACING - width):
+                yield Tick()
+
+    def capture(self, rx):
+        def process():
+            received = self.received[rx] = []
+            nulls = self.nulls[rx] = []
+            error_prev = 0
+            for i in range(CAPTURE_TICKS):
+                yield Tick()
+                yield Settle()
+                if (yield rx.got_n_char):
+                    received.append((yield rx.char))
+                if (yield rx.got_null):
+                    nulls.append(i)
+                # The errors are held until the receiver is disabled
+                error = (yield rx.parity_error) | (yield rx.read_error) | (yield rx.esc_error)
+                if error and not error_prev:
+                    received.append(None)
+                error_prev = error
+        return process
+
+    def test_receiver(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.glitch)
+        for rx in [self.rx, self.rx_filter]:
+            self.sim.add_process(self.capture(rx))
+
+        vcd = get_vcd_filename("glitch_filter")
+        gtkw = get_gtkw_filename("glitch_filter")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.rx_filter.ports()):
+            self.sim.run()
+
+        print("{0} glitches: {1} errors without the filter, {2} with it".format(
+            self.glitches, self.received[self.rx].count(None), self.received[self.rx_filter].count(None)))
+        # Without the filter, the glitches are decoded as bits
+        self.assertIn(None, self.received[self.rx])
+        self.assertEqual(self.received[self.rx_filter], DATA + [CHAR_EOP.value])
+
+        # Before the glitches, the filter delays each character by its width
+        self.assertEqual(self.rx_filter.latency - self.rx.latency, GLITCH_FILTER)
+        self.assertEqual(self.nulls[self.rx_filter][0] - self.nulls[self.rx][0], GLITCH_FILTER)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Receiver(SRCFREQ, input_width=2, glitch_filter=GLITCH_FILTER)
+
+
+if __name__ == "__main__":
+    unittest.main()
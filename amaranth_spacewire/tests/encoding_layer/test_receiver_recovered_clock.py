@@ -0,0 +1,137 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle, Delay
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.misc.serdes_output import SerDesOutput
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 50e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+# Four bits per core clock cycle
+TXFREQ = 200e6
+WIDTH = 8
+CAPTURE_TICKS = 3000
+# Data characters sent, then EOPs
+PACKETS = [[c & 0xff for c in range(i * 37, i * 37 + 30)] for i in range(8)]
+TIME = 0x2a
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.tr = self.tr = Transmitter(SRCFREQ, RSTFREQ, TXFREQ, single_clock=True, serializer_width=WIDTH)
+        m.submodules.ser_d = ser_d = SerDesOutput(WIDTH)
+        m.submodules.ser_s = ser_s = SerDesOutput(WIDTH)
+        # One receiver enabled from the start, one enabled once the link runs
+        # at the user rate
+        m.submodules.rx = self.rx = Receiver(SRCFREQ, recovered_clock=True)
+        m.submodules.rx_late = self.rx_late = Receiver(SRCFREQ, recovered_clock=True)
+        m.domains.fast = ClockDomain()
+
+        m.d.comb += [
+            ser_d.i_d.eq(self.tr.data_word),
+            ser_s.i_d.eq(self.tr.strobe_word),
+        ]
+        for rx in [self.rx, self.rx_late]:
+            m.d.comb += [rx.data.eq(ser_d.o), rx.strobe.eq(ser_s.o)]
+
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.sim.add_clock(1/SRCFREQ/WIDTH, phase=1/SRCFREQ/2 - 1/SRCFREQ/WIDTH/2, domain="fast")
+        self.received = Received()
+        self.received_late = Received()
+
+    def send(self, request, done, value=None, value_signal=None):
+        yield request.eq(1)
+        if value_signal is not None:
+            yield value_signal.eq(value)
+        yield Settle()
+        while not (yield done):
+            yield Tick()
+            yield Settle()
+        yield Tick()
+        yield request.eq(0)
+
+    def stimuli(self):
+        yield self.tr.enable.eq(1)
+        yield self.rx.enable.eq(1)
+        yield from ds_sim_delay(5e-6, SRCFREQ)
+        yield self.tr.switch_user_tx_freq.eq(1)
+        yield from ds_sim_delay(1e-6, SRCFREQ)
+        yield self.rx_late.enable.eq(1)
+        yield from ds_sim_delay(1e-6, SRCFREQ)
+
+        yield from self.send(self.tr.send_fct, self.tr.sent_fct)
+        yield from self.send(self.tr.send_time, self.tr.sent_time, TIME, self.tr.time)
+        for packet in PACKETS:
+            for c in packet + [CHAR_EOP.value]:
+                yield from self.send(self.tr.send, self.tr.sent_n_char, c, self.tr.char)
+        yield from self.send(self.tr.send_fct, self.tr.sent_fct)
+
+    def test_receiver(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(lambda: (yield from receive(self.rx, self.received, CAPTURE_TICKS)))
+        self.sim.add_process(lambda: (yield from receive(self.rx_late, self.received_late, CAPTURE_TICKS)))
+
+        vcd = get_vcd_filename("recovered_clock")
+        gtkw = get_gtkw_filename("recovered_clock")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.tr.ports() + self.rx.ports()):
+            self.sim.run()
+
+        expected = sum([packet + [CHAR_EOP.value] for packet in PACKETS], [])
+        for received in [self.received, self.received_late]:
+            self.assertEqual(received.chars, expected)
+            self.assertEqual(received.fcts, 2)
+            self.assertEqual(received.times, [TIME])
+            self.assertGreater(received.nulls, 0)
+            self.assertEqual(received.errors, 0)
+
+
+class TestAlignment(unittest.TestCase):
+    """The first ESC can start on a falling edge of the recovered clock, after
+    an odd number of bits."""
+    # Not a multiple of the core frequency
+    BITFREQ = 130e6
+    DATA = [0x00, 0xff, 0x5a, 0x81]
+
+    def setUp(self):
+        m = Module()
+        m.submodules.rx = self.rx = Receiver(SRCFREQ, recovered_clock=True)
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.received = Received()
+
+    def drive(self):
+        # A single bit first, then the characters, and NULLs until the end of
+        # the test
+        bits = [0] + ds_bits(['null'] * 3 + self.DATA + ['eop', 'fct'] + ['null'] * 150)
+        d, s = 0, 0
+        yield self.rx.enable.eq(1)
+        yield Delay(1e-6)
+        for b in bits:
+            if b == d:
+                s ^= 1
+            d = b
+            yield self.rx.data.eq(d)
+            yield self.rx.strobe.eq(s)
+            yield Delay(1 / self.BITFREQ)
+
+    def test_receiver(self):
+        self.sim.add_process(self.drive)
+        self.sim.add_process(lambda: (yield from receive(self.rx, self.received, 400)))
+        self.sim.run()
+
+        self.assertEqual(self.received.chars, self.DATA + [CHAR_EOP.value])
+        self.assertEqual(self.received.fcts, 1)
+        self.assertGreater(self.received.nulls, 3)
+        self.assertEqual(self.received.errors, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
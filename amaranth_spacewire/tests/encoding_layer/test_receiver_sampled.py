@@ -0,0 +1,158 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle, Delay
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.misc.serdes_input import SerDesInput
+from amaranth_spacewire.misc.serdes_output import SerDesOutput
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 50e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+TX_WIDTH = 8
+# (samples per clock cycle, user rate). Both rates are at least the core
+# frequency, above what the oversampling receiver can decode.
+CONFIGS = [(2, 50e6), (4, 100e6)]
+CAPTURE_TICKS = 3000
+PACKETS = [[c & 0xff for c in range(i * 37, i * 37 + 30)] for i in range(8)]
+TIME = 0x2a
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.domains.fast = ClockDomain()
+        self.trs = []
+        self.rxs = []
+        for i, (width, txfreq) in enumerate(CONFIGS):
+            tr = Transmitter(SRCFREQ, RSTFREQ, txfreq, single_clock=True, serializer_width=TX_WIDTH)
+            ser_d = SerDesOutput(TX_WIDTH)
+            ser_s = SerDesOutput(TX_WIDTH)
+            des_d = SerDesInput(width, fast_domain="samples_{0}".format(i))
+            des_s = SerDesInput(width, fast_domain="samples_{0}".format(i))
+            rx = Receiver(SRCFREQ, input_width=width)
+            m.submodules["tr_{0}".format(i)] = tr
+            m.submodules["ser_d_{0}".format(i)] = ser_d
+            m.submodules["ser_s_{0}".format(i)] = ser_s
+            m.submodules["des_d_{0}".format(i)] = des_d
+            m.submodules["des_s_{0}".format(i)] = des_s
+            m.submodules["rx_{0}".format(i)] = rx
+            m.domains += ClockDomain("samples_{0}".format(i))
+            m.d.comb += [
+                ser_d.i_d.eq(tr.data_word),
+                ser_s.i_d.eq(tr.strobe_word),
+                des_d.i.eq(ser_d.o),
+                des_s.i.eq(ser_s.o),
+                rx.data_word.eq(des_d.o_d),
+                rx.strobe_word.eq(des_s.o_d),
+            ]
+            self.trs.append(tr)
+            self.rxs.append(rx)
+
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.sim.add_clock(1/SRCFREQ/TX_WIDTH, phase=1/SRCFREQ/2 - 1/SRCFREQ/TX_WIDTH/2, domain="fast")
+        for i, (width, _) in enumerate(CONFIGS):
+            self.sim.add_clock(1/SRCFREQ/width, phase=1/SRCFREQ/2 - 1/SRCFREQ/width/2, domain="samples_{0}".format(i))
+        self.received = [Received() for _ in CONFIGS]
+
+    def send(self, request, done, value=None, value_signal=None):
+        yield request.eq(1)
+        if value_signal is not None:
+            yield value_signal.eq(value)
+        yield Settle()
+        while not (yield done):
+            yield Tick()
+            yield Settle()
+        yield Tick()
+        yield request.eq(0)
+
+    def stimuli(self, tr, rx):
+        def process():
+            yield tr.enable.eq(1)
+            yield rx.enable.eq(1)
+            yield from ds_sim_delay(5e-6, SRCFREQ)
+            yield tr.switch_user_tx_freq.eq(1)
+            yield from ds_sim_delay(1e-6, SRCFREQ)
+
+            yield from self.send(tr.send_fct, tr.sent_fct)
+            yield from self.send(tr.send_time, tr.sent_time, TIME, tr.time)
+            for packet in PACKETS:
+                for c in packet + [CHAR_EOP.value]:
+                    yield from self.send(tr.send, tr.sent_n_char, c, tr.char)
+            yield from self.send(tr.send_fct, tr.sent_fct)
+        return process
+
+    def test_receiver(self):
+        for tr, rx, received in zip(self.trs, self.rxs, self.received):
+            self.sim.add_process(self.stimuli(tr, rx))
+            self.sim.add_process(lambda rx=rx, received=received: (yield from receive(rx, received, CAPTURE_TICKS)))
+
+        vcd = get_vcd_filename("sampled")
+        gtkw = get_gtkw_filename("sampled")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.rxs[-1].ports()):
+            self.sim.run()
+
+        expected = sum([packet + [CHAR_EOP.value] for packet in PACKETS], [])
+        for received in self.received:
+            self.assertEqual(received.chars, expected)
+            self.assertEqual(received.fcts, 2)
+            self.assertEqual(received.times, [TIME])
+            self.assertGreater(received.nulls, 0)
+            self.assertEqual(received.errors, 0)
+
+
+class TestRate(unittest.TestCase):
+    """Bits at a rate which is not a multiple of the sampling rate, starting
+    on any sample."""
+    WIDTH = 4
+    # 1.5 samples per bit
+    BITFREQ = 133e6
+    DATA = [0x00, 0xff, 0x5a, 0x81]
+
+    def setUp(self):
+        m = Module()
+        m.submodules.des_d = self.des_d = SerDesInput(self.WIDTH)
+        m.submodules.des_s = self.des_s = SerDesInput(self.WIDTH)
+        m.submodules.rx = self.rx = Receiver(SRCFREQ, input_width=self.WIDTH)
+        m.domains.fast = ClockDomain()
+        m.d.comb += [
+            self.rx.data_word.eq(self.des_d.o_d),
+            self.rx.strobe_word.eq(self.des_s.o_d),
+        ]
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.sim.add_clock(1/SRCFREQ/self.WIDTH, phase=1/SRCFREQ/2 - 1/SRCFREQ/self.WIDTH/2, domain="fast")
+        self.received = Received()
+
+    def drive(self):
+        bits = [0] + ds_bits(['null'] * 3 + self.DATA + ['eop', 'fct'] + ['null'] * 150)
+        d, s = 0, 0
+        yield self.rx.enable.eq(1)
+        yield Delay(1e-6 + 1e-9)
+        for b in bits:
+            if b == d:
+                s ^= 1
+            d = b
+            yield self.des_d.i.eq(d)
+            yield self.des_s.i.eq(s)
+            yield Delay(1 / self.BITFREQ)
+
+    def test_receiver(self):
+        self.sim.add_process(self.drive)
+        self.sim.add_process(lambda: (yield from receive(self.rx, self.received, 400)))
+        self.sim.run()
+
+        self.assertEqual(self.received.chars, self.DATA + [CHAR_EOP.value])
+        self.assertEqual(self.received.fcts, 1)
+        self.assertGreater(self.received.nulls, 3)
+        self.assertEqual(self.received.errors, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+# Clock cycles per bit
+BIT_TICKS = [4, 10]
+DATA = 0x5a
+# Three NULLs, then the data character, whose parity is checked by the header
+# of the FCT
+CHARS = ['null'] * 3 + [DATA, 'fct', 'null']
+DATA_START = 3 * 8
+
+
+class Test(unittest.TestCase):
+    def latency(self, rx, bit_ticks, early_release):
+        """Clock cycles from the edge ending the last bit needed to output the
+        data character, to its output."""
+        sim = Simulator(rx)
+        sim.add_clock(1/SRCFREQ)
+        bits = ds_bits(CHARS)
+        starts = []
+        outputs = []
+
+        def drive():
+            yield rx.enable.eq(1)
+            d, s = 0, 0
+            for _ in range(bit_ticks):
+                yield Tick()
+            for i, b in enumerate(bits):
+                if b == d:
+                    s ^= 1
+                d = b
+                yield rx.data.eq(d)
+                yield rx.strobe.eq(s)
+                starts.append(bit_ticks * (i + 1))
+                for _ in range(bit_ticks):
+                    yield Tick()
+
+        def capture():
+            for i in range(bit_ticks * (len(bits) + 1) + 20):
+                yield Settle()
+                if (yield rx.got_n_char):
+                    outputs.append((i, (yield rx.char)))
+                yield Tick()
+
+        sim.add_process(drive)
+        sim.add_process(capture)
+        sim.run()
+
+        self.assertEqual([c for _, c in outputs], [DATA])
+        if early_release:
+            # Edge starting the header of the FCT
+            end = starts[DATA_START + 10]
+        else:
+            # Edge starting the first bit after the header of the FCT
+            end = starts[DATA_START + 12]
+        return outputs[0][0] - end
+
+    def test_latency(self):
+        for sync_stages in [1, 2, 3]:
+            for early_release in [False, True]:
+                for bit_ticks in BIT_TICKS:
+                    rx = Receiver(SRCFREQ, early_release=early_release, sync_stages=sync_stages)
+                    self.assertEqual(self.latency(rx, bit_ticks, early_release), rx.latency)
+            self.assertEqual(Receiver.latency_for(sync_stages=sync_stages), rx.latency)
+            print("{0} synchronization stage(s): {1} clock cycles".format(sync_stages, rx.latency))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Receiver(SRCFREQ, sync_stages=0)
+        self.assertIsNone(Receiver(SRCFREQ, recovered_clock=True).latency)
+        self.assertIsNone(Receiver.latency_for(input_width=4))
+
+
+if __name__ == "__main__":
+    unittest.main()
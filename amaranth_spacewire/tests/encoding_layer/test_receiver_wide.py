@@ -0,0 +1,121 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.receiver import Receiver
+from amaranth_spacewire.misc.serdes_input import SerDesInput
+from amaranth_spacewire.misc.serdes_output import SerDesOutput
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 50e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+# Eight bits per core clock cycle, sampled once each
+WIDTH = 8
+TXFREQ = 400e6
+CHARS_PER_CYCLE = 2
+CAPTURE_TICKS = 3000
+# Short and long packets, so that control characters follow data characters
+PACKETS = [[c & 0xff for c in range(i * 37, i * 37 + 1 + (i * 7) % 12)] for i in range(16)]
+TIME = 0x15
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.tr = self.tr = Transmitter(SRCFREQ, RSTFREQ, TXFREQ, single_clock=True, serializer_width=WIDTH)
+        m.submodules.ser_d = ser_d = SerDesOutput(WIDTH)
+        m.submodules.ser_s = ser_s = SerDesOutput(WIDTH)
+        m.submodules.des_d = des_d = SerDesInput(WIDTH)
+        m.submodules.des_s = des_s = SerDesInput(WIDTH)
+        m.submodules.rx = self.rx = Receiver(SRCFREQ, input_width=WIDTH, chars_per_cycle=CHARS_PER_CYCLE)
+        m.domains.fast = ClockDomain()
+        m.d.comb += [
+            ser_d.i_d.eq(self.tr.data_word),
+            ser_s.i_d.eq(self.tr.strobe_word),
+            des_d.i.eq(ser_d.o),
+            des_s.i.eq(ser_s.o),
+            self.rx.data_word.eq(des_d.o_d),
+            self.rx.strobe_word.eq(des_s.o_d),
+        ]
+
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.sim.add_clock(1/SRCFREQ/WIDTH, phase=1/SRCFREQ/2 - 1/SRCFREQ/WIDTH/2, domain="fast")
+        self.chars = []
+        self.times = []
+        self.fcts = 0
+        self.errors = 0
+        self.wide_cycles = 0
+
+    def send(self, request, done, value=None, value_signal=None):
+        yield request.eq(1)
+        if value_signal is not None:
+            yield value_signal.eq(value)
+        yield Settle()
+        while not (yield done):
+            yield Tick()
+            yield Settle()
+        yield Tick()
+        yield request.eq(0)
+
+    def stimuli(self):
+        yield self.tr.enable.eq(1)
+        yield self.rx.enable.eq(1)
+        yield from ds_sim_delay(5e-6, SRCFREQ)
+        yield self.tr.switch_user_tx_freq.eq(1)
+        yield from ds_sim_delay(1e-6, SRCFREQ)
+
+        yield from self.send(self.tr.send_fct, self.tr.sent_fct)
+        yield from self.send(self.tr.send_time, self.tr.sent_time, TIME, self.tr.time)
+        for packet in PACKETS:
+            for c in packet + [CHAR_EOP.value]:
+                yield from self.send(self.tr.send, self.tr.sent_n_char, c, self.tr.char)
+        yield from self.send(self.tr.send_fct, self.tr.sent_fct)
+
+    def capture(self):
+        for _ in range(CAPTURE_TICKS):
+            yield Tick()
+            yield Settle()
+            n_chars = yield self.rx.n_chars
+            chars = yield self.rx.chars
+            for i in range(n_chars):
+                self.chars.append((chars >> (9 * i)) & 0x1ff)
+            if n_chars:
+                self.assertTrue((yield self.rx.got_n_char))
+            if (yield self.rx.got_bc):
+                self.times.append((yield self.rx.char))
+            self.fcts += yield self.rx.fcts
+            self.wide_cycles += n_chars + (yield self.rx.fcts) > 1
+            self.errors |= (yield self.rx.parity_error) | (yield self.rx.read_error) | (yield self.rx.esc_error)
+
+    def test_receiver(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("wide")
+        gtkw = get_gtkw_filename("wide")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.rx.ports()):
+            self.sim.run()
+
+        expected = sum([packet + [CHAR_EOP.value] for packet in PACKETS], [])
+        self.assertEqual(self.chars, expected)
+        self.assertEqual(self.fcts, 2)
+        self.assertEqual(self.times, [TIME])
+        self.assertEqual(self.errors, 0)
+        print("{0} clock cycles with two characters received".format(self.wide_cycles))
+        self.assertGreater(self.wide_cycles, 0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Receiver(SRCFREQ, input_width=WIDTH)
+        with self.assertRaises(ValueError):
+            Receiver(SRCFREQ, chars_per_cycle=CHARS_PER_CYCLE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.rx_statistics import RxStatistics
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 10e6
+CHARS_PER_CYCLE = 3
+
+
+class SmallRxStatistics(RxStatistics):
+    # Short blocks and narrow error counters, to reach the end of the blocks
+    # and the saturation quickly
+    ERRORS_WIDTH = 3
+    BLOCK = 100
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.dut = SmallRxStatistics(CHARS_PER_CYCLE)
+        self.sim = Simulator(self.dut)
+        self.sim.add_clock(1/SRCFREQ)
+        self.per_million = []
+
+    def error(self, signal, cycles=5):
+        # The receiver holds its errors until it is reset
+        yield signal.eq(1)
+        for _ in range(cycles):
+            yield Tick()
+        yield signal.eq(0)
+        yield Tick()
+
+    def stimuli(self):
+        # First block, with two parity errors and a read error
+        yield self.dut.i_chars.eq(CHARS_PER_CYCLE)
+        yield from self.error(self.dut.i_parity_error)
+        yield from self.error(self.dut.i_parity_error)
+        yield from self.error(self.dut.i_read_error)
+        for _ in range(20):
+            yield Tick()
+        # Second block, with errors until the saturation of the escape errors
+        yield self.dut.i_chars.eq(1)
+        for _ in range(10):
+            yield from self.error(self.dut.i_esc_error, cycles=1)
+        yield from self.error(self.dut.i_disconnect_error)
+        for _ in range(100):
+            yield Tick()
+        yield Settle()
+
+        self.assertEqual((yield self.dut.o_chars), 38 * CHARS_PER_CYCLE + 126)
+        self.assertEqual((yield self.dut.o_parity_errors), 2)
+        self.assertEqual((yield self.dut.o_esc_errors), 7)
+        self.assertEqual((yield self.dut.o_read_errors), 1)
+        self.assertEqual((yield self.dut.o_disconnect_errors), 1)
+
+        yield self.dut.i_clear.eq(1)
+        yield Tick()
+        yield self.dut.i_clear.eq(0)
+        yield self.dut.i_chars.eq(0)
+        yield Tick()
+        yield Settle()
+        for signal in [self.dut.o_chars, self.dut.o_parity_errors, self.dut.o_esc_errors,
+                       self.dut.o_read_errors, self.dut.o_disconnect_errors, self.dut.o_errors_per_million]:
+            self.assertEqual((yield signal), 0)
+
+    def capture(self):
+        per_million_prev = 0
+        for _ in range(300):
+            yield Tick()
+            yield Settle()
+            per_million = yield self.dut.o_errors_per_million
+            if per_million != per_million_prev:
+                self.per_million.append(per_million)
+            per_million_prev = per_million
+
+    def test_rx_statistics(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("rx_statistics")
+        gtkw = get_gtkw_filename("rx_statistics")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.dut.ports()):
+            self.sim.run()
+
+        # Three errors in the first block, and the 11 of the second one,
+        # saturated, before the clear
+        self.assertEqual(self.per_million, [3, 7, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
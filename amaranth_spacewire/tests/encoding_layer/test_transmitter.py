@@ -91,5 +91,39 @@ class Test(unittest.TestCase):
             self.sim.run()
 
 
+class Nulls(unittest.TestCase):
+    def stimuli(self):
+        yield self.tr.enable.eq(1)
+        yield from ds_sim_ticks_tx(20, SRCFREQ, TXFREQ)
+
+    def capture(self):
+        self.bits = yield from ds_sim_capture_bits(self.tr.data, self.tr.strobe, ds_sim_period_to_ticks(100 / TXFREQ, SRCFREQ))
+
+    def test_transmitter(self):
+        for streaming in [False, True]:
+            m = Module()
+            m.submodules.tr = self.tr = Transmitter(SRCFREQ, streaming=streaming)
+            self.sim = Simulator(m)
+            self.sim.add_clock(1/SRCFREQ)
+            self.sim.add_process(self.stimuli)
+            self.sim.add_process(self.capture)
+            self.sim.run()
+
+            # ESC and FCT back to back, without gaps
+            kinds = [k for _, k, _ in ds_decode_chars(self.bits)]
+            self.assertGreater(len(kinds), 20)
+            self.assertEqual(kinds, ['esc', 'fct'] * (len(kinds) // 2) + ['esc'] * (len(kinds) % 2))
+            ticks = [t for t, _ in self.bits]
+            self.assertEqual(set(b - a for a, b in zip(ticks, ticks[1:])), {round(SRCFREQ / TXFREQ)})
+
+            # Odd parity over the data bits of the previous character, and the
+            # parity and control bits of the current one
+            values = [b for _, b in self.bits]
+            prev_data = 0
+            for i in range(0, len(values) - 3, 4):
+                self.assertEqual(prev_data ^ values[i] ^ values[i + 1], 1)
+                prev_data = values[i + 2] ^ values[i + 3]
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
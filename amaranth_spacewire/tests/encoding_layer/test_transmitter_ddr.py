@@ -0,0 +1,135 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle, Delay
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.misc.clock_divider import ClockDivider
+from amaranth_spacewire.misc.ddr_output import DDROutput
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+# One bit per clock cycle, and one bit every three half cycles, which is not
+# reachable without a DDR output
+TXFREQS = [SRCFREQ, 2 * SRCFREQ // 3]
+CAPTURE_TICKS = 3000
+
+
+def add_trs(test):
+    m = Module()
+    test.trs = []
+    for i, txfreq in enumerate(TXFREQS):
+        tr = Transmitter(SRCFREQ, RSTFREQ, txfreq, single_clock=True, ddr=True)
+        m.submodules["tr_{0}".format(i)] = tr
+        test.trs.append(tr)
+    m.submodules.ddr_d = test.ddr_d = DDROutput()
+    m.submodules.ddr_s = test.ddr_s = DDROutput()
+    m.d.comb += [
+        test.ddr_d.i_d0.eq(test.trs[-1].data_ddr[0]),
+        test.ddr_d.i_d1.eq(test.trs[-1].data_ddr[1]),
+        test.ddr_s.i_d0.eq(test.trs[-1].strobe_ddr[0]),
+        test.ddr_s.i_d1.eq(test.trs[-1].strobe_ddr[1]),
+    ]
+    test.sim = Simulator(m)
+    test.sim.add_clock(1/SRCFREQ)
+    test.bits = {}
+
+
+def half_cycle_bits(samples):
+    """Same output as ``ds_sim_capture_bits``, from ``(d, s)`` samples taken
+    every half cycle."""
+    bits = []
+    prev = (0, 0)
+    for i, cur in enumerate(samples):
+        if cur != prev:
+            bits.append((i, cur[0]))
+        prev = cur
+    return bits
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        add_trs(self)
+
+    def stimuli(self, tr):
+        def process():
+            yield tr.enable.eq(1)
+            v = 0
+            for i in range(CAPTURE_TICKS):
+                if i == CAPTURE_TICKS // 4:
+                    yield tr.switch_user_tx_freq.eq(1)
+                yield tr.char.eq(v & 0xff)
+                yield tr.send.eq(1)
+                yield Settle()
+                if (yield tr.sent_n_char):
+                    v = v + 1
+                yield Tick()
+        return process
+
+    def capture(self, tr):
+        def process():
+            samples = []
+            for _ in range(CAPTURE_TICKS):
+                yield Tick()
+                yield Settle()
+                d = yield tr.data_ddr
+                s = yield tr.strobe_ddr
+                samples += [(d & 1, s & 1), (d >> 1, s >> 1)]
+            self.bits[tr] = half_cycle_bits(samples)
+        return process
+
+    def capture_model(self):
+        # Sample the simulation model in the middle of each half cycle
+        samples = []
+        yield Tick()
+        yield Delay(1 / SRCFREQ / 4)
+        for _ in range(2 * CAPTURE_TICKS):
+            samples.append(((yield self.ddr_d.o), (yield self.ddr_s.o)))
+            yield Delay(1 / SRCFREQ / 2)
+        self.bits[self.ddr_d] = half_cycle_bits(samples)
+
+    def test_transmitter(self):
+        for tr in self.trs:
+            self.sim.add_process(self.stimuli(tr))
+            self.sim.add_process(self.capture(tr))
+        self.sim.add_process(self.capture_model)
+
+        vcd = get_vcd_filename("ddr")
+        gtkw = get_gtkw_filename("ddr")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=sum([tr.ports() for tr in self.trs], [])):
+            self.sim.run()
+
+        for tr, txfreq in zip(self.trs, TXFREQS):
+            bits = self.bits[tr]
+            half_cycles_per_bit = round(2 * SRCFREQ / txfreq)
+
+            # Reset rate, then the user rate once switched
+            ticks = [t for t, _ in bits]
+            periods = [b - a for a, b in zip(ticks, ticks[1:])]
+            switch = periods.index(next(p for p in periods if p != round(2 * SRCFREQ / RSTFREQ)))
+            self.assertTrue(all(p == half_cycles_per_bit for p in periods[switch + 1:]))
+
+            data = [v for _, k, v in ds_decode_chars(bits) if k == 'data']
+            self.assertGreater(len(data), 100)
+            self.assertEqual(data, [v & 0xff for v in range(len(data))])
+
+        # The simulation model outputs the same half cycles, one cycle later
+        model = self.bits[self.ddr_d]
+        expected = self.bits[self.trs[-1]]
+        self.assertEqual([(t - 2, b) for t, b in model[1:]], expected[1:len(model)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            ClockDivider(SRCFREQ, RSTFREQ, fractional=True, ddr=True)
+        with self.assertRaises(ValueError):
+            ClockDivider(SRCFREQ, RSTFREQ, max_divisor=64, ddr=True)
+        with self.assertRaises(ValueError):
+            ClockDivider(SRCFREQ, 1.5 * SRCFREQ, ddr=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
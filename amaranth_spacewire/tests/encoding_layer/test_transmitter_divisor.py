@@ -0,0 +1,92 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.misc.clock_divider import ClockDivider
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+TXFREQ = 5e6
+TICKS_PER_BIT_USER = int(SRCFREQ // TXFREQ)
+# New divisor, written in the middle of a character
+NEW_DIVISOR = 6
+# Out of range divisors, ignored by the transmitter
+BAD_DIVISORS = [0, 1, int(SRCFREQ // Transmitter.MIN_TX_FREQ_USER) + 1]
+CAPTURE_TICKS = 4000
+
+
+def add_trs(test):
+    m = Module()
+    m.submodules.tr_tx = test.tr_tx = Transmitter(SRCFREQ, RSTFREQ, TXFREQ, programmable_divisor=True)
+    m.submodules.tr_sync = test.tr_sync = Transmitter(SRCFREQ, RSTFREQ, TXFREQ, single_clock=True, programmable_divisor=True)
+    test.sim = Simulator(m)
+    test.sim.add_clock(1/SRCFREQ)
+    test.bits = {}
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        add_trs(self)
+
+    def stimuli(self, tr):
+        def process():
+            yield tr.enable.eq(1)
+            yield tr.switch_user_tx_freq.eq(1)
+            yield tr.char.eq(0xa5)
+            yield tr.send.eq(1)
+            for _ in range(1000):
+                yield Tick()
+            # Not on a character boundary
+            for _ in range(3 * TICKS_PER_BIT_USER + 1):
+                yield Tick()
+            yield tr.user_tx_divisor.eq(NEW_DIVISOR)
+            for _ in range(1000):
+                yield Tick()
+            for d in BAD_DIVISORS:
+                yield tr.user_tx_divisor.eq(d)
+                for _ in range(200):
+                    yield Tick()
+        return process
+
+    def capture(self, tr):
+        def process():
+            self.bits[tr] = yield from ds_sim_capture_bits(tr.data, tr.strobe, CAPTURE_TICKS)
+        return process
+
+    def test_transmitter(self):
+        for tr in [self.tr_tx, self.tr_sync]:
+            self.sim.add_process(self.stimuli(tr))
+            self.sim.add_process(self.capture(tr))
+
+        vcd = get_vcd_filename("divisor")
+        gtkw = get_gtkw_filename("divisor")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.tr_tx.ports() + self.tr_sync.ports()):
+            self.sim.run()
+
+        for tr in [self.tr_tx, self.tr_sync]:
+            ticks = [t for t, _ in self.bits[tr]]
+            periods = [b - a for a, b in zip(ticks, ticks[1:])]
+            starts = [t for t, _, _ in ds_decode_chars(self.bits[tr])]
+
+            # Settled at the user rate, then a single change to the new divisor
+            # on a character boundary
+            first = periods.index(TICKS_PER_BIT_USER)
+            change = periods.index(NEW_DIVISOR)
+            self.assertTrue(all(p == TICKS_PER_BIT_USER for p in periods[first:change]))
+            self.assertTrue(all(p == NEW_DIVISOR for p in periods[change:]))
+            self.assertIn(ticks[change], starts)
+
+    def test_invalid(self):
+        # TXFREQ is reached with a divisor of 4
+        with self.assertRaises(ValueError):
+            ClockDivider(SRCFREQ, TXFREQ, max_divisor=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
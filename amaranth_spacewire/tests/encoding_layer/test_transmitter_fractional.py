@@ -0,0 +1,98 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.misc.clock_divider import ClockDivider, _phase_increment
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+# 20 Mb/s is not an integer division of 54 MHz
+SRCFREQ = 54e6
+TXFREQ = 20e6
+TICKS_PER_BIT = SRCFREQ / TXFREQ
+CAPTURE_TICKS = 5000
+
+
+def add_trs(test):
+    m = Module()
+    m.submodules.tr_int = test.tr_int = Transmitter(SRCFREQ, txfreq=TXFREQ, single_clock=True)
+    m.submodules.tr_frac = test.tr_frac = Transmitter(SRCFREQ, txfreq=TXFREQ, single_clock=True, fractional_divider=True)
+    test.sim = Simulator(m)
+    test.sim.add_clock(1/SRCFREQ)
+    test.bits = {}
+
+
+def report(name, periods):
+    freq = SRCFREQ * len(periods) / sum(periods)
+    print("{0}: {1:.4f} Mb/s average (nominal {2} Mb/s, {3:+.1f} ppm), bit periods {4} source clock cycles".format(
+        name, freq / 1e6, TXFREQ / 1e6, 1e6 * (freq - TXFREQ) / TXFREQ, sorted(set(periods))))
+    return freq
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        add_trs(self)
+
+    def stimuli(self, tr):
+        def process():
+            yield tr.enable.eq(1)
+            yield tr.switch_user_tx_freq.eq(1)
+            v = 0
+            for _ in range(CAPTURE_TICKS):
+                yield tr.char.eq(v & 0xff)
+                yield tr.send.eq(1)
+                yield Settle()
+                if (yield tr.sent_n_char):
+                    v = v + 1
+                yield Tick()
+        return process
+
+    def capture(self, tr):
+        def process():
+            self.bits[tr] = yield from ds_sim_capture_bits(tr.data, tr.strobe, CAPTURE_TICKS)
+        return process
+
+    def test_divider(self):
+        _, ppm = _phase_increment(SRCFREQ, TXFREQ, 32)
+        self.assertLess(abs(ppm), 1)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            _phase_increment(SRCFREQ, SRCFREQ, 32)
+        with self.assertRaises(ValueError):
+            _phase_increment(SRCFREQ, TXFREQ, 32, max_ppm=1e-6)
+        with self.assertRaises(ValueError):
+            ClockDivider(SRCFREQ, TXFREQ, max_divisor=64, fractional=True)
+
+    def test_transmitter(self):
+        for tr in [self.tr_int, self.tr_frac]:
+            self.sim.add_process(self.stimuli(tr))
+            self.sim.add_process(self.capture(tr))
+
+        vcd = get_vcd_filename("fractional")
+        gtkw = get_gtkw_filename("fractional")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.tr_int.ports() + self.tr_frac.ports()):
+            self.sim.run()
+
+        for tr in [self.tr_int, self.tr_frac]:
+            # Skip the reset rate bits
+            ticks = [t for t, _ in self.bits[tr] if t > CAPTURE_TICKS // 2]
+            periods = [b - a for a, b in zip(ticks, ticks[1:])]
+            freq = report("fractional" if tr is self.tr_frac else "integer", periods)
+
+            if tr is self.tr_frac:
+                # One source clock cycle of jitter around the exact rate
+                self.assertTrue(set(periods) <= {int(TICKS_PER_BIT), int(TICKS_PER_BIT) + 1})
+                self.assertLess(abs(freq - TXFREQ) / TXFREQ, 1 / len(periods))
+
+                data = [v for _, k, v in ds_decode_chars(self.bits[tr]) if k == 'data']
+                self.assertGreater(len(data), 50)
+                self.assertEqual(data, [v & 0xff for v in range(len(data))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle, Delay
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.misc.serdes_output import SerDesOutput
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 50e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+# (serializer width, user rate). The last one is below the source frequency,
+# with bits spanning several clock cycles.
+CONFIGS = [(4, 200e6), (8, 200e6), (8, 400e6), (8, 25e6)]
+CAPTURE_TICKS = 2000
+
+
+def add_trs(test):
+    m = Module()
+    test.trs = []
+    for i, (width, txfreq) in enumerate(CONFIGS):
+        tr = Transmitter(SRCFREQ, RSTFREQ, txfreq, single_clock=True, serializer_width=width)
+        m.submodules["tr_{0}".format(i)] = tr
+        test.trs.append(tr)
+    # Simulation model of the serializer, on the data output of the fastest
+    # transmitter
+    width = CONFIGS[2][0]
+    m.submodules.ser_d = test.ser_d = SerDesOutput(width)
+    m.domains.fast = ClockDomain()
+    m.d.comb += test.ser_d.i_d.eq(test.trs[2].data_word)
+    test.sim = Simulator(m)
+    test.sim.add_clock(1/SRCFREQ)
+    test.sim.add_clock(1/SRCFREQ/width, phase=1/SRCFREQ/2 - 1/SRCFREQ/width/2, domain="fast")
+    test.bits = {}
+    test.words = {}
+
+
+def slot_bits(samples):
+    """Same output as ``ds_sim_capture_bits``, from ``(d, s)`` samples taken
+    every line slot."""
+    bits = []
+    prev = (0, 0)
+    for i, cur in enumerate(samples):
+        if cur != prev:
+            bits.append((i, cur[0]))
+        prev = cur
+    return bits
+
+
+def parity_errors(bits):
+    """Number of characters with a wrong parity bit in the output of
+    ``slot_bits``."""
+    errors = 0
+    parity = 0
+    i = 0
+    while i + 4 <= len(bits):
+        length = 4 if bits[i + 1][1] else 10
+        if i + length > len(bits):
+            break
+        if bits[i][1] != 1 ^ parity ^ bits[i + 1][1]:
+            errors += 1
+        parity = 0
+        for _, b in bits[i + 2:i + length]:
+            parity ^= b
+        i += length
+    return errors
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        add_trs(self)
+
+    def stimuli(self, tr):
+        def process():
+            yield tr.enable.eq(1)
+            v = 0
+            for i in range(CAPTURE_TICKS):
+                if i == CAPTURE_TICKS // 4:
+                    yield tr.switch_user_tx_freq.eq(1)
+                yield tr.char.eq(v & 0xff)
+                yield tr.send.eq(1)
+                yield Settle()
+                if (yield tr.sent_n_char):
+                    v = v + 1
+                yield Tick()
+        return process
+
+    def capture(self, tr, width):
+        def process():
+            samples = []
+            self.words[tr] = []
+            for _ in range(CAPTURE_TICKS):
+                yield Tick()
+                yield Settle()
+                d = yield tr.data_word
+                s = yield tr.strobe_word
+                samples += [((d >> i) & 1, (s >> i) & 1) for i in range(width)]
+                self.words[tr].append(d)
+            self.bits[tr] = slot_bits(samples)
+        return process
+
+    def capture_model(self):
+        # Sample the simulation model in the middle of each line slot
+        width = CONFIGS[2][0]
+        samples = []
+        yield Tick()
+        yield Delay(1 / SRCFREQ / width / 2)
+        for _ in range(width * CAPTURE_TICKS):
+            samples.append((yield self.ser_d.o))
+            yield Delay(1 / SRCFREQ / width)
+        self.bits[self.ser_d] = samples
+
+    def test_transmitter(self):
+        for tr, (width, _) in zip(self.trs, CONFIGS):
+            self.sim.add_process(self.stimuli(tr))
+            self.sim.add_process(self.capture(tr, width))
+        self.sim.add_process(self.capture_model)
+
+        vcd = get_vcd_filename("serializer")
+        gtkw = get_gtkw_filename("serializer")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=sum([tr.ports() for tr in self.trs], [])):
+            self.sim.run()
+
+        for tr, (width, txfreq) in zip(self.trs, CONFIGS):
+            bits = self.bits[tr]
+            slots_per_bit_reset = width * round(SRCFREQ / RSTFREQ)
+            slots_per_bit_user = round(width * SRCFREQ / txfreq)
+
+            # Reset rate, then the user rate once switched
+            ticks = [t for t, _ in bits]
+            periods = [b - a for a, b in zip(ticks, ticks[1:])]
+            switch = periods.index(next(p for p in periods[1:] if p != slots_per_bit_reset))
+            self.assertTrue(all(p == slots_per_bit_reset for p in periods[1:switch]))
+            self.assertTrue(all(p == slots_per_bit_user for p in periods[switch + 1:]))
+
+            data = [v for _, k, v in ds_decode_chars(bits) if k == 'data']
+            self.assertEqual(data, [v & 0xff for v in range(len(data))])
+            self.assertEqual(parity_errors(bits), 0)
+
+            # Data characters sent back to back once switched
+            user_bits = (width * CAPTURE_TICKS - ticks[switch]) / slots_per_bit_user
+            print("{0} line slots per cycle, {1} Mb/s: {2} data characters in {3:.0f} bits at the user rate".format(
+                width, txfreq / 1e6, len(data), user_bits))
+            self.assertGreater(len(data), 0.9 * user_bits / 10)
+
+        # The simulation model outputs the same data line, one cycle later
+        width = CONFIGS[2][0]
+        model = self.bits[self.ser_d]
+        expected = [(d >> i) & 1 for d in self.words[self.trs[2]] for i in range(width)]
+        self.assertEqual(model[width:], expected[:len(model) - width])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+TXFREQ = 5e6
+TICKS_PER_BIT_RESET = int(SRCFREQ // RSTFREQ)
+TICKS_PER_BIT_USER = int(SRCFREQ // TXFREQ)
+CAPTURE_TICKS = 3000
+
+# Characters sent, in order. ``None`` stands for an FCT.
+SCRIPT = [None, 0x00, 0xff, 0xa5, CHAR_EOP.value, None, 0x3c, CHAR_EEP.value, None,
+          0x01, 0x80, CHAR_EOP.value]
+# Index in ``SCRIPT`` at which the user transmit frequency is selected
+SWITCH_INDEX = 5
+
+
+def char_value(kind, value):
+    return {'fct': None, 'eop': CHAR_EOP.value, 'eep': CHAR_EEP.value}.get(kind, value)
+
+
+def add_trs(test):
+    m = Module()
+    m.submodules.tr_tx = test.tr_tx = Transmitter(SRCFREQ, RSTFREQ, TXFREQ)
+    m.submodules.tr_sync = test.tr_sync = Transmitter(SRCFREQ, RSTFREQ, TXFREQ, single_clock=True)
+    test.sim = Simulator(m)
+    test.sim.add_clock(1/SRCFREQ)
+    test.bits = {}
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        add_trs(self)
+
+    def stimuli(self, tr):
+        def process():
+            yield tr.enable.eq(1)
+            for i, c in enumerate(SCRIPT):
+                if i == SWITCH_INDEX:
+                    yield tr.switch_user_tx_freq.eq(1)
+                if c is None:
+                    yield tr.send_fct.eq(1)
+                else:
+                    yield tr.char.eq(c)
+                    yield tr.send.eq(1)
+                yield Settle()
+                while not ((yield tr.sent_fct) or (yield tr.sent_n_char)):
+                    yield Tick()
+                    yield Settle()
+                yield Tick()
+                yield tr.send_fct.eq(0)
+                yield tr.send.eq(0)
+        return process
+
+    def capture(self, tr):
+        def process():
+            self.bits[tr] = yield from ds_sim_capture_bits(tr.data, tr.strobe, CAPTURE_TICKS)
+        return process
+
+    def test_transmitter(self):
+        for tr in [self.tr_tx, self.tr_sync]:
+            self.sim.add_process(self.stimuli(tr))
+            self.sim.add_process(self.capture(tr))
+
+        vcd = get_vcd_filename("same_bits")
+        gtkw = get_gtkw_filename("same_bits")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.tr_tx.ports() + self.tr_sync.ports()):
+            self.sim.run()
+
+        for tr in [self.tr_tx, self.tr_sync]:
+            decoded = ds_decode_chars(self.bits[tr])[:len(SCRIPT)]
+            self.assertEqual([char_value(k, v) for _, k, v in decoded], SCRIPT)
+
+        # Same bits on the wire, script and trailing NULLs
+        n = min(len(self.bits[self.tr_tx]), len(self.bits[self.tr_sync]))
+        self.assertGreater(n, 200)
+        self.assertEqual([b for _, b in self.bits[self.tr_tx][:n]],
+                         [b for _, b in self.bits[self.tr_sync][:n]])
+
+        # Bit periods in the single clock transmitter: reset rate, then a single
+        # longer bit when switching, then user rate
+        ticks = [t for t, _ in self.bits[self.tr_sync]]
+        periods = [b - a for a, b in zip(ticks, ticks[1:])]
+        switch = periods.index(next(p for p in periods if p != TICKS_PER_BIT_RESET))
+        self.assertTrue(TICKS_PER_BIT_USER < periods[switch] <= 2 * TICKS_PER_BIT_USER)
+        self.assertTrue(all(p == TICKS_PER_BIT_USER for p in periods[switch + 1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+TXFREQ = Transmitter.TX_FREQ_RESET
+TICKS_PER_BIT = int(SRCFREQ // TXFREQ)
+PAYLOAD_BYTES = 64
+# 8 payload bits in a 10 bits data character
+THEORETICAL_BITS_PER_BYTE = 10
+CAPTURE_TICKS = 2 * PAYLOAD_BYTES * 10 * TICKS_PER_BIT
+
+
+def add_tr(test, streaming):
+    m = Module()
+    m.submodules.tr = test.tr = Transmitter(SRCFREQ, streaming=streaming)
+    test.sim = Simulator(m)
+    test.sim.add_clock(1/SRCFREQ)
+    test.bits = []
+
+
+def bits_per_payload_byte(bits):
+    data = [c for c in ds_decode_chars(bits) if c[1] == 'data']
+    if len(data) < PAYLOAD_BYTES:
+        return None
+    assert [c[2] for c in data] == [v & 0xff for v in range(PAYLOAD_BYTES)]
+    # Bit slots from the first bit of the first data character to the last bit
+    # of the last data character
+    slots = (data[-1][0] - data[0][0]) / TICKS_PER_BIT + 10
+    return slots / PAYLOAD_BYTES
+
+
+def report(name, measured):
+    if measured is None:
+        print("{0}: payload not sent (NULLs only)".format(name))
+        return
+    print("{0}: {1:.2f} bits on wire per payload byte (theoretical {2}), payload efficiency {3:.1f}% (theoretical {4:.1f}%)".format(
+        name, measured, THEORETICAL_BITS_PER_BYTE,
+        100 * 8 / measured, 100 * 8 / THEORETICAL_BITS_PER_BYTE))
+
+
+class Benchmark(unittest.TestCase):
+    def producer(self, latency, wait_ready):
+        """Send ``PAYLOAD_BYTES`` data characters. Each one is presented
+        ``latency`` clock cycles after the previous one was accepted or, if
+        ``wait_ready`` is set, ``latency`` clock cycles after ``ready`` was
+        seen."""
+        def process():
+            yield self.tr.enable.eq(1)
+            v = 0
+            waited = 0
+            for _ in range(CAPTURE_TICKS):
+                yield self.tr.char.eq(v & 0xff)
+                yield Settle()
+                if wait_ready:
+                    # Consecutive cycles with ``ready`` asserted
+                    waited = waited + 1 if (yield self.tr.ready) else 0
+                    present = waited > latency
+                else:
+                    present = waited >= latency
+                present = present and v < PAYLOAD_BYTES
+                yield self.tr.send.eq(present)
+                yield Settle()
+                if present and (yield self.tr.sent_n_char):
+                    v = v + 1
+                    waited = 0
+                elif not wait_ready:
+                    waited = waited + 1
+                yield Tick()
+        return process
+
+    def capture(self):
+        self.bits = yield from ds_sim_capture_bits(self.tr.data, self.tr.strobe, CAPTURE_TICKS)
+
+    def run_benchmark(self, streaming, latency, wait_ready):
+        add_tr(self, streaming)
+        self.sim.add_process(self.producer(latency, wait_ready))
+        self.sim.add_process(self.capture)
+        self.sim.run()
+        return bits_per_payload_byte(self.bits)
+
+    def test_benchmark(self):
+        for wait_ready, latency in [(False, 0), (False, 8), (True, 1), (True, 2)]:
+            results = {}
+            for streaming in [False, True]:
+                results[streaming] = self.run_benchmark(streaming, latency, wait_ready)
+                report("{0}, producer latency {1} {2}".format(
+                    "streaming" if streaming else "default", latency,
+                    "after ready" if wait_ready else "after previous char"),
+                    results[streaming])
+
+            # Always zero-gap when streaming
+            self.assertEqual(results[True], THEORETICAL_BITS_PER_BYTE)
+            if results[False] is not None:
+                self.assertLessEqual(results[True], results[False])
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        add_tr(self, streaming=True)
+
+    def stimuli(self):
+        yield self.tr.enable.eq(1)
+        for _ in range(20 * TICKS_PER_BIT):
+            yield Tick()
+        yield self.tr.enable.eq(0)
+        for _ in range(20 * TICKS_PER_BIT):
+            yield Tick()
+        yield self.tr.enable.eq(1)
+        for _ in range(40 * TICKS_PER_BIT):
+            yield Tick()
+        yield self.tr.send_fct.eq(1)
+        while not (yield self.tr.sent_fct):
+            yield Tick()
+            yield Settle()
+        yield self.tr.send_fct.eq(0)
+        yield self.tr.char.eq(CHAR_EOP)
+        yield self.tr.send.eq(1)
+        yield Tick()
+        yield Settle()
+        while not (yield self.tr.sent_n_char):
+            yield Tick()
+            yield Settle()
+        yield self.tr.send.eq(0)
+
+    def capture(self):
+        # Skip the first, interrupted, transmission
+        for _ in range(40 * TICKS_PER_BIT):
+            yield Tick()
+        self.bits = yield from ds_sim_capture_bits(self.tr.data, self.tr.strobe, 80 * TICKS_PER_BIT)
+
+    def test_transmitter(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("streaming")
+        gtkw = get_gtkw_filename("streaming")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.tr.ports()):
+            self.sim.run()
+
+        kinds = [c[1] for c in ds_decode_chars(self.bits)]
+        # NULLs, then the FCT and the EOP, then NULLs again
+        self.assertEqual(kinds[:2], ['esc', 'fct'])
+        i = kinds.index('eop')
+        self.assertEqual(kinds[i - 1], 'fct')
+        self.assertTrue(all(k in ['esc', 'fct'] for k in kinds[:i - 1]))
+        self.assertEqual(kinds[i + 1:i + 3], ['esc', 'fct'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import Simulator, Settle
+
+from amaranth_spacewire.encoding.transmitter import Transmitter
+from amaranth_spacewire.encoding.tx_clock_bank import TxClockBank
+from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.tests.spw_test_utils import *
+
+SRCFREQ = 20e6
+RSTFREQ = Transmitter.TX_FREQ_RESET
+TXFREQ = 5e6
+PORTS = 8
+CAPTURE_TICKS = 2000
+# Tick at which each port switches to the user rate, at different phases of
+# the shared strobes
+SWITCH_TICKS = [200 + 137 * i for i in range(PORTS)]
+
+
+class Ports(Elaboratable):
+    """``PORTS`` transmitters, with their own dividers or sharing a bank."""
+    def __init__(self, shared, single_clock=True):
+        self._shared = shared
+        if shared:
+            self.bank = TxClockBank(SRCFREQ, RSTFREQ, TXFREQ)
+        self.trs = [Transmitter(SRCFREQ, RSTFREQ, TXFREQ, single_clock=single_clock,
+                                clock_bank=self.bank if shared else None)
+                    for _ in range(PORTS)]
+
+    def elaborate(self, platform):
+        m = Module()
+        if self._shared:
+            m.submodules.bank = self.bank
+        for i, tr in enumerate(self.trs):
+            m.submodules["tr_{0}".format(i)] = tr
+        return m
+
+    def ports(self):
+        return sum([tr.ports() for tr in self.trs], [])
+
+
+class Benchmark(unittest.TestCase):
+    def test_benchmark(self):
+        results = {}
+        for name, shared, single_clock in [("per-port, tx clock domain", False, False),
+                                           ("per-port, single clock", False, True),
+                                           ("shared bank", True, True)]:
+            ports = Ports(shared, single_clock)
+            results[name] = rtlil_stats(ports, ports.ports())
+            print("{0} ports, {1}: {2} flip-flop bits, {3} logic cells".format(
+                PORTS, name, results[name]['ff_bits'], results[name]['cells']))
+
+        for name in ["per-port, tx clock domain", "per-port, single clock"]:
+            self.assertLess(results["shared bank"]['ff_bits'], results[name]['ff_bits'])
+            self.assertLess(results["shared bank"]['cells'], results[name]['cells'])
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        m = Module()
+        m.submodules.shared = self.shared = Ports(shared=True)
+        m.submodules.own = self.own = Ports(shared=False)
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.bits = {}
+
+    def stimuli(self, tr, switch_tick):
+        def process():
+            yield tr.enable.eq(1)
+            for i in range(CAPTURE_TICKS):
+                if i == switch_tick:
+                    yield tr.switch_user_tx_freq.eq(1)
+                yield Tick()
+        return process
+
+    def capture(self, tr):
+        def process():
+            self.bits[tr] = yield from ds_sim_capture_bits(tr.data, tr.strobe, CAPTURE_TICKS)
+        return process
+
+    def test_transmitter(self):
+        pairs = list(zip(self.shared.trs, self.own.trs, SWITCH_TICKS))
+        for tr_shared, tr_own, switch_tick in pairs:
+            for tr in [tr_shared, tr_own]:
+                self.sim.add_process(self.stimuli(tr, switch_tick))
+                self.sim.add_process(self.capture(tr))
+
+        vcd = get_vcd_filename("clock_bank")
+        gtkw = get_gtkw_filename("clock_bank")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.shared.ports()):
+            self.sim.run()
+
+        # Each port switches on its own, exactly as with its own dividers
+        self.assertEqual(len(pairs), PORTS)
+        for tr_shared, tr_own, switch_tick in pairs:
+            self.assertEqual(self.bits[tr_shared], self.bits[tr_own])
+            ticks = [t for t, _ in self.bits[tr_shared]]
+            periods = [b - a for a, b in zip(ticks, ticks[1:])]
+            self.assertEqual(periods[0], round(SRCFREQ / RSTFREQ))
+            self.assertEqual(periods[-1], round(SRCFREQ / TXFREQ))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,18 +3,21 @@ import unittest
 from amaranth import *
 from amaranth.sim import Simulator, Settle
 
-from amaranth_spacewire import Node, Transmitter, DataLinkState
+from amaranth_spacewire import Node, Transmitter, Receiver, DataLinkState, Timebase
 from amaranth_spacewire.misc.constants import *
+from amaranth_spacewire.misc.serdes_input import SerDesInput
+from amaranth_spacewire.misc.serdes_output import SerDesOutput
+from amaranth_spacewire.misc.spw_delay import SpWDelay
 from amaranth_spacewire.tests.spw_test_utils import *
 
 SRCFREQ = 54e6
 TXFREQ = Transmitter.TX_FREQ_RESET
 
 
-def add_nodes(test, node_1_fifo_depth_tokens=7, node_2_fifo_depth_tokens=7):
+def add_nodes(test, node_1_fifo_depth_tokens=7, node_2_fifo_depth_tokens=7, node_2_kwargs=None, **node_1_kwargs):
     m = Module()
-    m.submodules.node_1 = test.node_1 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, fifo_depth_tokens=node_1_fifo_depth_tokens)
-    m.submodules.node_2 = test.node_2 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, fifo_depth_tokens=node_2_fifo_depth_tokens)
+    m.submodules.node_1 = test.node_1 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, fifo_depth_tokens=node_1_fifo_depth_tokens, **node_1_kwargs)
+    m.submodules.node_2 = test.node_2 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, fifo_depth_tokens=node_2_fifo_depth_tokens, **(node_2_kwargs or {}))
     test.gate_trigger = Signal()
     m.submodules.node_1_d_i_gate = test.gate = Gate(test.node_2.data_output, test.node_1.data_input, test.gate_trigger)
 
@@ -244,5 +247,1027 @@ class Test_4(unittest.TestCase):
             self.sim.run()
 
 
+class Test_5(unittest.TestCase):
+    def setUp(self):
+        add_nodes(self, tx_single_clock=True)
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+        yield from send_hello_world(self)
+
+    def receive(self):
+        expected = [ord(c) for c in 'Hello World in SpaceWire!'] + [CHAR_EOP.value]
+        received = []
+        yield self.node_2.r_en.eq(1)
+        for _ in range(ds_sim_period_to_ticks(100e-6, SRCFREQ)):
+            yield Tick()
+            yield Settle()
+            if (yield self.node_2.r_rdy):
+                received.append((yield self.node_2.r_data))
+        assert(received == expected)
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("single_clock")
+        gtkw = get_gtkw_filename("single_clock")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+
+class Test_6(unittest.TestCase):
+    USER_DIVISOR = 27
+
+    def setUp(self):
+        add_nodes(self, tx_programmable_divisor=True)
+        self.bits = []
+        self.run_tick = None
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        # Requested from the start, only applied once the link is running
+        yield self.node_1.tx_switch_freq.eq(1)
+        yield self.node_1.tx_divisor.eq(self.USER_DIVISOR)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+    def capture(self):
+        prev = (0, 0)
+        for i in range(ds_sim_period_to_ticks(100e-6, SRCFREQ)):
+            yield Tick()
+            yield Settle()
+            cur = ((yield self.node_1.data_output), (yield self.node_1.strobe_output))
+            if cur != prev:
+                self.bits.append(i)
+            prev = cur
+            if self.run_tick is None and (yield self.node_1.link_state == DataLinkState.RUN):
+                self.run_tick = i
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("programmable_divisor")
+        gtkw = get_gtkw_filename("programmable_divisor")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        self.assertIsNotNone(self.run_tick)
+        reset_divisor = round(SRCFREQ / Transmitter.TX_FREQ_RESET)
+        periods = [(a, b - a) for a, b in zip(self.bits, self.bits[1:])]
+        # Reset rate until the link is running
+        self.assertTrue(all(p == reset_divisor for t, p in periods if t < self.run_tick))
+        # User rate afterwards
+        self.assertEqual(periods[-1][1], self.USER_DIVISOR)
+
+
+class Test_7(unittest.TestCase):
+    # Ticks are spread over all the phases of the characters being sent
+    TICKS = 64
+    TICK_SPACING = 151
+
+    def setUp(self):
+        add_nodes(self)
+        self.ticks = []
+        self.bits = []
+
+    def traffic(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+        yield self.node_2.r_en.eq(1)
+        yield self.node_1.w_en.eq(1)
+        v = 0
+        while True:
+            yield self.node_1.w_data.eq(v & 0xff)
+            yield Tick()
+            yield Settle()
+            if (yield self.node_1.w_rdy):
+                v = v + 1
+
+    def stimuli(self):
+        run = ds_sim_period_to_ticks(50e-6, SRCFREQ)
+        prev = (0, 0)
+        for i in range(run + self.TICKS * self.TICK_SPACING):
+            if i == run:
+                assert(yield self.node_1.link_state == DataLinkState.RUN)
+            tick = i >= run and (i - run) % self.TICK_SPACING == 0
+            if tick:
+                self.ticks.append(i)
+                yield self.node_1.tx_time_value.eq(len(self.ticks) & 0x3f)
+                yield self.node_1.tx_time_flags.eq(len(self.ticks) >> 6)
+            yield self.node_1.tick_in.eq(tick)
+            yield Tick()
+            yield Settle()
+            cur = ((yield self.node_1.data_output), (yield self.node_1.strobe_output))
+            if cur != prev:
+                self.bits.append((i, cur[0]))
+            prev = cur
+
+    def test_node(self):
+        self.sim.add_process(self.traffic)
+        self.sim.add_process(self.stimuli)
+
+        vcd = get_vcd_filename("time_code")
+        gtkw = get_gtkw_filename("time_code")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run_until(ds_sim_period_to_ticks(50e-6, SRCFREQ) / SRCFREQ + self.TICKS * self.TICK_SPACING / SRCFREQ)
+
+        chars = ds_decode_chars(self.bits)
+        # An ESC followed by a data character
+        time_codes = [(a[0], b[2]) for a, b in zip(chars, chars[1:]) if a[1] == 'esc' and b[1] == 'data']
+        self.assertEqual([v for _, v in time_codes], [(i + 1) & 0xff for i in range(len(time_codes))])
+        self.assertGreaterEqual(len(time_codes), self.TICKS - 1)
+
+        # Worst case: the tick comes just after the transmitter committed to a
+        # data character, while the previous one still has its last 3 bits to
+        # send. Then the transmitter FSM, the shift register and the encoder
+        # each add a system clock.
+        ticks_per_bit = round(SRCFREQ / TXFREQ)
+        latencies = [t - tick for tick, (t, _) in zip(self.ticks, time_codes)]
+        print("tick_in to first time-code bit: {0} to {1} system clocks".format(min(latencies), max(latencies)))
+        self.assertLessEqual(max(latencies), (3 + 10) * ticks_per_bit + 3)
+
+
+class Test_8(unittest.TestCase):
+    # Time values sent, and the ones expected out of the incrementing time
+    # filter
+    TIMES = [1, 2, 3, 5, 6, 6, 7, 0x40 | 8]
+    EXPECTED = [1, 2, 3, 6, 7, 0x40 | 8]
+
+    def setUp(self):
+        add_nodes(self, node_2_kwargs={'time_code_filter': True})
+        self.ticks_in = []
+        self.ticks_out = []
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+        for t in self.TIMES:
+            yield self.node_1.tick_in.eq(1)
+            yield self.node_1.tx_time_value.eq(t & 0x3f)
+            yield self.node_1.tx_time_flags.eq(t >> 6)
+            yield Tick()
+            self.ticks_in.append(self.now)
+            yield self.node_1.tick_in.eq(0)
+            yield from ds_sim_delay(5e-6, SRCFREQ)
+
+    def receive(self):
+        self.now = 0
+        for _ in range(ds_sim_period_to_ticks(100e-6, SRCFREQ)):
+            yield Tick()
+            yield Settle()
+            self.now += 1
+            if (yield self.node_2.tick_out):
+                value = (yield self.node_2.time_value) | ((yield self.node_2.time_flags) << 6)
+                self.ticks_out.append((self.now, value))
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("time_code_rx")
+        gtkw = get_gtkw_filename("time_code_rx")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        self.assertEqual([v for _, v in self.ticks_out], self.EXPECTED)
+        # One cycle long
+        self.assertEqual(len(set(t for t, _ in self.ticks_out)), len(self.EXPECTED))
+        # From the last tick_in before each tick_out
+        latencies = [t_out - max(t for t in self.ticks_in if t < t_out) for t_out, _ in self.ticks_out]
+        print("node_1 tick_in to node_2 tick_out: {0} to {1} system clocks".format(min(latencies), max(latencies)))
+        # The transmit latency bounded in Test_7, the 14 bits of the
+        # time-code and the 2 bits of the next header which validate its
+        # parity, the receiver latency, and tick_out raised in the cycle after
+        bit_time = SRCFREQ / TXFREQ
+        tx_latency = (3 + 10) * bit_time + 3
+        self.assertLessEqual(max(latencies), math.ceil(tx_latency + (14 + 2) * bit_time + Receiver.latency_for() + 1))
+
+
+class Test_9(unittest.TestCase):
+    """Receivers decoding two characters per clock cycle, with the link
+    running at eight bits per clock cycle."""
+    SRCFREQ = 50e6
+    WIDTH = 8
+    PACKETS = [[c & 0xff for c in range(i * 37, i * 37 + 1 + (i * 5) % 20)] for i in range(40)]
+
+    def setUp(self):
+        m = Module()
+        m.domains.fast = ClockDomain()
+        self.nodes = []
+        for i in range(2):
+            node = Node(self.SRCFREQ, txfreq=self.WIDTH * self.SRCFREQ, tx_single_clock=True,
+                        tx_serializer_width=self.WIDTH, rx_input_width=self.WIDTH, rx_chars_per_cycle=2)
+            m.submodules["node_{0}".format(i + 1)] = node
+            self.nodes.append(node)
+        self.node_1, self.node_2 = self.nodes
+        for i, (src, dst) in enumerate([(self.node_1, self.node_2), (self.node_2, self.node_1)]):
+            for name in ["data", "strobe"]:
+                ser = SerDesOutput(self.WIDTH)
+                des = SerDesInput(self.WIDTH)
+                m.submodules["ser_{0}_{1}".format(name, i)] = ser
+                m.submodules["des_{0}_{1}".format(name, i)] = des
+                m.d.comb += [
+                    ser.i_d.eq(getattr(src, "{0}_output_word".format(name))),
+                    des.i.eq(ser.o),
+                    getattr(dst, "{0}_input_word".format(name)).eq(des.o_d),
+                ]
+
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/self.SRCFREQ)
+        self.sim.add_clock(1/self.SRCFREQ/self.WIDTH, phase=1/self.SRCFREQ/2 - 1/self.SRCFREQ/self.WIDTH/2, domain="fast")
+        self.received = []
+
+    def stimuli(self):
+        for node in self.nodes:
+            yield node.link_start.eq(1)
+            yield node.tx_switch_freq.eq(1)
+
+        yield from ds_sim_delay(50e-6, self.SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+        yield self.node_1.w_en.eq(1)
+        for c in sum([packet + [CHAR_EOP.value] for packet in self.PACKETS], []):
+            yield self.node_1.w_data.eq(c)
+            yield Settle()
+            while not (yield self.node_1.w_rdy):
+                yield Tick()
+                yield Settle()
+            yield Tick()
+        yield self.node_1.w_en.eq(0)
+
+    def receive(self):
+        yield self.node_2.r_en.eq(1)
+        for _ in range(ds_sim_period_to_ticks(80e-6, self.SRCFREQ)):
+            yield Tick()
+            yield Settle()
+            if (yield self.node_2.r_rdy):
+                self.received.append((yield self.node_2.r_data))
+        self.link_states = []
+        for node in self.nodes:
+            self.link_states.append((yield node.link_state))
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("chars_per_cycle")
+        gtkw = get_gtkw_filename("chars_per_cycle")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        self.assertEqual(self.received, sum([packet + [CHAR_EOP.value] for packet in self.PACKETS], []))
+        self.assertEqual(self.link_states, [DataLinkState.RUN.value] * 2)
+
+
+class Test_10(unittest.TestCase):
+    """Delays counted on a timebase shared by both nodes."""
+    TIMEBASE_FREQ = 20e6
+    DISCONNECT_DELAY = 850e-9
+
+    def setUp(self):
+        m = Module()
+        m.submodules.timebase = timebase = Timebase(SRCFREQ, self.TIMEBASE_FREQ)
+        self.cut = Signal()
+        self.nodes = []
+        for i in range(2):
+            node = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, disconnect_delay=self.DISCONNECT_DELAY,
+                        timebase_freq=self.TIMEBASE_FREQ, timebase_shared=True)
+            m.submodules["node_{0}".format(i + 1)] = node
+            m.d.comb += node.timebase_tick.eq(timebase.o_tick)
+            self.nodes.append(node)
+        self.node_1, self.node_2 = self.nodes
+        m.d.comb += [
+            self.node_2.data_input.eq(self.node_1.data_output),
+            self.node_2.strobe_input.eq(self.node_1.strobe_output),
+        ]
+        # Data and Strobe into node_1 stop changing once cut
+        with m.If(~self.cut):
+            m.d.comb += [
+                self.node_1.data_input.eq(self.node_2.data_output),
+                self.node_1.strobe_input.eq(self.node_2.strobe_output),
+            ]
+
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.delay = SpWDelay(SRCFREQ, self.DISCONNECT_DELAY, strategy='at_most', tick_freq=timebase.freq, half=False)
+        self.last_edge = None
+        self.error = None
+
+    def stimuli(self):
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+        yield self.cut.eq(1)
+
+    def capture(self):
+        prev = (0, 0)
+        for i in range(ds_sim_period_to_ticks(60e-6, SRCFREQ)):
+            yield Tick()
+            yield Settle()
+            cur = ((yield self.node_1.data_input), (yield self.node_1.strobe_input))
+            if cur != prev:
+                self.last_edge = i
+            prev = cur
+            if self.error is None and (yield self.cut) and (yield self.node_1.link_state != DataLinkState.RUN):
+                self.error = i
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("timebase")
+        gtkw = get_gtkw_filename("timebase")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        self.assertIsNotNone(self.error)
+        # Synchronization and edge detection on the way in, the error on the
+        # way out
+        elapsed = self.error - self.last_edge
+        print("Disconnection detected after {0:.0f} ns, {1:.0f} to {2:.0f} ns expected from the timebase".format(
+            elapsed / SRCFREQ * 1e9, self.delay.min_delay * 1e9, self.delay.max_delay * 1e9))
+        self.assertGreaterEqual(elapsed, math.floor(self.delay.min_delay * SRCFREQ))
+        self.assertLessEqual(elapsed, math.ceil(self.delay.max_delay * SRCFREQ) + 8)
+
+
+class Test_11(unittest.TestCase):
+    LANES = 4
+
+    def setUp(self):
+        add_nodes(self, user_chars_per_word=self.LANES, node_2_kwargs={'user_chars_per_word': self.LANES})
+        self.words = []
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+        chars = [ord(c) for c in 'Hello World in SpaceWire!'] + [CHAR_EOP.value]
+        yield self.node_1.w_en.eq(1)
+        for i in range(0, len(chars), self.LANES):
+            word = chars[i:i + self.LANES]
+            yield self.node_1.w_data.eq(sum((c & 0xff) << (8 * j) for j, c in enumerate(word)))
+            yield self.node_1.w_valid.eq((1 << len(word)) - 1)
+            yield self.node_1.w_eop.eq(sum((c >> 8) << j for j, c in enumerate(word)))
+            yield Tick()
+            yield Settle()
+            while not (yield self.node_1.w_rdy):
+                yield Tick()
+                yield Settle()
+        yield self.node_1.w_en.eq(0)
+
+    def receive(self):
+        # Poll from the start, the packet still comes in full words
+        yield self.node_2.r_en.eq(1)
+        for _ in range(int(100e-6 * SRCFREQ)):
+            yield Settle()
+            if (yield self.node_2.r_rdy):
+                data = yield self.node_2.r_data
+                valid = yield self.node_2.r_valid
+                eop = yield self.node_2.r_eop
+                self.words.append([((data >> (8 * j)) & 0xff) | (((eop >> j) & 1) << 8)
+                                   for j in range(self.LANES) if valid & (1 << j)])
+            yield Tick()
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("wide_user_fifo")
+        gtkw = get_gtkw_filename("wide_user_fifo")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        expected = [ord(c) for c in 'Hello World in SpaceWire!'] + [CHAR_EOP.value]
+        self.assertEqual(self.words, [expected[i:i + self.LANES] for i in range(0, len(expected), self.LANES)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Node(SRCFREQ, user_flush_timeout=16)
+
+
+class Test_12(unittest.TestCase):
+    # Packets and whether they end with an error
+    PACKETS = [(b'Hello World', False), (b'in SpaceWire!', True), (b'!', False)]
+
+    def setUp(self):
+        add_nodes(self, user_stream=True, node_2_kwargs={'user_stream': True})
+        self.received = []
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+        yield self.node_1.tx_valid.eq(1)
+        for data, error in self.PACKETS:
+            for i, byte in enumerate(data):
+                yield self.node_1.tx_data.eq(byte)
+                yield self.node_1.tx_last.eq(i == len(data) - 1)
+                yield self.node_1.tx_error.eq(error)
+                yield Settle()
+                while not (yield self.node_1.tx_ready):
+                    yield Tick()
+                    yield Settle()
+                yield Tick()
+        yield self.node_1.tx_valid.eq(0)
+
+    def receive(self):
+        packet = []
+        yield self.node_2.rx_ready.eq(1)
+        for _ in range(ds_sim_period_to_ticks(100e-6, SRCFREQ)):
+            yield Settle()
+            if (yield self.node_2.rx_valid):
+                packet.append((yield self.node_2.rx_data))
+                if (yield self.node_2.rx_last):
+                    self.received.append((bytes(packet), bool((yield self.node_2.rx_error))))
+                    packet = []
+            yield Tick()
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("user_stream")
+        gtkw = get_gtkw_filename("user_stream")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        self.assertEqual(self.received, self.PACKETS)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Node(SRCFREQ, user_stream=True, user_chars_per_word=4)
+
+
+class Test_13(unittest.TestCase):
+    USER_FREQ = 33e6
+    CHARS = [(i * 37) & 0xff for i in range(100)] + [CHAR_EOP.value]
+
+    def setUp(self):
+        add_nodes(self, user_async=True, node_2_kwargs={'user_async': True})
+        self.sim.add_clock(1/self.USER_FREQ, domain="user")
+        self.received = []
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+    def send(self):
+        for _ in range(ds_sim_period_to_ticks(50e-6, self.USER_FREQ)):
+            yield Tick("user")
+        yield self.node_1.w_en.eq(1)
+        for c in self.CHARS:
+            yield self.node_1.w_data.eq(c)
+            yield Settle()
+            while not (yield self.node_1.w_rdy):
+                yield Tick("user")
+                yield Settle()
+            yield Tick("user")
+        yield self.node_1.w_en.eq(0)
+
+    def receive(self):
+        # The RX FIFO is filled up first, then read slower than it is written
+        for _ in range(ds_sim_period_to_ticks(110e-6, self.USER_FREQ)):
+            yield Tick("user")
+        for i in range(ds_sim_period_to_ticks(150e-6, self.USER_FREQ)):
+            yield self.node_2.r_en.eq(i % 8 == 0)
+            yield Settle()
+            if (yield self.node_2.r_en) and (yield self.node_2.r_rdy):
+                self.received.append((yield self.node_2.r_data))
+            yield Tick("user")
+        self.link_states = ((yield self.node_1.link_state), (yield self.node_2.link_state))
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.send)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("user_async")
+        gtkw = get_gtkw_filename("user_async")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        # Without credit errors on the way
+        self.assertEqual(self.received, self.CHARS)
+        self.assertEqual(self.link_states, (DataLinkState.RUN.value, DataLinkState.RUN.value))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Node(SRCFREQ, user_async=True, rx_chars_per_cycle=2)
+
+
+class Test_14(unittest.TestCase):
+    # Packets and their end of packet marker, the first one written slower
+    # than it is sent
+    PACKETS = [([ord(c) for c in 'Hello World'], CHAR_EOP.value), ([ord(c) for c in 'in SpaceWire!'], CHAR_EEP.value)]
+    WRITE_PERIOD = 2e-6
+
+    def setUp(self):
+        add_nodes(self, packet_fifo=True, node_2_kwargs={'packet_fifo': True})
+        self.end_written = None
+        self.first_received = None
+        self.lengths = []
+        self.received = []
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+        for i, (data, end) in enumerate(self.PACKETS):
+            for c in data + [end]:
+                yield self.node_1.w_en.eq(1)
+                yield self.node_1.w_data.eq(c)
+                yield Tick()
+                yield self.node_1.w_en.eq(0)
+                if i == 0:
+                    yield from ds_sim_delay(self.WRITE_PERIOD, SRCFREQ)
+            if i == 0:
+                self.end_written = self.now
+
+    def receive(self):
+        self.now = 0
+        for _ in range(ds_sim_period_to_ticks(120e-6, SRCFREQ)):
+            yield Settle()
+            if self.first_received is None and (yield self.node_2.r_rdy):
+                self.first_received = self.now
+            # One burst read per packet, once both are received
+            pending = len(self.PACKETS) - len(self.lengths)
+            if pending and (yield self.node_2.r_packets) == pending:
+                self.lengths.append((yield self.node_2.r_length))
+                packet = []
+                yield self.node_2.r_en.eq(1)
+                for _ in range(self.lengths[-1] + 1):
+                    yield Settle()
+                    packet.append((yield self.node_2.r_data))
+                    yield Tick()
+                    self.now += 1
+                yield self.node_2.r_en.eq(0)
+                self.received.append((packet[:-1], packet[-1]))
+            yield Tick()
+            self.now += 1
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("packet_fifo")
+        gtkw = get_gtkw_filename("packet_fifo")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        # Nothing sent before the whole packet was written
+        self.assertGreater(self.first_received, self.end_written)
+        self.assertEqual(self.lengths, [len(data) for data, _ in self.PACKETS])
+        self.assertEqual(self.received, self.PACKETS)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Node(SRCFREQ, packet_fifo=True, user_stream=True)
+
+
+class Test_15(unittest.TestCase):
+    # Characters written at every phase of the NULL sent on an idle link,
+    # as seen by a receiver on the wire
+    PHASES = 40
+
+    def setUp(self):
+        m = Module()
+        # Links without and with the FIFO bypass
+        self.links = {}
+        for name, kwargs in [("fifo", {}), ("bypass", {'fifo_bypass': True})]:
+            node_1 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, **kwargs)
+            node_2 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, **kwargs)
+            monitor = Receiver(SRCFREQ)
+            m.submodules[name + "_1"] = node_1
+            m.submodules[name + "_2"] = node_2
+            m.submodules[name + "_monitor"] = monitor
+            m.d.comb += [
+                node_1.data_input.eq(node_2.data_output),
+                node_1.strobe_input.eq(node_2.strobe_output),
+                node_2.data_input.eq(node_1.data_output),
+                node_2.strobe_input.eq(node_1.strobe_output),
+                monitor.data.eq(node_1.data_output),
+                monitor.strobe.eq(node_1.strobe_output),
+            ]
+            self.links[name] = (node_1, node_2, monitor)
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.sim.add_clock(1/TXFREQ, domain=ClockDomain("tx"))
+        self.latencies = {name: [] for name in self.links}
+
+    def measure(self, name):
+        def process():
+            node_1, node_2, monitor = self.links[name]
+            yield node_1.link_start.eq(1)
+            yield node_2.link_start.eq(1)
+            yield node_2.r_en.eq(1)
+            yield monitor.enable.eq(1)
+            yield from ds_sim_delay(50e-6, SRCFREQ)
+            assert(yield node_2.link_state == DataLinkState.RUN)
+
+            for phase in range(self.PHASES):
+                # Only NULLs on the wire
+                for _ in range(2):
+                    yield Tick()
+                    yield Settle()
+                    while not (yield monitor.got_null):
+                        yield Tick()
+                        yield Settle()
+                for _ in range(phase):
+                    yield Tick()
+
+                yield node_1.w_en.eq(1)
+                yield node_1.w_data.eq(0x5a)
+                cycles = 0
+                wire = None
+                while True:
+                    yield Tick()
+                    yield node_1.w_en.eq(0)
+                    yield Settle()
+                    cycles += 1
+                    # Last bit of the character on the wire
+                    if (yield monitor.got_n_char):
+                        wire = cycles - monitor.latency
+                    if (yield node_2.r_rdy):
+                        self.assertEqual((yield node_2.r_data), 0x5a)
+                        break
+                self.latencies[name].append((wire, cycles - wire))
+        return process
+
+    def test_node(self):
+        for name in self.links:
+            self.sim.add_process(self.measure(name))
+
+        vcd = get_vcd_filename("fifo_bypass")
+        gtkw = get_gtkw_filename("fifo_bypass")
+        create_sim_output_dirs(vcd, gtkw)
+
+        traces = [signal for node_1, node_2, _ in self.links.values() for signal in node_1.ports() + node_2.ports()]
+        with self.sim.write_vcd(vcd, gtkw, traces=traces):
+            self.sim.run()
+
+        for name, latencies in self.latencies.items():
+            tx = [t for t, _ in latencies]
+            rx = [r for _, r in latencies]
+            print("{0}: w_en to wire {1} to {2} cycles, wire to r_rdy {3} to {4} cycles".format(
+                name, min(tx), max(tx), min(rx), max(rx)))
+        # The two clock cycles of the FIFOs are saved on each side
+        self.assertEqual(min(t for t, _ in self.latencies["bypass"]), min(t for t, _ in self.latencies["fifo"]) - 2)
+        self.assertEqual(set(r for _, r in self.latencies["bypass"]), set(r - 2 for _, r in self.latencies["fifo"]))
+        self.assertEqual(len(set(r for _, r in self.latencies["bypass"])), 1)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Node(SRCFREQ, fifo_bypass=True, packet_fifo=True)
+
+
+class Test_16(unittest.TestCase):
+    # Fewer characters than the initial credit, so that the FCTs sent back
+    # do not change the traffic
+    DATA = [(i * 37) & 0xff for i in range(40)]
+
+    def setUp(self):
+        m = Module()
+        # Identical links, whose node_2 receives with and without the early
+        # release
+        self.links = {}
+        for name, kwargs in [("normal", {}), ("early", {'rx_early_release': True})]:
+            node_1 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ)
+            node_2 = Node(SRCFREQ, rstfreq=TXFREQ, txfreq=TXFREQ, **kwargs)
+            m.submodules[name + "_1"] = node_1
+            m.submodules[name + "_2"] = node_2
+            m.d.comb += [
+                node_1.data_input.eq(node_2.data_output),
+                node_1.strobe_input.eq(node_2.strobe_output),
+                node_2.data_input.eq(node_1.data_output),
+                node_2.strobe_input.eq(node_1.strobe_output),
+            ]
+            self.links[name] = (node_1, node_2)
+        self.sim = Simulator(m)
+        self.sim.add_clock(1/SRCFREQ)
+        self.sim.add_clock(1/TXFREQ, domain=ClockDomain("tx"))
+        self.received = {name: [] for name in self.links}
+        self.link_states = []
+
+    def stimuli(self):
+        for node_1, node_2 in self.links.values():
+            yield node_1.link_start.eq(1)
+            yield node_2.link_start.eq(1)
+            yield node_2.r_en.eq(1)
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+
+        for node_1, _ in self.links.values():
+            yield node_1.w_en.eq(1)
+        for c in self.DATA + [CHAR_EOP.value]:
+            for node_1, _ in self.links.values():
+                yield node_1.w_data.eq(c)
+            yield Tick()
+            yield Settle()
+        for node_1, _ in self.links.values():
+            yield node_1.w_en.eq(0)
+
+        yield from ds_sim_delay(60e-6, SRCFREQ)
+        for _, node_2 in self.links.values():
+            self.link_states.append((yield node_2.link_state))
+
+    def capture(self, name):
+        def process():
+            _, node_2 = self.links[name]
+            for i in range(ds_sim_period_to_ticks(100e-6, SRCFREQ)):
+                yield Tick()
+                yield Settle()
+                if (yield node_2.r_rdy):
+                    self.received[name].append((i, (yield node_2.r_data)))
+        return process
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        for name in self.links:
+            self.sim.add_process(self.capture(name))
+
+        vcd = get_vcd_filename("early_release")
+        gtkw = get_gtkw_filename("early_release")
+        create_sim_output_dirs(vcd, gtkw)
+
+        traces = [signal for node_1, node_2 in self.links.values() for signal in node_1.ports() + node_2.ports()]
+        with self.sim.write_vcd(vcd, gtkw, traces=traces):
+            self.sim.run()
+
+        expected = self.DATA + [CHAR_EOP.value]
+        for name in self.links:
+            self.assertEqual([c for _, c in self.received[name]], expected)
+        self.assertEqual(self.link_states, [DataLinkState.RUN.value] * 2)
+
+        # The characters reach the FIFO before the next header is received
+        savings = [n - e for (n, _), (e, _) in zip(self.received["normal"], self.received["early"])]
+        print("Character read {0} to {1} clock cycles earlier, two bits are {2:.1f} cycles".format(
+            min(savings), max(savings), 2 * SRCFREQ / TXFREQ))
+        self.assertGreaterEqual(min(savings), int(2 * SRCFREQ / TXFREQ))
+
+
+class Test_17(unittest.TestCase):
+    WINDOW = 10e-6
+
+    def setUp(self):
+        add_nodes(self, node_2_kwargs={'rx_rate_window': self.WINDOW})
+        self.measurements = []
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+
+    def capture(self):
+        run = ds_sim_period_to_ticks(50e-6, SRCFREQ)
+        for i in range(run + ds_sim_period_to_ticks(4 * self.WINDOW, SRCFREQ)):
+            yield Tick()
+            yield Settle()
+            if i == run:
+                self.assertEqual((yield self.node_2.link_state), DataLinkState.RUN.value)
+            if i > run and (yield self.node_2.rx_rate_update):
+                self.measurements.append((
+                    (yield self.node_2.rx_rate_bits),
+                    (yield self.node_2.rx_rate_min_period),
+                    (yield self.node_2.rx_rate_max_period),
+                ))
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.capture)
+
+        vcd = get_vcd_filename("rate_monitor")
+        gtkw = get_gtkw_filename("rate_monitor")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        for bits, min_period, max_period in self.measurements:
+            print("{0} bits, {1:.1f} Mb/s, bit period {2} to {3} clock cycles".format(
+                bits, bits / self.WINDOW / 1e6, min_period, max_period))
+
+        # NULLs from node_1, at the rate of its integer divisor
+        divisor = SRCFREQ // TXFREQ
+        self.assertGreaterEqual(len(self.measurements), 3)
+        for bits, min_period, max_period in self.measurements:
+            self.assertAlmostEqual(bits, SRCFREQ / divisor * self.WINDOW, delta=1)
+            self.assertEqual((min_period, max_period), (divisor, divisor))
+
+
+class Test_18(unittest.TestCase):
+    IDLE = 20e-6
+    DATA = list(range(20))
+
+    def setUp(self):
+        add_nodes(self, rx_statistics=True)
+        self.counts = {}
+
+    def counters(self):
+        node = self.node_1
+        counts = []
+        for signal in [node.rx_chars_received, node.rx_parity_errors, node.rx_esc_errors, node.rx_read_errors,
+                       node.rx_disconnect_errors]:
+            counts.append((yield signal))
+        return counts
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+        yield self.node_1.r_en.eq(1)
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        self.counts["run"] = yield from self.counters()
+
+        # Only NULLs
+        yield from ds_sim_delay(self.IDLE, SRCFREQ)
+        self.counts["idle"] = yield from self.counters()
+
+        yield self.node_2.w_en.eq(1)
+        for c in self.DATA + [CHAR_EOP.value]:
+            yield self.node_2.w_data.eq(c)
+            yield Tick()
+        yield self.node_2.w_en.eq(0)
+        yield from ds_sim_delay(30e-6, SRCFREQ)
+        self.counts["data"] = yield from self.counters()
+
+        # Errors, and the link started again
+        yield self.gate_trigger.eq(0)
+        yield from ds_sim_delay(5e-6, SRCFREQ)
+        yield self.gate_trigger.eq(1)
+        yield from ds_sim_delay(100e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        self.counts["errors"] = yield from self.counters()
+
+        yield self.node_1.rx_statistics_clear.eq(1)
+        yield Tick()
+        yield self.node_1.rx_statistics_clear.eq(0)
+        yield Settle()
+        self.counts["clear"] = yield from self.counters()
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+
+        vcd = get_vcd_filename("rx_statistics")
+        gtkw = get_gtkw_filename("rx_statistics")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        for name, counts in self.counts.items():
+            print("{0}: {1} characters, {2} parity, {3} escape, {4} read, {5} disconnect errors".format(name, *counts))
+
+        self.assertEqual(self.counts["run"][1:], [0] * 4)
+        # One per NULL, of 8 bits, from node_1 at the rate of its integer
+        # divisor
+        nulls = self.IDLE * SRCFREQ / (SRCFREQ // TXFREQ) / 8
+        self.assertAlmostEqual(self.counts["idle"][0] - self.counts["run"][0], nulls, delta=1)
+        self.assertGreaterEqual(self.counts["data"][0] - self.counts["idle"][0], len(self.DATA) + 1)
+        self.assertEqual(self.counts["data"][1:], [0] * 4)
+        # Kept over the link reset
+        self.assertGreater(self.counts["errors"][0], self.counts["data"][0])
+        self.assertGreater(sum(self.counts["errors"][1:]), 0)
+        self.assertEqual(self.counts["clear"], [0] * 5)
+
+
+class Test_19(unittest.TestCase):
+    USER_FREQ = 33e6
+
+    def setUp(self):
+        add_nodes(self, user_async=True)
+        self.sim.add_clock(1/self.USER_FREQ, domain="user")
+        self.accepted = []
+        self.received = []
+
+    def stimuli(self):
+        yield self.gate_trigger.eq(1)
+        yield self.node_1.link_start.eq(1)
+        yield self.node_2.link_start.eq(1)
+        yield self.node_2.r_en.eq(1)
+
+        yield from ds_sim_delay(50e-6, SRCFREQ)
+        assert(yield self.node_1.link_state == DataLinkState.RUN)
+        assert(yield self.node_2.link_state == DataLinkState.RUN)
+
+        # Error while the TX FIFO is full, so that it is discarded
+        yield from ds_sim_delay(20e-6, SRCFREQ)
+        yield self.gate_trigger.eq(0)
+        yield from ds_sim_delay(5e-6, SRCFREQ)
+        yield self.gate_trigger.eq(1)
+
+    def send(self):
+        # Written all the time, before, during and after the discard
+        for _ in range(ds_sim_period_to_ticks(50e-6, self.USER_FREQ)):
+            yield Tick("user")
+        yield self.node_1.w_en.eq(1)
+        for i in range(ds_sim_period_to_ticks(100e-6, self.USER_FREQ)):
+            yield self.node_1.w_data.eq(i & 0xff)
+            yield Settle()
+            if (yield self.node_1.w_rdy):
+                self.accepted.append(i & 0xff)
+            yield Tick("user")
+        yield self.node_1.w_data.eq(CHAR_EOP)
+        yield Settle()
+        while not (yield self.node_1.w_rdy):
+            yield Tick("user")
+            yield Settle()
+        yield Tick("user")
+        yield self.node_1.w_en.eq(0)
+
+    def receive(self):
+        for _ in range(ds_sim_period_to_ticks(250e-6, SRCFREQ)):
+            yield Settle()
+            if (yield self.node_2.r_rdy):
+                self.received.append((yield self.node_2.r_data))
+            yield Tick()
+        self.link_states = ((yield self.node_1.link_state), (yield self.node_2.link_state))
+
+    def test_node(self):
+        self.sim.add_process(self.stimuli)
+        self.sim.add_process(self.send)
+        self.sim.add_process(self.receive)
+
+        vcd = get_vcd_filename("user_async_discard")
+        gtkw = get_gtkw_filename("user_async_discard")
+        create_sim_output_dirs(vcd, gtkw)
+
+        with self.sim.write_vcd(vcd, gtkw, traces=self.node_1.ports() + self.node_2.ports()):
+            self.sim.run()
+
+        self.assertEqual(self.link_states, (DataLinkState.RUN.value, DataLinkState.RUN.value))
+        # The characters sent before the error, the end of packet added by
+        # node_2, then the characters written once the TX FIFO was discarded
+        self.assertEqual(self.received.count(CHAR_EEP.value), 1)
+        self.assertEqual(self.received[-1], CHAR_EOP.value)
+        eep = self.received.index(CHAR_EEP.value)
+        before = self.received[:eep]
+        after = self.received[eep + 1:-1]
+        print("{0} characters sent before the error, {1} discarded, {2} after".format(
+            len(before), len(self.accepted) - len(before) - len(after), len(after)))
+        self.assertEqual(before, self.accepted[:len(before)])
+        self.assertEqual(after, self.accepted[len(self.accepted) - len(after):])
+        self.assertGreater(len(self.accepted) - len(after), len(before))
+        self.assertGreater(len(after), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file